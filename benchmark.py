@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'api_data_dictionary_benchmark'
+__version__ = '1.0.0'
+
+# Standard Python Modules
+import gc
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+try:
+    import resource             # Not available on Windows: peak RSS not reported
+except ImportError:
+    resource = None
+
+# External Python Modules
+import typer
+
+# Personal Python Modules
+from params import *
+from utils.coloredlog import get_logger
+
+### Global Variables
+CUR_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_DIR = os.path.join(CUR_DIR, "sample_input")
+BASELINE_FILE = os.path.join(CUR_DIR, "benchmark_baseline.json")
+STAGES = ["load", "analysis", "tables", "df_schemas", "df_params", "df_fields", "write_xlsx", "write_html", "write_json"]
+METRICS = {"wall": "time", "import_time": "time", "peak_alloc": "memory", "rss": "memory"}     # metric -> threshold category
+# Command lines of main.py measured in startup mode: time to first output is dominated by imports
+STARTUP_COMMANDS = {"version": ["--version"], "help": ["--help"]}
+# Algorithms measured in pseudonymize mode (CSVFile.hash_file on a generated CSV file)
+PSEUDONYMIZE_ALGORITHMS = ["blake2s", "sha256", "index", "length"]
+
+logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_SUCCESS, success_level=LOGLEVEL_SUCCESS)
+
+def get_peak_rss() -> int:
+    """ Peak resident set size of the current process in bytes (None if not available). """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+class BenchmarkCase():
+    """ Prepare prerequisites of one stage on one sample file, then run only that stage on demand. """
+    def __init__(self, sample:Path, stage:str, outdir:Path):
+        from data_dictionary import DictionaryOptions
+        self.sample = sample
+        self.stage = stage
+        self.outdir = outdir
+        self.options = DictionaryOptions(excel_with_layout=True)
+        self.api_content = None
+        self.api_object = None
+        self.tables = None
+
+    def prepare(self):
+        """ Everything needed before the measured stage (not measured). """
+        from openapi_parsing import ApiObject
+        from dictionary_tables import ApiTables, get_tables
+        from data_dictionary import load_document
+        if self.stage != "load":
+            self.api_content = load_document(self.sample)
+        if self.stage not in ("load", "analysis"):
+            self.api_object = ApiObject(self.api_content)
+            self.api_object.parse()
+        if self.stage.startswith("df_"):
+            self.tables = ApiTables(self.api_object)
+        if self.stage.startswith("write_"):
+            # Writers only: table model & dataframes are built once here and reused by every run
+            tables = get_tables(self.api_object)
+            for table in (tables.schemas, tables.params, tables.fields, tables.common):
+                table.to_dataframe()
+
+    def run(self):
+        from openapi_parsing import ApiObject
+        from dictionary_tables import ApiTables
+        from data_dictionary import load_document, write_outputs
+        stage = self.stage
+        if stage == "load":
+            load_document(self.sample)
+        elif stage == "analysis":
+            ApiObject(self.api_content).parse()
+        elif stage == "tables":
+            ApiTables(self.api_object)
+        elif stage.startswith("df_"):
+            table = {"df_schemas": self.tables.schemas, "df_params": self.tables.params, "df_fields": self.tables.fields}[stage]
+            table._df = None
+            table.to_dataframe()
+        elif stage.startswith("write_"):
+            format = stage[len("write_"):]
+            outfile = os.path.join(self.outdir, Path(self.sample).stem + "." + format)
+            write_outputs(self.api_object, {format: outfile}, self.sample, self.options)
+
+def run_cold(sample:Path, stage:str) -> dict:
+    """ Run one case in a fresh interpreter: imports, caches & allocator are cold. """
+    cmd = [sys.executable, os.path.abspath(__file__), "--cold-worker", f"{sample}::{stage}"]
+    result = subprocess.run(cmd, capture_output=True, text=True, cwd=CUR_DIR)
+    if result.returncode != 0:
+        raise RuntimeError(f"cold run failed for {sample} / {stage}:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_cold_worker(case_id:str) -> None:
+    sample, stage = case_id.split("::")
+    outdir = tempfile.mkdtemp()
+    try:
+        case = BenchmarkCase(sample, stage, outdir)
+        case.prepare()
+        start = time.perf_counter()
+        case.run()
+        wall = time.perf_counter() - start
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+    print(json.dumps({"wall": wall, "rss": get_peak_rss()}))
+
+def parse_importtime(stderr:str) -> tuple[int, list[tuple[int, str]]]:
+    """ Total import time (microseconds) & cumulative time per top level module from 'python -X importtime' output. """
+    total = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):           # top level import (nested ones are indented)
+            total += int(cumulative)
+            modules.append((int(cumulative), name.strip()))
+    return total, sorted(modules, reverse=True)
+
+def run_startup(command:str, repeat:int) -> dict:
+    """ Run main.py in a fresh interpreter with -X importtime. Return median wall time & import time of the process. """
+    cmd = [sys.executable, "-X", "importtime", os.path.join(CUR_DIR, "main.py")] + STARTUP_COMMANDS[command]
+    timings = []
+    import_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=CUR_DIR)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"startup run failed for '{command}':\n{result.stderr}")
+        total, modules = parse_importtime(result.stderr)
+        import_times.append(total / 1e6)
+    logger.info(f"Slowest imports for '{command}': " + ", ".join(f"{name} ({cumulative/1000:.1f} ms)" for cumulative, name in modules[:5]))
+    return {"wall": statistics.median(timings), "import_time": statistics.median(import_times)}
+
+def run_warm(sample:Path, stage:str, repeat:int) -> dict:
+    """ Run one case several times in the current process after a warm-up run. Return median wall time & peak allocations. """
+    outdir = tempfile.mkdtemp()
+    try:
+        case = BenchmarkCase(sample, stage, outdir)
+        case.prepare()
+        case.run()                          # warm-up
+        timings = []
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            case.run()
+            timings.append(time.perf_counter() - start)
+        # Allocations measured on a separate run, as tracing slows down execution
+        gc.collect()
+        tracemalloc.start()
+        case.run()
+        _, peak_alloc = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+    return {"wall": statistics.median(timings), "peak_alloc": peak_alloc}
+
+def generate_csv(filename:str, size_mb:int, distinct:int=100000) -> int:
+    """ Synthetic ';' separated CSV file of about size_mb MB: an id column & 3 columns of repeated values. Return its size in bytes. """
+    size = size_mb * 1024 * 1024
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("id;email;name;comment\n")
+        written = 0
+        row = 0
+        while written < size:
+            lines = []
+            for i in range(row, row + 10000):
+                key = (i * 7919) % distinct
+                lines.append(f"{i};user{key}@example.com;Name {key % 5000};{'' if i % 10 == 0 else 'comment ' + str(key % 97)}\n")
+            block = "".join(lines)
+            f.write(block)
+            written += len(block)
+            row += 10000
+    return os.path.getsize(filename)
+
+def run_pseudonymize(size_mb:int, algorithm:str, workers:int, chunksize:int) -> dict:
+    """ Pseudonymize 3 columns of a generated CSV file in streaming. Return wall time, throughput & peak RSS. """
+    outdir = tempfile.mkdtemp()
+    try:
+        infile = os.path.join(outdir, "input.csv")
+        size = generate_csv(infile, size_mb)
+        cmd = [sys.executable, os.path.abspath(__file__), "--pseudonymize-worker", f"{infile}::{algorithm}::{workers}::{chunksize}"]
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=CUR_DIR)
+        if result.returncode != 0:
+            raise RuntimeError(f"pseudonymize run failed for {algorithm}:\n{result.stderr}")
+        metrics = json.loads(result.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+    logger.info(f"Pseudonymize {algorithm}: {size/1024/1024/metrics['wall']:.1f} MB/s")
+    return metrics
+
+def run_pseudonymize_worker(case_id:str) -> None:
+    from utils.csvfile import CSVFile
+    infile, algorithm, workers, chunksize = case_id.split("::")
+    csv = CSVFile(infile, chunksize=int(chunksize))
+    start = time.perf_counter()
+    if not csv.hash_file(infile + ".out", ["email", "name", "comment"], algorithm, "benchmark", workers=int(workers)):
+        raise RuntimeError(f"pseudonymization failed for {algorithm}")
+    wall = time.perf_counter() - start
+    print(json.dumps({"wall": wall, "rss": get_peak_rss()}))
+
+def compare_to_baseline(results:dict, baseline:dict, time_threshold:float, memory_threshold:float, min_time:float) -> list[str]:
+    regressions = []
+    for case_id, metrics in results.items():
+        base_metrics = baseline.get(case_id)
+        if not base_metrics:
+            continue
+        for metric, value in metrics.items():
+            base_value = base_metrics.get(metric)
+            if value is None or not base_value:
+                continue
+            threshold = time_threshold if METRICS[metric] == "time" else memory_threshold
+            if metric == "wall" and value - base_value < min_time:
+                continue            # below noise level
+            if value > base_value * (1 + threshold):
+                regressions.append(f"{case_id} - {metric}: {base_value:.4g} -> {value:.4g} (+{(value/base_value-1)*100:.1f}%, threshold {threshold*100:.0f}%)")
+    return regressions
+
+def print_results(results:dict) -> None:
+    sep = '-'*15
+    mb = 1024*1024
+    print(f"{sep} Benchmark Results {sep}")
+    print(f"{'Case':<55} {'Wall (s)':>10} {'Import (s)':>11} {'Alloc (MB)':>11} {'RSS (MB)':>9}")
+    for case_id, metrics in results.items():
+        imports = f"{metrics['import_time']:.4f}" if metrics.get("import_time") is not None else "-"
+        alloc = f"{metrics['peak_alloc']/mb:.1f}" if metrics.get("peak_alloc") is not None else "-"
+        rss = f"{metrics['rss']/mb:.1f}" if metrics.get("rss") is not None else "-"
+        print(f"{case_id:<55} {metrics['wall']:>10.4f} {imports:>11} {alloc:>11} {rss:>9}")
+    print (sep*4)
+    print()
+
+def benchmark(samples:list[str] = typer.Option(None, "--sample", "-s", help="Sample file(s) to benchmark (default: all files of sample_input)"),
+        stages:list[str] = typer.Option(None, "--stage", help=f"Stage(s) to benchmark among {STAGES} (default: all)"),
+        mode:str = typer.Option("both", "--mode", "-m", help="warm (in-process, repeated), cold (fresh interpreter per case), both (warm & cold), startup (-X importtime of main.py) or pseudonymize (CSVFile.hash_file on a generated CSV file)"),
+        repeat:int = typer.Option(3, "--repeat", "-r", help="Number of measured runs per case in warm & startup modes"),
+        baseline:Path = typer.Option(BASELINE_FILE, "--baseline", "-b", help="Baseline file to compare with"),
+        save_baseline:bool = typer.Option(False, "--save-baseline", help="Save results as new baseline instead of comparing"),
+        time_threshold:float = typer.Option(0.20, "--time-threshold", help="Allowed relative increase of wall time before reporting a regression"),
+        memory_threshold:float = typer.Option(0.10, "--memory-threshold", help="Allowed relative increase of allocations/RSS before reporting a regression"),
+        min_time:float = typer.Option(0.005, "--min-time", help="Absolute increase of wall time (seconds) ignored as noise"),
+        results_file:Path = typer.Option(None, "--results", help="Save results of this run as json file"),
+        csv_size:int = typer.Option(100, "--csv-size", help="Size (MB) of the CSV file generated in pseudonymize mode"),
+        algorithms:list[str] = typer.Option(None, "--algorithm", "-a", help=f"Algorithm(s) measured in pseudonymize mode (default: {PSEUDONYMIZE_ALGORITHMS})"),
+        workers:int = typer.Option(1, "--workers", "-w", help="Number of processes transforming chunks in pseudonymize mode"),
+        chunksize:int = typer.Option(100000, "--chunksize", help="Number of rows per chunk in pseudonymize mode"),
+        cold_worker:str = typer.Option(None, "--cold-worker", hidden=True),
+        pseudonymize_worker:str = typer.Option(None, "--pseudonymize-worker", hidden=True),
+        ) -> None:
+    if cold_worker:
+        run_cold_worker(cold_worker)
+        return
+    if pseudonymize_worker:
+        run_pseudonymize_worker(pseudonymize_worker)
+        return
+    if mode not in ("warm", "cold", "both", "startup", "pseudonymize"):
+        raise typer.BadParameter("Possible values for mode are: warm, cold, both, startup, pseudonymize")
+    samples = samples or sorted(os.path.join(SAMPLE_DIR, f) for f in os.listdir(SAMPLE_DIR))
+    stages = stages or STAGES
+    for stage in stages:
+        if stage not in STAGES:
+            raise typer.BadParameter(f"Possible values for stage are: {STAGES}")
+
+    results = {}
+    if mode == "startup":
+        samples = []
+        for command in STARTUP_COMMANDS:
+            logger.info(f"Startup run: main.py {' '.join(STARTUP_COMMANDS[command])}")
+            results[f"main.py::{command}::startup"] = run_startup(command, repeat)
+    if mode == "pseudonymize":
+        samples = []
+        for algorithm in algorithms or PSEUDONYMIZE_ALGORITHMS:
+            logger.info(f"Pseudonymize run: {csv_size} MB / {algorithm} / {workers} worker(s)")
+            results[f"csv_{csv_size}MB::{algorithm}::pseudonymize"] = run_pseudonymize(csv_size, algorithm, workers, chunksize)
+    for sample in samples:
+        sample_name = os.path.basename(sample)
+        for stage in stages:
+            if mode in ("warm", "both"):
+                logger.info(f"Warm run: {sample_name} / {stage}")
+                results[f"{sample_name}::{stage}::warm"] = run_warm(sample, stage, repeat)
+            if mode in ("cold", "both"):
+                logger.info(f"Cold run: {sample_name} / {stage}")
+                results[f"{sample_name}::{stage}::cold"] = run_cold(sample, stage)
+    print_results(results)
+
+    if results_file:
+        with open(results_file, "w") as f:
+            json.dump(results, f, indent=4)
+    if save_baseline:
+        stored = {}
+        if os.path.exists(baseline):
+            with open(baseline) as f:
+                stored = json.load(f)
+        stored.update(results)
+        with open(baseline, "w") as f:
+            json.dump(stored, f, indent=4)
+        logger.log(LOGLEVEL_SUCCESS, f"Baseline saved to file: '{baseline}'")
+    elif os.path.exists(baseline):
+        with open(baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), time_threshold, memory_threshold, min_time)
+        if regressions:
+            for regression in regressions:
+                logger.error(f"Regression - {regression}")
+            raise typer.Exit(code=1)
+        logger.log(LOGLEVEL_SUCCESS, f"No regression compared to baseline '{baseline}'")
+    else:
+        logger.warning(f"No baseline file '{baseline}' - use --save-baseline to create one")
+
+if __name__ == "__main__":
+    typer.run(benchmark)
@@ -0,0 +1,527 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'data_dictionary'
+__version__ = '1.0.0'
+
+'''
+In-process API building the data dictionary of an openapi file, without any global state.
+
+    from data_dictionary import build_dictionary, DictionaryOptions
+    result = build_dictionary("sample_input/pet_store.yaml", formats=["xlsx", "json"], options=DictionaryOptions(excel_with_layout=False))
+    print(result.summary, result.outfiles)
+
+All settings of a call are held by its DictionaryOptions, so several specs can be processed in one process,
+sequentially or concurrently in threads. Progress is logged with the logger of the options, errors are raised as DictionaryError.
+'''
+
+# Standard Python Modules
+import datetime
+import io
+import json
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, TYPE_CHECKING
+
+# External Python Modules
+if TYPE_CHECKING:
+    import pandas as pd         # Heavy modules (pandas, yaml) are imported only by the steps using them
+
+# Personal Python Modules
+from params import *
+from utils.coloredlog import ColorLogger
+from utils.profiler import Profiler
+from utils.cache import ContentCache
+from utils.budget import Budget
+import openapi_parsing
+import dictionary_tables
+import openapi_validator
+from openapi_parsing import ApiObject, get_default_logger
+from dictionary_tables import ApiTables, get_tables
+from openapi_validator import SEVERITY_ERROR, get_errors, validate_document
+from schema_graph import SchemaGraph
+from spec_filter import SpecFilter
+
+# Excel column widths per sheet
+XLSX_LAYOUT = {
+    "Schemas": {"A:A":50, "B:B":10, "C:C":35, "D:D":100},
+    "Parameters": {"A:A":30, "B:E":10, "F:H":100},
+    "Fields": {"A:A":30, "B:D":10, "E:G":100},
+    "Common": {"A:A":30, "B:E":10, "F:H":100,"I:K":10, "L:N":100},
+    "Definitions": {"A:A":12, "B:B":10, "C:C":150},
+    "Diagnostics": {"A:A":150},
+}
+# Formats whose content depends only on the analysis & options (html embeds the source path & the generation time)
+CACHED_OUTPUT_FORMATS = ["json", "xlsx"]
+
+class DictionaryError(Exception):
+    """ Raised when the data dictionary cannot be built (unsupported or invalid file, output that cannot be saved, ...). """
+
+class DictionaryOptions():
+    """ Settings of one call of the API.
+
+    - excel_with_layout: extra formatting (column widths, wrapping, header, filters) of excel sheets
+    - low_memory: release the openapi document as soon as the analysis is done
+    - summary_only: quick counting only (no full analysis, no output)
+    - cache: ContentCache reused for unchanged inputs (None: no cache)
+    - profiler: Profiler recording each stage (None: no profiling)
+    - logger: logger of the call (None: nothing logged)
+    - max_workers: number of threads writing output files & cache entries (None: one per output format)
+    - validate: structural validation of the document before analysis (errors raised as DictionaryError)
+    - compact: specs of fields & parameters written once in a Definitions sheet/section, rows referencing their ID
+    - spec_filter: SpecFilter selecting the operations analyzed (paths, tags, methods), schemas & parameters not reachable
+      from them being pruned before analysis (None: whole document)
+    - max_seconds / max_memory_mb: budget of the analysis (None: no limit). Once exhausted, the analysis stops expanding
+      schema references: the dictionary is partial (schemas flagged incomplete, skipped steps in diagnostics) & not cached
+    """
+    def __init__(self,
+                excel_with_layout:bool=True,
+                low_memory:bool=False,
+                summary_only:bool=False,
+                cache:ContentCache=None,
+                profiler:Profiler=None,
+                logger:ColorLogger=None,
+                max_workers:int=None,
+                validate:bool=True,
+                max_seconds:float=None,
+                max_memory_mb:float=None,
+                compact:bool=False,
+                spec_filter:SpecFilter=None
+                ):
+        self.excel_with_layout = excel_with_layout
+        self.low_memory = low_memory
+        self.summary_only = summary_only
+        self.cache = cache if cache is not None else ContentCache(CACHE_DIR, enabled=False)
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+        self.logger = logger if logger is not None else get_default_logger()
+        self.max_workers = max_workers
+        self.validate = validate
+        self.max_seconds = max_seconds
+        self.max_memory_mb = max_memory_mb
+        self.compact = compact
+        self.spec_filter = spec_filter if spec_filter is not None else SpecFilter()
+
+    def get_output_options(self, format:str) -> str:
+        """ Options changing the rendered output of a given format (part of the output cache key). """
+        output_options = [f"compact={self.compact}"] if self.compact else []
+        if format == "xlsx":
+            output_options.append(f"excel_with_layout={self.excel_with_layout}")
+        return ";".join(output_options)
+
+    def to_json(self, indent:int=None):
+        result = {
+            "excel_with_layout": self.excel_with_layout,
+            "low_memory": self.low_memory,
+            "summary_only": self.summary_only,
+            "cache": str(self.cache.cache_dir) if self.cache.enabled else None,
+            "profiler": self.profiler.enabled,
+            "logger": self.logger.name,
+            "max_workers": self.max_workers,
+            "validate": self.validate,
+            "max_seconds": self.max_seconds,
+            "max_memory_mb": self.max_memory_mb,
+            "compact": self.compact,
+            "spec_filter": str(self.spec_filter) if self.spec_filter.enabled else None
+        }
+        return json.dumps(result, indent=indent)
+
+class DictionaryResult():
+    """ Outcome of build_dictionary: analysis, summary counts & output files (per format). """
+    def __init__(self, source:Path, api_object:ApiObject, summary:dict[str,int], outfiles:dict[str,Path], cached_formats:list[str]):
+        self.source:Path = source
+        self.api_object:ApiObject = api_object
+        self.summary:dict[str,int] = summary
+        self.outfiles:dict[str,Path] = outfiles
+        self.cached_formats:list[str] = cached_formats      # formats copied from cache instead of being rendered
+
+    def to_dict(self):
+        to_return = {"source": str(self.source), "info": self.api_object.api_info, "summary": self.summary,
+                     "outfiles": {format: str(outfile) for format, outfile in self.outfiles.items()}, "cached_formats": self.cached_formats}
+        return to_return
+
+    def to_json(self, indent=None):
+        return json.dumps(self.to_dict(), indent=indent)
+
+def callback_format(value:str) -> list[str]:
+    """ Command line option of output format(s): comma separated list of formats, without duplicates (shared by all commands). """
+    import typer                # Only needed by command line interfaces
+    formats = []
+    for fmt in value.lower().split(","):
+        fmt = fmt.strip()
+        if fmt not in VALID_OUTPUT_FORMAT:
+            raise typer.BadParameter(f"Possible values for format are: {VALID_OUTPUT_FORMAT} (or a comma separated list of them)")
+        if fmt not in formats:
+            formats.append(fmt)
+    return formats
+
+def get_filetype(filename:Path) -> str:
+    filetype = os.path.splitext(filename)[1].lower()
+    if filetype not in VALID_OPENAPI_EXTENSIONS:
+        raise DictionaryError(f"Parameter file supports only following format: json, yml, yaml.")
+    return filetype
+
+def get_content_key(content:bytes, filetype:str) -> str:
+    """ Cache key of the content of a spec: the spec is hashed once per run, the keys of all cached layers derive from this one. """
+    return ContentCache.make_key(content, filetype)
+
+def get_analysis_key(content_key:str, options:DictionaryOptions) -> str:
+    """ Cache key of an analysis: content of the spec (get_content_key), version of the tool & options impacting the analysis. """
+    key = options.cache.make_key(content_key, "analysis", __version__, openapi_parsing.__version__)
+    if options.validate:        # analyses made without validation (or by another validator) are never served to a validated run
+        key = options.cache.make_key(key, "validated", openapi_validator.__version__)
+    if options.spec_filter.enabled:
+        key = options.cache.make_key(key, "filter", options.spec_filter.get_key())
+    return key
+
+def load_document(filename:Path, content:bytes=None, logger:ColorLogger=None) -> Any:
+    """ Load an openapi file (json or yaml). content: raw content of the file when already read. """
+    logger = logger or get_default_logger()
+    try:
+        filetype = get_filetype(filename)
+        if content is None:
+            with open(filename, "rb") as config_file:
+                content = config_file.read()
+        if filetype in VALID_JSON_EXTENSIONS:
+            f = json.loads(content.decode("UTF-8", errors="ignore"))
+        else:
+            import yaml
+            f = yaml.safe_load(content.decode("UTF-8", errors="ignore"))
+    except DictionaryError:
+        raise
+    except Exception as e:
+        raise DictionaryError(f"while loading file '{filename}': {str(e)}") from e
+    logger.log(LOGLEVEL_SUCCESS, f"File '{filename}' successfuly loaded")
+    return f
+
+def check_document(filename:Path, document:Any, logger:ColorLogger=None) -> None:
+    """ Structural validation of an openapi document: warnings are logged, errors raised (all at once) as DictionaryError. """
+    logger = logger or get_default_logger()
+    issues = validate_document(document)
+    errors = get_errors(issues)
+    for issue in issues:
+        if issue.severity != SEVERITY_ERROR:
+            logger.warning(f"Validation - {issue}")
+    if errors:
+        raise DictionaryError(f"Invalid openapi file '{filename}': {len(errors)} error(s)\n" + "\n".join(f"  - {error}" for error in errors))
+    logger.log(LOGLEVEL_SUCCESS, f"File '{filename}' successfuly validated")
+
+def get_document(filename:Path, options:DictionaryOptions=None, content:bytes=None, content_key:str=None) -> Any:
+    """ Loaded openapi document, from the cache when the same content was already loaded.
+
+    content_key: get_content_key of the content, when already computed by the caller.
+    """
+    options = options or DictionaryOptions()
+    logger, cache = options.logger, options.cache
+    if content is None:
+        with open(filename, "rb") as f:
+            content = f.read()
+    content_key = content_key or get_content_key(content, get_filetype(filename))
+    document_key = cache.make_key(content_key, "document", __version__)
+    data = cache.get("document", document_key)
+    if data:
+        logger.log(LOGLEVEL_SUCCESS, f"File '{filename}' retrieved from cache")
+        return pickle.loads(data)
+    api_content = load_document(filename, content, logger)
+    if cache.enabled:
+        cache.put("document", document_key, pickle.dumps(api_content, pickle.HIGHEST_PROTOCOL))
+    return api_content
+
+def select_document(filename:Path, api_content:Any, options:DictionaryOptions=None) -> Any:
+    """ Part of a (validated) document selected by the filter of the options: the document itself without filter. """
+    options = options or DictionaryOptions()
+    if not options.spec_filter.enabled or not isinstance(api_content, dict):
+        return api_content
+    api_content, counts = options.spec_filter.apply(api_content)
+    kept = ", ".join(f"{c['kept']}/{c['total']} {name}" for name, c in counts.items())
+    options.logger.log(LOGLEVEL_SUCCESS, f"File '{filename}' filtered ({options.spec_filter}): {kept} kept")
+    return api_content
+
+def get_schema_graph(filename:Path, options:DictionaryOptions=None, content:bytes=None) -> SchemaGraph:
+    """ Schema reachability graph of an openapi file, with its precomputed indexes (see schema_graph.py). """
+    options = options or DictionaryOptions()
+    api_content = get_document(filename, options, content)
+    if options.validate:
+        check_document(filename, api_content, options.logger)
+    return SchemaGraph(select_document(filename, api_content, options))
+
+def analyze(filename:Path, options:DictionaryOptions=None, content:bytes=None, document:Any=None, content_key:str=None) -> ApiObject:
+    """ Return the analysis of an openapi file, reusing cached layers (analysis, then loaded document) when available.
+
+    document: the file already loaded by the caller (get_document), used instead of loading it again.
+    content_key: get_content_key of the content, when already computed by the caller (the spec is then not hashed again).
+    """
+    options = options or DictionaryOptions()
+    logger, cache, profiler = options.logger, options.cache, options.profiler
+    if content is None:
+        with open(filename, "rb") as f:
+            content = f.read()
+    content_key = content_key or get_content_key(content, get_filetype(filename))
+    analysis_key = get_analysis_key(content_key, options)
+    with profiler.stage("load"):
+        data = cache.get("analysis", analysis_key)
+        if data:
+            api_object = pickle.loads(data)
+            api_object.logger = logger
+            logger.log(LOGLEVEL_SUCCESS, f"Analysis of '{filename}' retrieved from cache")
+            return api_object
+        api_content = document if document is not None else get_document(filename, options, content, content_key)
+    del content, document
+    if options.validate:
+        with profiler.stage("validation"):
+            check_document(filename, api_content, logger)
+    if options.spec_filter.enabled:
+        with profiler.stage("filter"):
+            api_content = select_document(filename, api_content, options)
+    # No reference kept on the loaded document: in low memory mode it can be released by ApiObject
+    with profiler.stage("analysis"):
+        budget = Budget(options.max_seconds, options.max_memory_mb)
+        api_object = ApiObject(api_content, logger=logger, low_memory=options.low_memory, profiler=profiler, budget=budget)
+        del api_content
+        if not options.summary_only:
+            api_object.parse()
+            if api_object.incomplete:
+                logger.warning(f"Analysis of '{filename}' incomplete ({budget.reason}): {len(api_object.diagnostics)} step(s) skipped - result not cached")
+            elif cache.enabled:
+                cache.put("analysis", analysis_key, pickle.dumps(api_object, pickle.HIGHEST_PROTOCOL))
+    return api_object
+
+def build_html_table(title:str, df:"pd.DataFrame") -> str:
+    div_header =  f"""<div class="accordion-item">
+        <h2 class="accordion-header" id="{title}">
+          <button class="accordion-button collapsed" type="button" data-bs-toggle="collapse" data-bs-target="#collapse{title}" aria-expanded="false" aria-controls="collapse{title}">
+            {title}
+          </button>
+        </h2>
+        <div id="collapse{title}" class="accordion-collapse collapse" aria-labelledby="{title}" data-bs-parent="#accordion_openapi">
+          <div class="accordion-body">
+    """
+    html_tbl = df.to_html(index=False, classes='table table-striped table-sm table-hover text-left', justify="left")
+    html_tbl = html_tbl.replace("\\n","<br>")
+    html_tbl = html_tbl.replace('<thead>', '<thead class="table-primary", style="vertical-align: middle">')
+    html_tbl = html_tbl.replace('<tbody>', '<tbody class="table-group-divider">')
+    result = div_header + html_tbl + "</div></div></div>"
+    return result
+
+def render_html_page(heading:str, title:str, header:dict[str,str], df_dict:dict[str,"pd.DataFrame"]) -> bytes:
+    """ Bootstrap page with a heading, header lines ('label: value') followed by one collapsible table per dataframe. """
+    header_lines = "\n    ".join([f"<article><strong>{label}: </strong>{value}</article>" for label, value in header.items()])
+    html_top = f"""
+<!doctype html>
+<html lang="en">
+<head>
+    <!-- Required meta tags -->
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
+    <!-- Optional meta tags -->
+    <meta name="description" content="Data Dictionary from openapi">
+    <meta name="author" content="{__author__}">
+    <meta name="generator" content="Python script">
+
+    <!-- Bootstrap CSS -->
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.2.2/dist/css/bootstrap.min.css" rel="stylesheet" integrity="sha384-Zenh87qX5JnK2Jl0vWa8Ck2rdkQ2Bzep5IDxbcnCeuOxjzrPF/et3URy9Bv1WTRi" crossorigin="anonymous">
+
+    <title>{title}</title>
+</head>
+<body>
+    <h1>{heading}</h1>
+    <div style="margin: 2rem;">
+    <hr>
+    {header_lines}
+    <article><strong>Generated on: </strong>{datetime.datetime.now()}</article>
+    <hr>
+    <div class="accordion" id="accordion_openapi">
+    """
+    html_end = f"""
+    </div>
+    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.2.2/dist/js/bootstrap.min.js" integrity="sha384-IDwe1+LCz02ROU9k972gdyvl+AESN10+x7tBKgc9I5HFtuNz0wWnPclzo6p9vxnk" crossorigin="anonymous"></script>
+</body>
+</html>
+    """
+    html = [html_top]
+    for table_title, df in df_dict.items():
+        html.append(build_html_table(table_title, df))
+    html.append(html_end)
+    return "".join(html).encode()
+
+def render_html(tables:ApiTables, source:Path) -> bytes:
+    df_dict = {
+        "Parameters": tables.params.to_dataframe(),
+        "Fields": tables.fields.to_dataframe(),
+        "Common": tables.common.to_dataframe()
+        }
+    header = {"Source": os.path.abspath(source)}
+    if tables.compact:
+        df_dict["Definitions"] = tables.definitions_table.to_dataframe()
+    if tables.diagnostics:
+        df_dict["Diagnostics"] = tables.get_diagnostics_dataframe()
+        header["Incomplete analysis"] = f"{len(tables.diagnostics)} step(s) skipped (see Diagnostics)"
+    return render_html_page("Data Dictionary", f"Data Dictionary - {os.path.basename(source)}", header, df_dict)
+
+def render_json(tables:ApiTables) -> bytes:
+    return json.dumps(tables.to_dict(), indent=4).encode()
+
+def render_xlsx(tables:ApiTables, excel_with_layout:bool=True, logger:ColorLogger=None) -> bytes:
+    df_dict = {
+        "Schemas": tables.schemas.to_dataframe(),
+        "Parameters": tables.params.to_dataframe(),
+        "Fields": tables.fields.to_dataframe(),
+        "Common": tables.common.to_dataframe()
+        }
+    if tables.compact:
+        df_dict["Definitions"] = tables.definitions_table.to_dataframe()
+    if tables.diagnostics:
+        df_dict["Diagnostics"] = tables.get_diagnostics_dataframe()
+    return render_xlsx_sheets(df_dict, XLSX_LAYOUT if excel_with_layout else None, logger)
+
+def render_xlsx_sheets(df_dict:dict[str,"pd.DataFrame"], layout:dict[str,dict]=None, logger:ColorLogger=None) -> bytes:
+    """ Excel workbook with one sheet per dataframe. layout: column widths per sheet (None: no extra formatting). """
+    import pandas as pd
+    logger = logger or get_default_logger()
+    buffer = io.BytesIO()
+    writer = pd.ExcelWriter(buffer, engine= "xlsxwriter")
+    for title, df in df_dict.items():
+        df.to_excel(writer, index=False, sheet_name=title, freeze_panes=(1,1))
+        if layout:
+            try:
+                xls_formatting(writer=writer, sheet_name=title, column_names=df.columns.values, settings=layout[title])
+            except Exception as e:
+                logger.error(f"Cannot customize sheet '{title}'")
+                logger.error(f"{str(e)}")
+            else:
+                logger.log(LOGLEVEL_SUCCESS,f"Extra layout/formatting applied on sheet '{title}'")
+    writer.close()
+    return buffer.getvalue()
+
+def xls_formatting(writer:"pd.ExcelWriter", sheet_name:str, column_names:list[str], settings:dict[str,str]) -> None:
+    wb = writer.book
+    ws = writer.sheets[sheet_name]
+
+    fmt_cells = wb.add_format({"text_wrap": True, "valign": "top"})
+    for k, v in settings.items():
+        ws.set_column(k,v,fmt_cells)
+    # ws.autofilter('A1:H1')
+    ws.autofilter(0,0,0,len(column_names)-1)
+
+    fmt_header = wb.add_format({
+    "bold": True,
+    "text_wrap": True,
+    "valign": "top",
+    "fg_color": "#4F81BD",
+    "font_color": "#FFFFFF",
+    "border": 1})
+    for col , value in enumerate(column_names):
+        ws.write(0, col, value, fmt_header)
+
+def render_output(api_object:ApiObject, format:str, source:Path, options:DictionaryOptions=None) -> bytes:
+    """ Content of the data dictionary in one output format (xlsx, html or json). """
+    options = options or DictionaryOptions()
+    tables = get_tables(api_object, options.compact)
+    if format == "xlsx":
+        return render_xlsx(tables, options.excel_with_layout, options.logger)
+    elif format == "html":
+        return render_html(tables, source)
+    elif format == "json":
+        return render_json(tables)
+    raise DictionaryError(f"Possible values for format are: {VALID_OUTPUT_FORMAT}")
+
+def write_outputs(api_object:ApiObject, outfiles:dict[str,Path], source:Path, options:DictionaryOptions=None, analysis_key:str=None) -> list[str]:
+    """ Save the data dictionary in each requested format (format -> output file). Return formats copied from cache.
+
+    json & xlsx outputs already rendered for the same analysis (analysis_key) & options are copied from cache (html is always
+    rendered: it holds the source path & generation time). Other formats are rendered one after another from the same
+    tables & dataframes, their files being written in the background while the next format is rendered.
+    """
+    options = options or DictionaryOptions()
+    logger, cache, profiler = options.logger, options.cache, options.profiler
+    for format in outfiles:
+        if format not in VALID_OUTPUT_FORMAT:
+            raise DictionaryError(f"Possible values for format are: {VALID_OUTPUT_FORMAT}")
+    output_keys = {}
+    cached_formats = []
+    pending = []
+    for format in outfiles:
+        if analysis_key and format in CACHED_OUTPUT_FORMATS:
+            output_keys[format] = cache.make_key(analysis_key, "output", format, dictionary_tables.__version__, options.get_output_options(format))
+            if cache.get_file("output", output_keys[format], outfiles[format]):
+                logger.log(LOGLEVEL_SUCCESS,f"Result retrieved from cache and saved to file: '{outfiles[format]}'")
+                cached_formats.append(format)
+                continue
+        pending.append(format)
+    if not pending:
+        return cached_formats
+
+    # Build tables only once, then share them between all requested writers
+    with profiler.stage("tables"):
+        tables = get_tables(api_object, options.compact)
+    if "xlsx" in pending or "html" in pending:
+        with profiler.stage("dataframes"):
+            for table in (tables.schemas, tables.params, tables.fields, tables.common, tables.definitions_table):
+                if table is not None:
+                    table.to_dataframe()
+
+    def save_result(format:str, data:bytes) -> None:
+        with open(outfiles[format], "wb") as f:
+            f.write(data)
+        if format in output_keys and not api_object.incomplete:
+            cache.put("output", output_keys[format], data)
+
+    # Rendering is CPU bound (writers in threads would only contend for the GIL): formats are rendered one after another,
+    # while the files & cache entries of the formats already rendered are written in background threads
+    errors = {}
+    futures = {}
+    with ThreadPoolExecutor(max_workers=options.max_workers or len(pending)) as executor:
+        for format in pending:
+            try:
+                with profiler.stage(f"render:{format}"):
+                    data = render_output(api_object, format, source, options)
+            except Exception as e:
+                errors[format] = e
+                continue
+            futures[format] = executor.submit(save_result, format, data)
+            del data
+    for format, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            errors[format] = e
+    for format in pending:
+        if format not in errors:
+            logger.log(LOGLEVEL_SUCCESS,f"Result saved to file: '{outfiles[format]}'")
+    if errors:
+        raise DictionaryError("\n".join(f"Cannot save result to file '{outfiles[format]}': {str(errors[format])}" for format in pending if format in errors))
+    return cached_formats
+
+def build_dictionary(source:Path, formats:list[str]=["xlsx"], options:DictionaryOptions=None, outdir:Path=None, outfile:Path=None) -> DictionaryResult:
+    """ Analyze an openapi file & save its data dictionary in each requested format.
+
+    Output files are named after the source file (new extension per format), in outdir (default: directory of the source),
+    or after outfile when given (its extension is replaced per format). With options.summary_only, or without any format,
+    only the summary is computed. The content of the source is hashed once: cache keys of all layers derive from it.
+    """
+    options = options or DictionaryOptions()
+    with open(source, "rb") as f:
+        content = f.read()
+    content_key = get_content_key(content, get_filetype(source))
+    api_object = analyze(source, options, content, content_key=content_key)
+    del content
+    with options.profiler.stage("summary"):
+        summary = api_object.get_summary()
+    outfiles = {}
+    cached_formats = []
+    if formats and not options.summary_only:
+        if outfile:
+            outdir = os.path.dirname(os.path.abspath(outfile))
+            filename, file_ext = os.path.splitext(os.path.basename(outfile))
+            if file_ext[1:] not in formats:
+                options.logger.warning(f"Outfile extension '{file_ext}' doesn't correspond to requested output format '.{formats[0]}': '{filename}.{formats[0]}' used instead")
+        else:
+            outdir = outdir or os.path.dirname(os.path.abspath(source))
+            filename, _ = os.path.splitext(os.path.basename(source))
+        try:
+            os.makedirs(outdir, exist_ok=True)
+        except OSError as e:
+            raise DictionaryError(f"Unable to create output directory '{outdir}': {str(e)}") from e
+        outfiles = {format: os.path.join(outdir, filename + "." + format) for format in formats}
+        cached_formats = write_outputs(api_object, outfiles, source, options, get_analysis_key(content_key, options))
+    return DictionaryResult(source, api_object, summary, outfiles, cached_formats)
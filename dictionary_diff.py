@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'api_data_dictionary_diff'
+__version__ = '1.0.0'
+
+'''
+Changes between the data dictionaries of two versions of an openapi file (python main.py diff old.yaml new.yaml).
+
+Entities (schemas, parameters, fields) are matched by name and compared through their structural fingerprint, computed once
+per analysis and cached with it: unchanged entities cost one string comparison, attributes are compared one by one only for
+entities whose fingerprint differs.
+'''
+
+# Standard Python Modules
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, TYPE_CHECKING
+
+# External Python Modules
+import typer
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Personal Python Modules
+from params import *
+from utils.coloredlog import ColorLogger, get_logger
+from utils.cache import ContentCache
+from openapi_parsing import ApiObject, canonical_json
+from dictionary_tables import bullet_list
+from data_dictionary import DictionaryError, DictionaryOptions, analyze, callback_format, render_html_page, render_xlsx_sheets
+
+# Entity type -> attribute of ApiObject holding entities per name
+ENTITY_DICTS = {"Schemas": "schemas_dict", "Parameters": "param_dict", "Fields": "request_fields_dict"}
+CHANGE_ADDED = "added"
+CHANGE_REMOVED = "removed"
+CHANGE_CHANGED = "changed"
+CHANGE_COLUMNS = ["Entity", "Name", "Change", "Attribute", "Before", "After"]
+XLSX_LAYOUT = {
+    "Summary": {"A:A":15, "B:E":12},
+    "Changes": {"A:A":12, "B:B":40, "C:C":10, "D:D":15, "E:F":100},
+}
+
+class EntityChange():
+    """ One added, removed or changed entity. For a changed entity, attributes gives per attribute:
+    {"removed": [...], "added": [...]} for lists of values, {"old": value, "new": value} otherwise.
+    """
+    def __init__(self, entity_type:str, name:str, change:str, attributes:dict[str,dict]=None):
+        self.entity_type:str = entity_type
+        self.name:str = name
+        self.change:str = change
+        self.attributes:dict[str,dict] = attributes or {}
+
+    def __str__(self):
+        return f"{self.entity_type} '{self.name}' {self.change}"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def get_rows(self) -> list[list[str]]:
+        """ Rows of the change report: one per changed attribute (or a single row for an added/removed entity). """
+        if not self.attributes:
+            return [[self.entity_type, self.name, self.change, "", "", ""]]
+        rows = []
+        for attribute, detail in self.attributes.items():
+            if "old" in detail:
+                before, after = format_value(detail["old"]), format_value(detail["new"])
+            else:
+                before = bullet_list([format_value(v) for v in detail["removed"]])
+                after = bullet_list([format_value(v) for v in detail["added"]])
+            rows.append([self.entity_type, self.name, self.change, attribute, before, after])
+        return rows
+
+    def to_dict(self):
+        to_return = {"entity_type": self.entity_type, "name": self.name, "change": self.change}
+        if self.attributes:
+            to_return["attributes"] = self.attributes
+        return to_return
+
+class DictionaryDiff():
+    def __init__(self, old_source:str, new_source:str):
+        self.old_source:str = old_source
+        self.new_source:str = new_source
+        self.changes:list[EntityChange] = []
+        self.counts:dict[str,dict[str,int]] = {}
+
+    def has_changes(self) -> bool:
+        return bool(self.changes)
+
+    def get_summary_rows(self) -> list[list]:
+        return [[entity_type, c[CHANGE_ADDED], c[CHANGE_REMOVED], c[CHANGE_CHANGED], c["unchanged"]] for entity_type, c in self.counts.items()]
+
+    def to_dataframes(self) -> dict[str,"pd.DataFrame"]:
+        import pandas as pd
+        rows = [row for change in self.changes for row in change.get_rows()]
+        return {
+            "Summary": pd.DataFrame(self.get_summary_rows(), columns=["Entity", "Added", "Removed", "Changed", "Unchanged"]),
+            "Changes": pd.DataFrame(rows, columns=CHANGE_COLUMNS),
+        }
+
+    def to_dict(self):
+        to_return = {"old": self.old_source, "new": self.new_source, "summary": self.counts, "changes": [change.to_dict() for change in self.changes]}
+        return to_return
+
+    def to_json(self, indent=None):
+        return json.dumps(self.to_dict(), indent=indent, default=str)
+
+    def render(self, format:str, excel_with_layout:bool=True, logger:ColorLogger=None) -> bytes:
+        """ Change report as json, html or xlsx content. """
+        if format == "json":
+            return self.to_json(indent=4).encode()
+        if format == "html":
+            header = {"Old version": os.path.abspath(self.old_source), "New version": os.path.abspath(self.new_source)}
+            return render_html_page("Data Dictionary Changes", f"Data Dictionary Changes - {os.path.basename(self.new_source)}", header, self.to_dataframes())
+        if format == "xlsx":
+            return render_xlsx_sheets(self.to_dataframes(), XLSX_LAYOUT if excel_with_layout else None, logger)
+        raise DictionaryError(f"Possible values for format are: {VALID_OUTPUT_FORMAT}")
+
+def format_value(value:Any) -> str:
+    return value if isinstance(value, str) else canonical_json(value)
+
+def compare_attributes(old:dict, new:dict) -> dict[str,dict]:
+    """ Attributes differing between two entity dictionaries (lists compared as sets of values). """
+    attributes = {}
+    for attribute in list(old) + [k for k in new if k not in old]:
+        old_value, new_value = old.get(attribute), new.get(attribute)
+        if old_value == new_value:
+            continue
+        if isinstance(old_value, list) and isinstance(new_value, list):
+            old_items = {canonical_json(v): v for v in old_value}
+            new_items = {canonical_json(v): v for v in new_value}
+            removed = [v for k, v in old_items.items() if k not in new_items]
+            added = [v for k, v in new_items.items() if k not in old_items]
+            if removed or added:
+                attributes[attribute] = {"removed": removed, "added": added}
+        else:
+            attributes[attribute] = {"old": old_value, "new": new_value}
+    return attributes
+
+def diff_objects(old:ApiObject, new:ApiObject, old_source:str="old", new_source:str="new") -> DictionaryDiff:
+    """ Changes between two analyses: entities matched by name, deep comparison only when their fingerprints differ. """
+    result = DictionaryDiff(old_source, new_source)
+    for entity_type, dict_name in ENTITY_DICTS.items():
+        old_entities, new_entities = getattr(old, dict_name), getattr(new, dict_name)
+        old_fingerprints, new_fingerprints = old.get_fingerprints()[dict_name], new.get_fingerprints()[dict_name]
+        counts = {CHANGE_ADDED: 0, CHANGE_REMOVED: 0, CHANGE_CHANGED: 0, "unchanged": 0}
+        for name in sorted(old_entities.keys() - new_entities.keys()):
+            result.changes.append(EntityChange(entity_type, name, CHANGE_REMOVED))
+            counts[CHANGE_REMOVED] += 1
+        for name in sorted(new_entities.keys() - old_entities.keys()):
+            result.changes.append(EntityChange(entity_type, name, CHANGE_ADDED))
+            counts[CHANGE_ADDED] += 1
+        for name in sorted(old_entities.keys() & new_entities.keys()):
+            if old_fingerprints[name] == new_fingerprints[name]:
+                counts["unchanged"] += 1
+                continue
+            old_entity, new_entity = old_entities[name], new_entities[name]
+            attributes = compare_attributes(old_entity.to_dict(deterministic=True), new_entity.to_dict(deterministic=True))
+            result.changes.append(EntityChange(entity_type, name, CHANGE_CHANGED, attributes))
+            counts[CHANGE_CHANGED] += 1
+        result.counts[entity_type] = counts
+    return result
+
+def diff_files(old_file:Path, new_file:Path, options:DictionaryOptions=None) -> DictionaryDiff:
+    """ Changes between the data dictionaries of two openapi files (analyses reused from cache when available). """
+    options = options or DictionaryOptions()
+    old = analyze(old_file, options)
+    new = analyze(new_file, options)
+    return diff_objects(old, new, str(old_file), str(new_file))
+
+def report_diff(result:DictionaryDiff) -> None:
+    sep = '-'*15
+    print()
+    print(f"{sep} Changes between versions {sep}")
+    print(f"- Old: {result.old_source}")
+    print(f"- New: {result.new_source}")
+    for entity_type, counts in result.counts.items():
+        print(f"- {entity_type}: {counts[CHANGE_ADDED]} added, {counts[CHANGE_REMOVED]} removed, {counts[CHANGE_CHANGED]} changed, {counts['unchanged']} unchanged")
+    print (sep*4)
+    print()
+
+def diff(old_file:Path = typer.Argument(..., exists=True, readable=True, resolve_path=True, show_default=False, help="openapi file of the old version"),
+        new_file:Path = typer.Argument(..., exists=True, readable=True, resolve_path=True, show_default=False, help="openapi file of the new version"),
+        format:str = typer.Option("json", "--format", "-f", help="Format(s) of the change report: xlsx, html, json (comma separated list)", callback=callback_format),
+        outdir:Path = typer.Option(None, "--outdir", "-d", file_okay=False, resolve_path=True, show_default="Same directory as new_file", help="Location of the change report"),
+        excel_with_layout:bool = typer.Option(True, help="Do exta-formatting on excel sheets"),
+        validate:bool = typer.Option(True, "--validate/--no-validate", help="Check the structure of both openapi files before analysis"),
+        use_cache:bool = typer.Option(True, "--cache/--no-cache", help="Reuse analyses cached for unchanged openapi files"),
+        debug:bool = typer.Option(False, help="Enable debug mode on the console"),
+        ) -> None:
+    logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_SUCCESS if debug else logging.ERROR, success_level=LOGLEVEL_SUCCESS)
+    cache = ContentCache(CACHE_DIR, max_size=CACHE_MAX_SIZE_MB*1024*1024, enabled=use_cache)
+    options = DictionaryOptions(excel_with_layout=excel_with_layout, cache=cache, logger=logger, validate=validate)
+    try:
+        result = diff_files(old_file, new_file, options)
+    except DictionaryError as e:
+        for line in str(e).splitlines():
+            logger.error(line)
+        raise typer.Exit(code=1)
+    report_diff(result)
+    outdir = outdir or new_file.parent
+    os.makedirs(outdir, exist_ok=True)
+    for fmt in format:
+        outfile = os.path.join(outdir, f"{old_file.stem}_vs_{new_file.stem}_diff.{fmt}")
+        with open(outfile, "wb") as f:
+            f.write(result.render(fmt, excel_with_layout, logger))
+        print(f"Change report saved to file: '{outfile}'")
+
+if __name__ == "__main__":
+    typer.run(diff)
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'api_data_dictionary_server'
+__version__ = '1.0.0'
+
+'''
+Local HTTP service generating data dictionaries on demand (python main.py serve).
+
+Routes:
+    POST /dictionary?format=json&filename=spec.yaml     body: content of the openapi file
+    GET  /dictionary?format=html&path=specs/spec.yaml   file read on the server (relative to --root)
+    GET  /metrics                                       request latencies, cache hits/misses
+    GET  /health
+
+The event loop only parses requests & sends responses: loading, analysis & rendering run in a bounded pool of worker threads.
+Loaded documents & analyses are kept in bounded in-memory caches keyed by the hash of the file content.
+'''
+
+# Standard Python Modules
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+# External Python Modules
+import typer
+
+# Personal Python Modules
+from params import *
+from utils.coloredlog import ColorLogger, get_logger
+from utils.cache import ContentCache
+from utils.budget import Budget
+from openapi_parsing import ApiObject
+from data_dictionary import DictionaryError, DictionaryOptions, check_document, get_filetype, load_document, render_output
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "html": "text/html; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+LATENCY_WINDOW = 1000           # number of latest requests per route used for latency percentiles
+
+class HttpError(Exception):
+    def __init__(self, status:int, message:str):
+        super().__init__(message)
+        self.status = status
+
+class MemoryCache():
+    """ Thread safe LRU cache bounded by number of entries. """
+    def __init__(self, max_entries:int=32):
+        self.max_entries:int = max_entries
+        self.hits:int = 0
+        self.misses:int = 0
+        self._entries:OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key:str) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key:str, value:Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def to_dict(self):
+        to_return = {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+        return to_return
+
+class Metrics():
+    """ Request counters & latencies per route. """
+    def __init__(self):
+        self.started:float = time.time()
+        self.requests:dict[str,int] = {}
+        self.errors:dict[str,int] = {}
+        self.latencies:dict[str,deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route:str, status:int, latency:float) -> None:
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            if status >= 400:
+                self.errors[route] = self.errors.get(route, 0) + 1
+            self.latencies.setdefault(route, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def to_dict(self):
+        routes = {}
+        with self._lock:
+            for route, count in self.requests.items():
+                latencies = sorted(self.latencies[route])
+                routes[route] = {
+                    "requests": count,
+                    "errors": self.errors.get(route, 0),
+                    "latency_mean": sum(latencies) / len(latencies),
+                    "latency_p50": latencies[int(0.50 * (len(latencies) - 1))],
+                    "latency_p95": latencies[int(0.95 * (len(latencies) - 1))],
+                    "latency_max": latencies[-1],
+                }
+        return {"uptime": time.time() - self.started, "routes": routes}
+
+class DictionaryServer():
+    """ asyncio HTTP server rendering data dictionaries in a pool of worker threads, with warm in-memory caches. """
+    def __init__(self, host:str="127.0.0.1", port:int=8000, workers:int=4, root:Path=".", max_entries:int=32,
+                 max_body_size:int=50*1024*1024, max_seconds:float=None, logger:ColorLogger=None):
+        self.host:str = host
+        self.port:int = port
+        self.root:str = os.path.abspath(root)
+        self.max_body_size:int = max_body_size
+        self.max_seconds:float = max_seconds           # time budget of one analysis (partial analyses are not kept in memory)
+        self.logger = logger if logger is not None else get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_DISABLE)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dictionary")
+        self.documents = MemoryCache(max_entries)
+        self.analyses = MemoryCache(max_entries)
+        self.metrics = Metrics()
+
+    def get_analysis(self, filename:str, content:bytes) -> ApiObject:
+        """ Analysis of an openapi file, from the in-memory caches when the same content was already processed. """
+        filetype = get_filetype(filename)
+        key = ContentCache.make_key(content, filetype)
+        api_object = self.analyses.get(key)
+        if api_object is None:
+            document = self.documents.get(key)
+            if document is None:
+                document = load_document(filename, content, self.logger)
+                check_document(filename, document, self.logger)
+                self.documents.put(key, document)
+            api_object = ApiObject(document, logger=self.logger, budget=Budget(max_seconds=self.max_seconds))
+            api_object.parse()
+            if api_object.incomplete:
+                self.logger.warning(f"Analysis of '{filename}' incomplete ({api_object.budget.reason})")
+            else:
+                self.analyses.put(key, api_object)
+        return api_object
+
+    def render(self, filename:str, content:bytes, format:str, excel_with_layout:bool) -> bytes:
+        """ Blocking part of a request (executed in a worker thread). """
+        if content is None:
+            path = os.path.abspath(os.path.join(self.root, filename))
+            if os.path.commonpath([self.root, path]) != self.root:
+                raise HttpError(403, f"path must be located in '{self.root}'")
+            if not os.path.isfile(path):
+                raise HttpError(404, f"file not found: '{filename}'")
+            with open(path, "rb") as f:
+                content = f.read()
+        api_object = self.get_analysis(filename, content)
+        options = DictionaryOptions(excel_with_layout=excel_with_layout, logger=self.logger)
+        return render_output(api_object, format, filename, options)
+
+    async def handle_dictionary(self, method:str, query:dict[str,str], body:bytes) -> tuple[int, str, bytes]:
+        format = query.get("format", "json")
+        if format not in VALID_OUTPUT_FORMAT:
+            raise HttpError(400, f"Possible values for format are: {VALID_OUTPUT_FORMAT}")
+        excel_with_layout = query.get("layout", "true").lower() not in ("0", "false", "no")
+        if method == "POST":
+            filename = query.get("filename", "spec.json")
+            content = body
+        elif method == "GET":
+            if "path" not in query:
+                raise HttpError(400, "parameter 'path' is required (or POST the content of the file)")
+            filename = query["path"]
+            content = None
+        else:
+            raise HttpError(405, f"method {method} not allowed")
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self.executor, self.render, filename, content, format, excel_with_layout)
+        return 200, CONTENT_TYPES[format], data
+
+    async def dispatch(self, method:str, target:str, body:bytes) -> tuple[str, int, str, bytes]:
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        route = url.path
+        try:
+            if route == "/dictionary":
+                status, content_type, data = await self.handle_dictionary(method, query, body)
+            elif route == "/metrics":
+                metrics = self.metrics.to_dict()
+                metrics["caches"] = {"documents": self.documents.to_dict(), "analyses": self.analyses.to_dict()}
+                status, content_type, data = 200, CONTENT_TYPES["json"], json.dumps(metrics, indent=4).encode()
+            elif route == "/health":
+                status, content_type, data = 200, CONTENT_TYPES["json"], b'{"status": "ok"}'
+            else:
+                route = "*"
+                raise HttpError(404, f"unknown route '{url.path}'")
+        except HttpError as e:
+            status, content_type, data = e.status, CONTENT_TYPES["json"], json.dumps({"error": str(e)}).encode()
+        except DictionaryError as e:
+            status, content_type, data = 400, CONTENT_TYPES["json"], json.dumps({"error": str(e)}).encode()
+        except Exception as e:
+            self.logger.error(f"{method} {target}: {str(e)}")
+            status, content_type, data = 500, CONTENT_TYPES["json"], json.dumps({"error": str(e)}).encode()
+        return route, status, content_type, data
+
+    async def read_request(self, reader:asyncio.StreamReader) -> tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "malformed request line")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HttpError(400, "invalid Content-Length header")
+        if length < 0:
+            raise HttpError(400, "invalid Content-Length header")
+        if length > self.max_body_size:
+            raise HttpError(413, f"request body larger than {self.max_body_size} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, body
+
+    async def handle_connection(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        start = time.perf_counter()
+        route, method, target = "*", "-", "-"
+        try:
+            request = await self.read_request(reader)
+            if request is None:
+                writer.close()
+                return
+            method, target, body = request
+            route, status, content_type, data = await self.dispatch(method, target, body)
+        except HttpError as e:
+            status, content_type, data = e.status, CONTENT_TYPES["json"], json.dumps({"error": str(e)}).encode()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        headers = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}", f"Content-Type: {content_type}",
+                   f"Content-Length: {len(data)}", "Connection: close"]
+        if content_type == CONTENT_TYPES["xlsx"]:
+            headers.append('Content-Disposition: attachment; filename="dictionary.xlsx"')
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+        latency = time.perf_counter() - start
+        self.metrics.record(route, status, latency)
+        self.logger.info(f"{method} {target} - {status} - {latency*1000:.1f} ms")
+
+    def warm_up(self) -> None:
+        """ Import heavy modules once at start, so that the first request does not pay for them. """
+        import pandas
+        import yaml
+
+    async def run(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.warm_up)
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.logger.log(LOGLEVEL_SUCCESS, f"Serving data dictionaries on http://{self.host}:{self.port} (root: '{self.root}')")
+        async with server:
+            await server.serve_forever()
+
+def serve(host:str = typer.Option("127.0.0.1", help="Interface to listen on (localhost only by default)"),
+        port:int = typer.Option(8000, "--port", "-p", help="Port to listen on"),
+        workers:int = typer.Option(4, "--workers", "-w", help="Number of worker threads loading, analyzing & rendering specs"),
+        root:Path = typer.Option(".", exists=True, file_okay=False, resolve_path=True, help="Directory of the files that can be requested by path"),
+        cache_entries:int = typer.Option(32, "--cache-entries", help="Maximum number of documents & analyses kept in memory"),
+        max_body_size:int = typer.Option(50, "--max-body-size", help="Maximum size in MB of an uploaded spec"),
+        max_seconds:float = typer.Option(None, "--max-seconds", help="Time budget of one analysis: once exceeded, a partial dictionary is returned"),
+        debug:bool = typer.Option(True, help="Log each request on the console"),
+        ) -> None:
+    logger = get_logger(logger_name=__appname__, console_loglevel=logging.INFO if debug else LOGLEVEL_SUCCESS, success_level=LOGLEVEL_SUCCESS)
+    server = DictionaryServer(host=host, port=port, workers=workers, root=root, max_entries=cache_entries,
+                              max_body_size=max_body_size*1024*1024, max_seconds=max_seconds, logger=logger)
+    try:
+        asyncio.run(server.run())
+    except KeyboardInterrupt:
+        logger.log(LOGLEVEL_SUCCESS, "Server stopped")
+
+if __name__ == "__main__":
+    typer.run(serve)
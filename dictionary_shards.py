@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'api_data_dictionary_shards'
+__version__ = '1.0.0'
+
+'''
+One data dictionary per tag of an openapi file (python main.py shards spec.yaml -f xlsx,html), plus an index page.
+
+The tag index is built in one walk of the paths: tag -> operations -> paths, then the schemas reachable from these operations
+(schema_graph) and the parameters & fields associated to these paths or schemas. Each shard is the analysis restricted to the
+entities of its tag (ApiObject.subset), rendered by the usual writers. Shards are rendered in a pool of processes, each worker
+receiving the analysis & the index once.
+'''
+
+# Standard Python Modules
+import html
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# External Python Modules
+import typer
+
+# Personal Python Modules
+from params import *
+from utils.coloredlog import get_logger
+from utils.cache import ContentCache
+from openapi_parsing import ApiObject
+from openapi_validator import HTTP_METHODS
+from schema_graph import SchemaGraph
+from data_dictionary import DictionaryError, DictionaryOptions, analyze, callback_format, get_content_key, get_document, get_filetype, render_output, select_document
+
+UNTAGGED = "untagged"           # tag of operations without tags
+
+class TagShard():
+    """ Operations of one tag & entities of the data dictionary they use. """
+    def __init__(self, tag:str, slug:str):
+        self.tag:str = tag
+        self.slug:str = slug                    # part of the output file names
+        self.operations:list[str] = []
+        self.paths:set[str] = set()
+        self.schemas:set[str] = set()
+        self.params:set[str] = set()
+        self.fields:set[str] = set()
+
+    def __str__(self):
+        return self.tag
+
+    def __repr__(self):
+        return self.__str__()
+
+    def get_counts(self) -> dict[str,int]:
+        return {"operations": len(self.operations), "schemas": len(self.schemas), "parameters": len(self.params), "fields": len(self.fields)}
+
+    def to_dict(self):
+        to_return = {"tag": self.tag, "slug": self.slug, "operations": self.operations, "schemas": sorted(self.schemas),
+                     "parameters": sorted(self.params), "fields": sorted(self.fields)}
+        return to_return
+
+class TagIndex():
+    """ tag -> operations -> schemas, parameters & fields, built from the document, its analysis & its schema graph. """
+    def __init__(self, api_content:dict, api_object:ApiObject, schema_graph:SchemaGraph):
+        self.shards:dict[str,TagShard] = {}
+        operations_per_tag:dict[str,list[str]] = {}
+        paths = api_content.get("paths",{})
+        for path, path_item in (paths.items() if isinstance(paths, dict) else []):
+            if not isinstance(path_item, dict):
+                continue
+            for method in HTTP_METHODS:
+                operation = path_item.get(method)
+                if not isinstance(operation, dict):
+                    continue
+                tags = [tag for tag in operation.get("tags") or [] if isinstance(tag, str)] or [UNTAGGED]
+                for tag in dict.fromkeys(tags):
+                    operations_per_tag.setdefault(tag, []).append(f"{method.upper()} {path}")
+        # path -> entities associated to it by the analysis
+        path_params = invert_paths(api_object.param_dict)
+        path_fields = invert_paths(api_object.request_fields_dict)
+        path_schemas = invert_paths(api_object.schemas_dict)
+        slugs = set()
+        for tag in sorted(operations_per_tag):
+            shard = self.shards[tag] = TagShard(tag, get_slug(tag, slugs))
+            for operation in operations_per_tag[tag]:
+                path = operation.partition(" ")[2]
+                shard.operations.append(operation)
+                shard.paths.add(path)
+                shard.schemas.update(schema_graph.schemas_reachable_from(operation))
+            for path in shard.paths:
+                shard.params.update(path_params.get(path, ()))
+                shard.fields.update(path_fields.get(path, ()))
+                shard.schemas.update(path_schemas.get(path, ()))
+            shard.schemas.intersection_update(api_object.schemas_dict)
+            for schema in shard.schemas:
+                shard.fields.update(api_object.schemas_dict[schema].fields)
+
+    def get_shard(self, tag:str) -> TagShard:
+        if tag not in self.shards:
+            raise KeyError(f"unknown tag '{tag}' (possible values: {', '.join(self.shards)})")
+        return self.shards[tag]
+
+    def to_dict(self):
+        return {tag: shard.to_dict() for tag, shard in self.shards.items()}
+
+    def to_json(self, indent=None):
+        return json.dumps(self.to_dict(), indent=indent)
+
+def invert_paths(entities:dict) -> dict[str,set[str]]:
+    """ path -> names of the entities (parameters, fields, schemas) associated to this path. """
+    inverted = {}
+    for name, entity in entities.items():
+        for path in entity.paths:
+            inverted.setdefault(path, set()).add(name)
+    return inverted
+
+def get_slug(tag:str, used:set[str]) -> str:
+    """ Part of a file name for a tag, unique among the slugs already used. """
+    base = re.sub(r"[^\w.-]+", "_", tag).strip("_.") or UNTAGGED
+    slug, i = base, 1
+    while slug.lower() in used:
+        i += 1
+        slug = f"{base}_{i}"
+    used.add(slug.lower())
+    return slug
+
+def get_shard_file(outdir:Path, source:Path, shard:TagShard, format:str) -> str:
+    return os.path.join(outdir, f"{Path(source).stem}_{shard.slug}.{format}")
+
+def render_index(source:Path, index:TagIndex, formats:list[str]) -> bytes:
+    """ Small html page listing the tags with their counts & links to their outputs. """
+    rows = []
+    for shard in index.shards.values():
+        counts = shard.get_counts()
+        links = " ".join(f'<a href="{html.escape(os.path.basename(get_shard_file("", source, shard, fmt)))}">{fmt}</a>' for fmt in formats)
+        rows.append(f"<tr><td>{html.escape(shard.tag)}</td><td>{counts['operations']}</td><td>{counts['schemas']}</td>"
+                    f"<td>{counts['parameters']}</td><td>{counts['fields']}</td><td>{links}</td></tr>")
+    page = f"""<!doctype html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
+    <meta name="author" content="{__author__}">
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.2.2/dist/css/bootstrap.min.css" rel="stylesheet" integrity="sha384-Zenh87qX5JnK2Jl0vWa8Ck2rdkQ2Bzep5IDxbcnCeuOxjzrPF/et3URy9Bv1WTRi" crossorigin="anonymous">
+    <title>Data Dictionary per tag - {html.escape(os.path.basename(source))}</title>
+</head>
+<body>
+    <h1>Data Dictionary per tag</h1>
+    <div style="margin: 2rem;">
+    <hr>
+    <article><strong>Source: </strong>{html.escape(os.path.abspath(source))}</article>
+    <hr>
+    <table class="table table-striped table-sm table-hover text-left">
+    <thead class="table-primary"><tr><th>Tag</th><th>Operations</th><th>Schemas</th><th>Parameters</th><th>Fields</th><th>Outputs</th></tr></thead>
+    <tbody class="table-group-divider">
+    {"".join(rows)}
+    </tbody>
+    </table>
+    </div>
+</body>
+</html>
+"""
+    return page.encode()
+
+_worker_state:tuple = None
+
+def init_worker(api_object:ApiObject, index:TagIndex, source:Path, outdir:Path, excel_with_layout:bool, compact:bool=False) -> None:
+    """ Analysis & index received once per worker process (pickled by the pool). """
+    global _worker_state
+    _worker_state = (api_object, index, source, outdir, DictionaryOptions(excel_with_layout=excel_with_layout, compact=compact))
+
+def write_shard(task:tuple[str,str]) -> str:
+    """ Render the output of one tag in one format. Return the output file. """
+    tag, format = task
+    api_object, index, source, outdir, options = _worker_state
+    shard = index.get_shard(tag)
+    outfile = get_shard_file(outdir, source, shard, format)
+    data = render_output(api_object.subset(shard.schemas, shard.params, shard.fields), format, source, options)
+    with open(outfile, "wb") as f:
+        f.write(data)
+    return outfile
+
+def write_shards(source:Path, outdir:Path, formats:list[str], tags:list[str]=None, workers:int=None, options:DictionaryOptions=None) -> tuple[TagIndex, list[str]]:
+    """ One output per tag (tags: only these ones) & format, rendered in a pool of processes (workers=1: in the current process),
+    plus the index page. Return the index & the output files.
+    """
+    options = options or DictionaryOptions()
+    with open(source, "rb") as f:
+        content = f.read()
+    content_key = get_content_key(content, get_filetype(source))
+    api_content = get_document(source, options, content, content_key)
+    api_object = analyze(source, options, content, document=api_content, content_key=content_key)
+    del content
+    api_content = select_document(source, api_content, options)
+    index = TagIndex(api_content, api_object, SchemaGraph(api_content))
+    del api_content
+    try:
+        shards = [index.get_shard(tag) for tag in tags] if tags else list(index.shards.values())
+    except KeyError as e:
+        raise DictionaryError(e.args[0])
+    os.makedirs(outdir, exist_ok=True)
+    tasks = [(shard.tag, format) for shard in shards for format in formats]
+    initargs = (api_object, index, source, outdir, options.excel_with_layout, options.compact)
+    if workers == 1 or len(tasks) == 1:
+        init_worker(*initargs)
+        outfiles = [write_shard(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as executor:
+            outfiles = list(executor.map(write_shard, tasks))
+    index_file = os.path.join(outdir, "index.html")
+    with open(index_file, "wb") as f:
+        f.write(render_index(source, index, formats))
+    return index, outfiles + [index_file]
+
+def shards(openapi_file:Path = typer.Argument(..., exists=True, readable=True, resolve_path=True, show_default=False, help="openapi file (JSON or YAML)"),
+        format:str = typer.Option("xlsx", "--format", "-f", help="Format(s) of the outputs: xlsx, html, json (comma separated list)", callback=callback_format),
+        outdir:Path = typer.Option(None, "--outdir", "-d", file_okay=False, resolve_path=True, show_default="<openapi_file>_tags next to openapi_file", help="Location of the outputs & index page"),
+        tags:list[str] = typer.Option(None, "--tag", "-t", help="Only (re)generate the outputs of this tag"),
+        workers:int = typer.Option(None, "--workers", "-w", show_default="Number of CPUs", help="Number of processes rendering the outputs"),
+        excel_with_layout:bool = typer.Option(True, help="Do exta-formatting on excel sheets"),
+        compact:bool = typer.Option(False, "--compact", help="Write each shared or long specification once in a Definitions sheet/section"),
+        validate:bool = typer.Option(True, "--validate/--no-validate", help="Check the structure of the openapi file before analysis"),
+        use_cache:bool = typer.Option(True, "--cache/--no-cache", help="Reuse the document & analysis cached for an unchanged openapi file"),
+        debug:bool = typer.Option(False, help="Enable debug mode on the console"),
+        ) -> None:
+    logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_SUCCESS if debug else logging.ERROR, success_level=LOGLEVEL_SUCCESS)
+    cache = ContentCache(CACHE_DIR, max_size=CACHE_MAX_SIZE_MB*1024*1024, enabled=use_cache)
+    options = DictionaryOptions(excel_with_layout=excel_with_layout, cache=cache, logger=logger, validate=validate, compact=compact)
+    outdir = outdir or openapi_file.parent / f"{openapi_file.stem}_tags"
+    try:
+        index, outfiles = write_shards(openapi_file, outdir, format, tags, workers, options)
+    except DictionaryError as e:
+        for line in str(e).splitlines():
+            logger.error(line)
+        raise typer.Exit(code=1)
+    sep = '-'*15
+    print(f"{sep} Data dictionary per tag {sep}")
+    print(f"- Tags: {len(index.shards)} ({len(tags) if tags else len(index.shards)} generated)")
+    print(f"- Outputs: {len(outfiles) - 1} file(s) in '{outdir}'")
+    print(f"- Index page: '{outfiles[-1]}'")
+    print(sep*4)
+
+if __name__ == "__main__":
+    typer.run(shards)
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'dictionary_tables'
+__version__ = '1.2.0'       # part of the output cache key: to be increased when the rendered tables change
+
+# Standard Python Modules
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+# External Python Modules
+if TYPE_CHECKING:
+    import pandas as pd         # imported on first dataframe build only (json output does not need pandas)
+
+# Personal Python Modules
+from openapi_parsing import ApiObject, canonical_json, fingerprint
+
+PARAM_SUFFIX = "\n(param)"
+FIELD_SUFFIX = "\n(field)"
+DEFINITION_PREFIX = "D"
+DEFINITION_ID_LENGTH = 8        # hex characters of the content hash (extended in the unlikely case of a collision)
+DEFINITION_INLINE_LENGTH = 500  # in compact mode, specs used once are kept inline up to this length (json characters)
+DEFINITION_MIN_LENGTH = 60      # in compact mode, shorter specs are kept inline even when shared (no gain in replacing them by an ID)
+
+_TABLES_CACHE = weakref.WeakKeyDictionary()
+_TABLES_LOCK = threading.Lock()
+
+def bullet_list(items:list[str]) -> str:
+    """ Format a list of values as '- value' lines (empty string if no value). """
+    if not items:
+        return ""
+    return "- " + "\n- ".join(items)
+
+def spec_list(specs:list[dict], rendered:dict[int,tuple[dict,str]]=None) -> str:
+    """ Format a list of spec dictionaries as '- {spec}' lines, each ending with a new line.
+
+    rendered: lines already formatted per spec identity, for specs shared by several entities (i.e. yaml aliases)
+    """
+    if rendered is None:
+        return "".join(["- " + str(spec) + "\n" for spec in specs])
+    lines = []
+    for spec in specs:
+        cached = rendered.get(id(spec))
+        if cached is None or cached[0] is not spec:
+            cached = rendered[id(spec)] = (spec, "- " + str(spec) + "\n")
+        lines.append(cached[1])
+    return "".join(lines)
+
+class EntityTable():
+    """ Columnar representation of one entity type (Schemas, Parameters, Fields, ...).
+
+    Every cell is computed once when the row is added. The same cells are then shared by all writers
+    (DataFrame for xlsx/html, records for json) and by derived tables (Common).
+    """
+    def __init__(self, title:str, columns:list[str]):
+        self.title:str = title
+        self.columns:list[str] = columns
+        self.data:dict[str,list] = {col: [] for col in columns}
+        self.index:dict[str,int] = {}     # Name -> row number
+        self.records:list[dict] = []      # json representation of each row
+        self._df = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def add_row(self, name:str, row:list, record:dict=None):
+        self.index[name] = len(self.index)
+        for col, value in zip(self.columns, row):
+            self.data[col].append(value)
+        if record is not None:
+            self.records.append(record)
+
+    def get_row(self, name:str) -> list:
+        i = self.index[name]
+        return [self.data[col][i] for col in self.columns]
+
+    def to_dataframe(self) -> "pd.DataFrame":
+        if self._df is None:
+            import pandas as pd
+            self._df = pd.DataFrame(self.data, columns=self.columns)
+        return self._df
+
+class Definitions():
+    """ Spec dictionaries written once in a compact dictionary, each with a short ID derived from its content.
+
+    A spec becomes a definition when it is used by several entities or when it is too long to be kept inline (long enums,
+    nested objects): cells reference its ID. Other specs (and short ones like {'type': 'string'}) stay inline. The same spec always gets the same ID
+    (from one run or one version of the openapi file to the other).
+    """
+    def __init__(self, spec_lists:list[list[dict]]):
+        self.specs:dict[str,dict] = {}                      # ID -> spec
+        self.uses:dict[str,int] = {}                        # ID -> number of cells referencing it
+        self._keys:dict[int,tuple[dict,str]] = {}           # identity of spec -> (spec, canonical json): shared specs serialized once
+        self._ids:dict[str,str] = {}                        # canonical json -> ID (definitions only)
+        uses = {}
+        first_specs = {}
+        for specs in spec_lists:
+            for spec in specs:
+                key = self._get_key(spec)
+                uses[key] = uses.get(key, 0) + 1
+                first_specs.setdefault(key, spec)
+        for key, count in uses.items():
+            if len(key) > DEFINITION_INLINE_LENGTH or (count > 1 and len(key) > DEFINITION_MIN_LENGTH):
+                spec = first_specs[key]
+                digest = fingerprint(spec)
+                length = DEFINITION_ID_LENGTH
+                while DEFINITION_PREFIX + digest[:length] in self.specs:
+                    length += 2
+                definition_id = self._ids[key] = DEFINITION_PREFIX + digest[:length]
+                self.specs[definition_id] = spec
+                self.uses[definition_id] = count
+
+    def _get_key(self, spec:dict) -> str:
+        cached = self._keys.get(id(spec))
+        if cached is None or cached[0] is not spec:
+            cached = self._keys[id(spec)] = (spec, canonical_json(spec))
+        return cached[1]
+
+    def get_id(self, spec:dict) -> str:
+        """ ID of a spec written in Definitions (None for a spec kept inline). """
+        return self._ids.get(self._get_key(spec))
+
+    def get_table(self) -> EntityTable:
+        table = EntityTable("Definitions", ["ID", "Nb Use", "Definition"])
+        for definition_id in sorted(self.specs):
+            table.add_row(definition_id, [definition_id, self.uses[definition_id], str(self.specs[definition_id])])
+        return table
+
+class ApiTables():
+    """ Tabular model of an ApiObject, built once and reused by every output writer.
+
+    In compact mode, spec dictionaries (properties of fields, schemas of parameters) shared by several rows or too long are not
+    written in each row: rows reference their ID, each of them being written once in the Definitions table.
+    """
+    def __init__(self, api_object:ApiObject, compact:bool=False):
+        self.compact:bool = compact
+        self.definitions:Definitions = None
+        if compact:
+            self.definitions = Definitions([field.properties for field in api_object.request_fields_dict.values()] +
+                                           [param.schemas for param in api_object.param_dict.values()])
+        self.api_info:str = api_object.api_info
+        self.diagnostics:list[str] = list(api_object.diagnostics)         # steps skipped by a partial analysis (budget exhausted)
+        self._rendered_specs:dict[int,tuple[dict,str]] = {}                # shared by fields & parameters while building cells
+        self.schemas:EntityTable = self._build_schemas(api_object)
+        self.params:EntityTable = self._build_params(api_object)
+        self.fields:EntityTable = self._build_fields(api_object)
+        self.common:EntityTable = self._build_common()
+        self.definitions_table:EntityTable = self.definitions.get_table() if compact else None
+        self._rendered_specs = {}
+
+    def _spec_cell(self, specs:list[dict]) -> tuple[str, list]:
+        """ Cell & json value of a list of specs: the specs themselves, replaced by their ID when written in Definitions (compact mode). """
+        if not self.compact:
+            return spec_list(specs, self._rendered_specs), list(specs)
+        values = []
+        lines = []
+        for spec in specs:
+            definition_id = self.definitions.get_id(spec)
+            values.append(definition_id or spec)
+            lines.append(f"- {definition_id}\n" if definition_id else spec_list([spec], self._rendered_specs))
+        return "".join(lines), values
+
+    def _build_common(self) -> EntityTable:
+        # Parameters & fields sharing the same name, retrieved from name index (equivalent of an inner merge on "Name")
+        param_cols = self.params.columns[1:]
+        field_cols = self.fields.columns[1:]
+        columns = ["Name"]
+        columns += [col + PARAM_SUFFIX if col in field_cols else col for col in param_cols]
+        columns += [col + FIELD_SUFFIX if col in param_cols else col for col in field_cols]
+        table = EntityTable("Common", columns)
+        for name in self.params.index:
+            if name in self.fields.index:
+                table.add_row(name, self.params.get_row(name) + self.fields.get_row(name)[1:])
+        return table
+
+    def _build_fields(self, api_object:ApiObject) -> EntityTable:
+        table = EntityTable("Fields", ["Name", "Required", "Types", "Nb Path", "Paths", "Descriptions", "Schemas"])
+        for field_name, field_object in sorted(api_object.request_fields_dict.items()):
+            descriptions = sorted(field_object.descriptions)
+            paths = sorted(field_object.paths)
+            types = sorted(field_object.types)
+            properties_cell, properties = self._spec_cell(field_object.properties)
+            row = [
+                field_name,
+                field_object.required,
+                "\n".join(types),
+                len(paths),
+                bullet_list(paths),
+                bullet_list(descriptions),
+                properties_cell,
+                ]
+            record = {"fieldname": field_name, "descriptions": descriptions, "paths": paths, "properties": properties,
+                      "required": field_object.required, "schemas": sorted(field_object.schemas), "types": types}
+            table.add_row(field_name, row, record)
+        return table
+
+    def _build_params(self, api_object:ApiObject) -> EntityTable:
+        table = EntityTable("Parameters", ["Name", "Required", "Locations", "Types", "Nb Path", "Paths", "Descriptions", "Schemas"])
+        for field_name, field_object in sorted(api_object.param_dict.items()):
+            descriptions = sorted(field_object.descriptions)
+            locations = sorted(field_object.locations)
+            paths = sorted(field_object.paths)
+            schema_types = sorted(field_object.schema_types)
+            schemas_cell, schemas = self._spec_cell(field_object.schemas)
+            row = [
+                field_name,
+                field_object.required,
+                "\n".join(locations),
+                "\n".join(schema_types),
+                len(paths),
+                bullet_list(paths),
+                bullet_list(descriptions),
+                schemas_cell,
+                ]
+            record = {"fieldname": field_name, "descriptions": descriptions, "locations": locations, "paths": paths, "required": field_object.required,
+                      "schemas": schemas, "schema_types": schema_types, "specs": list(field_object.specs)}
+            table.add_row(field_name, row, record)
+        return table
+
+    def _build_schemas(self, api_object:ApiObject) -> EntityTable:
+        table = EntityTable("Schemas", ["Name", "Type", "Fields", "Paths"])
+        for schema_name, schema_object in sorted(api_object.schemas_dict.items()):
+            fields = sorted(schema_object.fields)
+            paths = sorted(schema_object.paths)
+            row = [
+                schema_name,
+                schema_object.type + " (incomplete)" if schema_object.incomplete else schema_object.type,
+                bullet_list(fields),
+                bullet_list(paths),
+                ]
+            record = {"schemaname": schema_name, "type": schema_object.type, "fields": fields, "paths": paths}
+            if schema_object.incomplete:
+                record["incomplete"] = True
+            table.add_row(schema_name, row, record)
+        return table
+
+    def to_dict(self) -> dict[str,list[dict]]:
+        to_return = {"Schemas": self.schemas.records, "Parameters": self.params.records, "Fields": self.fields.records}
+        if self.compact:
+            to_return["Definitions"] = {definition_id: self.definitions.specs[definition_id] for definition_id in sorted(self.definitions.specs)}
+        if self.diagnostics:
+            to_return["Diagnostics"] = self.diagnostics
+        return to_return
+
+    def get_diagnostics_dataframe(self) -> "pd.DataFrame":
+        import pandas as pd
+        return pd.DataFrame({"Skipped": self.diagnostics})
+
+def get_tables(api_object:ApiObject, compact:bool=False) -> ApiTables:
+    """ Return the tabular model of an ApiObject. Built on first call (per mode) then cached for the lifetime of the ApiObject. """
+    with _TABLES_LOCK:
+        tables_per_mode = _TABLES_CACHE.setdefault(api_object, {})
+        tables = tables_per_mode.get(compact)
+        if tables is None:
+            tables = tables_per_mode[compact] = ApiTables(api_object, compact)
+    return tables
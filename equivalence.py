@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'api_data_dictionary_equivalence'
+__version__ = '1.0.0'
+
+# Standard Python Modules
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+# External Python Modules
+import typer
+
+# Personal Python Modules
+from params import *
+from utils.coloredlog import get_logger
+from openapi_parsing import ApiObject, canonical_json, fingerprint
+from spec_generator import SpecGenerator
+
+### Global Variables
+CUR_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_DIR = os.path.join(CUR_DIR, "sample_input")
+# Reference outputs: <input name>.json.gz = ApiObject.to_json(deterministic=True), index.json = input name -> fingerprint of the document
+REFERENCE_DIR = os.path.join(CUR_DIR, "equivalence_reference")
+REFERENCE_INDEX = os.path.join(REFERENCE_DIR, "index.json")
+ENTITY_KEYS = {"Schemas": "schemaname", "Parameters": "fieldname", "Fields": "fieldname"}
+# Attribute of an entity -> category of difference reported
+ATTRIBUTE_CATEGORIES = {
+    "descriptions": "descriptions",
+    "paths": "paths",
+    "required": "required",
+    "type": "types",
+    "types": "types",
+    "schema_types": "types",
+    "locations": "locations",
+    "fields": "schema membership",
+    "schemas": "schema membership",
+    "properties": "specs",
+    "specs": "specs",
+}
+# Shapes of generated specs used on top of sample_input
+GENERATED_SPECS = {
+    "generated_default": {},
+    "generated_deep_refs": {"ref_depth": 12, "cyclic_ratio": 0.2},
+    "generated_wide_allof": {"width": 40, "allof_ratio": 0.4, "vocabulary": 200},
+    "generated_shared": {"shared_fragments": 20, "path_params": 10},
+}
+
+logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_SUCCESS, success_level=LOGLEVEL_SUCCESS)
+
+def engine_api_object(api_content:Any) -> ApiObject:
+    return ApiObject(api_content)
+
+def engine_low_memory(api_content:Any) -> ApiObject:
+    return ApiObject(api_content, low_memory=True)
+
+def engine_tables(api_content:Any) -> Any:
+    from dictionary_tables import get_tables
+    return get_tables(ApiObject(api_content))
+
+# Engines producing an analysis (object with to_dict()) compared with the reference outputs
+ENGINES:dict[str, Callable[[Any], Any]] = {
+    "api_object": engine_api_object,
+    "low_memory": engine_low_memory,
+    "tables": engine_tables,
+}
+
+def canonicalize(dictionary:dict) -> dict[str, dict[str, dict]]:
+    """ Order independent representation of a dictionary: entity type -> entity name -> attributes.
+
+    Lists coming from sets (and lists of spec dictionaries) are sorted, values are normalized through json.
+    """
+    result = {}
+    for entity_type, key in ENTITY_KEYS.items():
+        entities = {}
+        for entity in dictionary.get(entity_type, []):
+            attributes = {}
+            for attribute, value in entity.items():
+                if isinstance(value, list):
+                    value = sorted(canonical_json(v) for v in value)
+                else:
+                    value = canonical_json(value)
+                attributes[attribute] = value
+            entities[entity[key]] = attributes
+        result[entity_type] = entities
+    return result
+
+def read_reference(input_name:str, api_content:Any) -> bytes:
+    """ Reference output of an input (None if there is no reference output for this input or if the input changed since). """
+    if not os.path.isfile(REFERENCE_INDEX):
+        return None
+    with open(REFERENCE_INDEX) as f:
+        index = json.load(f)
+    if index.get(input_name) != fingerprint(api_content):
+        return None
+    with gzip.open(os.path.join(REFERENCE_DIR, f"{input_name}.json.gz")) as f:
+        return f.read()
+
+def write_reference(input_name:str, api_content:Any) -> None:
+    """ Save the output of ApiObject as reference output of an input. """
+    index = {}
+    if os.path.isfile(REFERENCE_INDEX):
+        with open(REFERENCE_INDEX) as f:
+            index = json.load(f)
+    os.makedirs(REFERENCE_DIR, exist_ok=True)
+    index[input_name] = fingerprint(api_content)
+    with gzip.GzipFile(os.path.join(REFERENCE_DIR, f"{input_name}.json.gz"), "wb", mtime=0) as f:
+        f.write(ApiObject(api_content).to_json(deterministic=True).encode())
+    with open(REFERENCE_INDEX, "w") as f:
+        json.dump(index, f, indent=4, sort_keys=True)
+
+def compare(reference:dict, candidate:dict) -> list[dict]:
+    """ Differences between two canonical dictionaries, per entity & category. """
+    differences = []
+    for entity_type in ENTITY_KEYS:
+        ref_entities = reference.get(entity_type, {})
+        cand_entities = candidate.get(entity_type, {})
+        for name in sorted(ref_entities.keys() - cand_entities.keys()):
+            differences.append({"entity_type": entity_type, "name": name, "category": "missing", "detail": "only in reference"})
+        for name in sorted(cand_entities.keys() - ref_entities.keys()):
+            differences.append({"entity_type": entity_type, "name": name, "category": "extra", "detail": "only in candidate"})
+        for name in sorted(ref_entities.keys() & cand_entities.keys()):
+            ref_attributes = ref_entities[name]
+            cand_attributes = cand_entities[name]
+            if ref_attributes == cand_attributes:
+                continue
+            for attribute in sorted(ref_attributes.keys() | cand_attributes.keys()):
+                ref_value = ref_attributes.get(attribute)
+                cand_value = cand_attributes.get(attribute)
+                if ref_value == cand_value:
+                    continue
+                if isinstance(ref_value, list) and isinstance(cand_value, list):
+                    detail = {"missing": sorted(set(ref_value) - set(cand_value)), "extra": sorted(set(cand_value) - set(ref_value))}
+                else:
+                    detail = {"reference": ref_value, "candidate": cand_value}
+                differences.append({"entity_type": entity_type, "name": name, "category": ATTRIBUTE_CATEGORIES.get(attribute, attribute),
+                                    "attribute": attribute, "detail": detail})
+    return differences
+
+def get_inputs(samples:list[str], generated:bool, seed:int) -> Iterator[tuple[str, Any]]:
+    """ Yield (input name, openapi document) for sample files & generated specs. """
+    from data_dictionary import load_document
+    for sample in samples:
+        yield os.path.basename(sample), load_document(sample)
+    if generated:
+        for name, shape in GENERATED_SPECS.items():
+            yield f"{name}_seed{seed}", SpecGenerator(operations=300, schemas=150, seed=seed, **shape).generate()
+
+def equivalence(candidates:list[str] = typer.Option(None, "--candidate", "-c", help="Engine(s) to compare with the reference outputs (default: all)"),
+        samples:list[str] = typer.Option(None, "--sample", "-s", help="Sample file(s) to use (default: all files of sample_input)"),
+        generated:bool = typer.Option(True, help="Also compare on generated specs"),
+        seed:int = typer.Option(0, help="Seed of generated specs (reference outputs are saved for seed 0)"),
+        byte_level:bool = typer.Option(False, "--byte-level", help="Also compare ApiObject.to_json(deterministic=True) with the reference output byte by byte"),
+        report:Path = typer.Option(None, "--report", "-r", help="Save all differences as json file"),
+        save_reference:bool = typer.Option(False, "--save-reference", help="Save the outputs of today's ApiObject as reference outputs (intended change of the analysis only)"),
+        ) -> None:
+    candidates = candidates or list(ENGINES)
+    for candidate in candidates:
+        if candidate not in ENGINES:
+            raise typer.BadParameter(f"Possible values for candidate are: {list(ENGINES)}")
+    samples = samples or sorted(os.path.join(SAMPLE_DIR, f) for f in os.listdir(SAMPLE_DIR))
+
+    all_differences = {}
+    nb_differences = 0
+    for input_name, api_content in get_inputs(samples, generated, seed):
+        if save_reference:
+            write_reference(input_name, api_content)
+            logger.log(LOGLEVEL_SUCCESS, f"{input_name}: reference output saved")
+            continue
+        reference_bytes = read_reference(input_name, api_content)
+        if reference_bytes is None:
+            logger.error(f"{input_name}: no reference output for this document (see --save-reference)")
+            all_differences[input_name] = [{"entity_type": "*", "name": "*", "category": "reference", "detail": "no reference output"}]
+            nb_differences += 1
+            continue
+        reference = canonicalize(json.loads(reference_bytes))
+        for candidate in candidates:
+            result = ENGINES[candidate](api_content)
+            differences = compare(reference, canonicalize(result.to_dict()))
+            if byte_level and not differences and isinstance(result, ApiObject):
+                if result.to_json(deterministic=True).encode() != reference_bytes:
+                    differences.append({"entity_type": "*", "name": "*", "category": "bytes", "detail": "deterministic outputs differ"})
+            all_differences[f"{input_name}::{candidate}"] = differences
+            nb_differences += len(differences)
+            if differences:
+                categories = sorted({d["category"] for d in differences})
+                logger.error(f"{input_name} - {candidate}: {len(differences)} difference(s) ({', '.join(categories)})")
+                for difference in differences[:10]:
+                    logger.error(f"   {difference['entity_type']} '{difference['name']}' - {difference['category']}: {difference['detail']}")
+            else:
+                logger.log(LOGLEVEL_SUCCESS, f"{input_name} - {candidate}: equivalent to reference output")
+
+    if report:
+        with open(report, "w") as f:
+            json.dump(all_differences, f, indent=4)
+        logger.log(LOGLEVEL_SUCCESS, f"Differences saved to file: '{report}'")
+    if nb_differences:
+        raise typer.Exit(code=1)
+
+if __name__ == "__main__":
+    typer.run(equivalence)
@@ -4,24 +4,25 @@ __appname__ = 'api_data_dictionary'
 __version__ = 'V 1.0.0'
 
 # Standard Python Modules
-import datetime
-import json
+import importlib
 import logging
 import os
+import sys
 from pathlib import Path
-from typing import Any
 
 # External Python Modules
-import pandas as pd
 import typer
-import yaml
-
 
 # Personal Python Modules
 from params import *
-from utils.coloredlog import get_logger
+from utils.coloredlog import ColorLogger, get_logger
 from utils.filename import FileName     #CSVFile, ParameterFile
+from utils.profiler import Profiler
+from utils.cache import ContentCache
 from openapi_parsing import ApiObject
+from openapi_validator import HTTP_METHODS
+from spec_filter import SpecFilter
+from data_dictionary import DictionaryError, DictionaryOptions, build_dictionary, callback_format
 
 ### Global Variables
 # Possible values for a log level using logging module: CRITICAL:50; ERROR:40; WARNING:30; INFO:20, DEBUG:10
@@ -33,398 +34,150 @@ DEBUG_CONSOLE:bool=True
 if LOGLEVEL_CONSOLE == LOGLEVEL_DISABLE:
     DEBUG_CONSOLE:bool=False
 
-all_args={}
-output_format="txt"
-
-def build_html_table(title:str, df:pd.DataFrame) -> str:
-    div_header =  f"""<div class="accordion-item">
-        <h2 class="accordion-header" id="{title}">
-          <button class="accordion-button collapsed" type="button" data-bs-toggle="collapse" data-bs-target="#collapse{title}" aria-expanded="false" aria-controls="collapse{title}">
-            {title}
-          </button>
-        </h2>
-        <div id="collapse{title}" class="accordion-collapse collapse" aria-labelledby="{title}" data-bs-parent="#accordion_openapi">
-          <div class="accordion-body">
-    """
-    html_tbl = df.to_html(index=False, classes='table table-striped table-sm table-hover text-left', justify="left")
-    html_tbl = html_tbl.replace("\\n","<br>")
-    html_tbl = html_tbl.replace('<thead>', '<thead class="table-primary", style="vertical-align: middle">')
-    html_tbl = html_tbl.replace('<tbody>', '<tbody class="table-group-divider">')
-    result = div_header + html_tbl + "</div></div></div>"
-    return result
-
-def callback_format(value:str) -> str:
-    if value.lower() not in VALID_OUTPUT_FORMAT:
-        raise typer.BadParameter(f"Possible values for format are: {VALID_OUTPUT_FORMAT}")
-    return value.lower()
+# Sub-commands available as first argument (i.e. python main.py serve): name -> (module, typer command)
+SUBCOMMANDS = {"serve": ("dictionary_server", "serve"), "diff": ("dictionary_diff", "diff"),
+               "graph": ("spec_commands", "graph"), "validate": ("spec_commands", "validate"), "logmatch": ("path_router", "logmatch"),
+               "payloads": ("payload_profiler", "payloads"), "shards": ("dictionary_shards", "shards")}
+# Top level stages of load & analysis (memory report)
+ANALYSIS_STAGES = ("load", "validation", "filter", "analysis")
 
 def callback_outdir(value:Path) -> Path:
     if value and not value.is_dir() and os.path.splitext(value)[1]:
         raise typer.BadParameter(f"outdir must be a DIRECTORY (not a file)")
     return value
 
+def callback_method(value:list[str]) -> list[str]:
+    for method in value or []:
+        if method.lower() not in HTTP_METHODS:
+            raise typer.BadParameter(f"Possible values for method are: {HTTP_METHODS}")
+    return value
+
 def callback_version(value:bool) -> None:
     if value:
         # print(f"{__appname__} {__version__}")
         print(CONSOLE.get_app_banner(selection="random", banner_lst=BANNERS, appversion=__version__, creator="Designed by " + __author__))
         raise typer.Exit()
 
-def init() -> None:
+def init(banner:bool, debug:bool, logfile:Path) -> ColorLogger:
     """ Clear Screen, display banner & start the logger. """
     CONSOLE.clear_screen()
-    if all_args["banner"]:
+    if banner:
         print(CONSOLE.get_app_banner(selection="random", banner_lst=BANNERS, appversion=__version__, creator="Designed by " + __author__))
-    if all_args["debug"]:
+    if debug:
         LOGLEVEL_CONSOLE = LOGLEVEL_SUCCESS
     else:
         LOGLEVEL_CONSOLE = LOGLEVEL_DISABLE
-    if all_args["logfile"]:
+    if logfile:
         LOGLEVEL_FILE = logging.DEBUG
     else:
         LOGLEVEL_FILE = LOGLEVEL_DISABLE
-    global logger
-    logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_CONSOLE, file_loglevel=LOGLEVEL_FILE, logfile=all_args["logfile"], success_level=LOGLEVEL_SUCCESS)
+    logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_CONSOLE, file_loglevel=LOGLEVEL_FILE, logfile=logfile, success_level=LOGLEVEL_SUCCESS,
+                        queued=True, dedup_max_repeats=LOG_DEDUP_MAX_REPEATS)
     logger.info(f"Application Start")
-    logger.info(f"Logging levels : Console={LOGLEVEL_CONSOLE}; File={LOGLEVEL_FILE}; Logfile='{all_args['logfile']}'")
+    logger.info(f"Logging levels : Console={LOGLEVEL_CONSOLE}; File={LOGLEVEL_FILE}; Logfile='{logfile}'")
     logger.debug("Confirm Debug Mode is Activated")
+    return logger
 
-def get_df_params(api_object:ApiObject) -> pd.DataFrame:
-    columns = [
-    "Name",
-    "Required",
-    "Locations",
-    "Types",
-    "Nb Path",
-    "Paths",
-    "Descriptions",
-    "Schemas",
-    # "Specs"
-    ]
-    rows = []
-    for field_name, field_object in sorted(api_object.param_dict.items()):
-        schemas_str = ""
-        for schema in field_object.schemas:
-            schemas_str += "- " + str(schema) + "\n"
-        spec_str = ""
-        for spec in field_object.specs:
-            spec_str += "- " + str(spec) + "\n"
-        
-        row = [
-            field_name,
-            field_object.required,
-            "\n".join(sorted(field_object.locations)),
-            "\n".join(sorted(field_object.schema_types)),
-            len(field_object.paths),
-            "\n- ".join(sorted(field_object.paths)),
-            "\n- ".join(field_object.descriptions),
-            schemas_str,
-            # spec_str
-            ]
-        for i in (5,6):
-            if row[i]:
-                row[i] = "- " + row[i]
-
-        rows.append(row)
-    
-    df_params = pd.DataFrame(rows, columns=columns)
-    return df_params
-
-def get_df_schemas(api_object:ApiObject) -> pd.DataFrame:
-    columns = [
-    "Name",
-    "Type",
-    "Fields",
-    "Paths"
-    ]
-    rows = []
-    for schema_name, schema_object in sorted(api_object.schemas_dict.items()):      
-        row = [
-            schema_name,
-            schema_object.type,
-            "\n- ".join(sorted(schema_object.fields)),
-            "\n- ".join(sorted(schema_object.paths)),
-            ]
-        for i in (2,3):
-            if row[i]:
-                row[i] = "- " + row[i]
-        rows.append(row)
-    
-    df_schemas = pd.DataFrame(rows, columns=columns)
-    return df_schemas
-
-def get_df_fields(api_object:ApiObject) -> pd.DataFrame:
-    columns = [
-    "Name",
-    "Required",
-    "Types",
-    "Nb Path",
-    "Paths",
-    "Descriptions",
-    "Schemas"
-    ]
-    rows = []
-
-    for field_name, field_object in sorted(api_object.request_fields_dict.items()):
-        schemas_str = ""
-        for schema in field_object.properties:
-            schemas_str += "- " + str(schema) + "\n"
-       
-        row = [
-            field_name,
-            field_object.required,
-            "\n".join(sorted(field_object.types)),
-            len(field_object.paths),
-            "\n- ".join(sorted(field_object.paths)),
-            "\n- ".join(field_object.descriptions),
-            schemas_str,
-            # spec_str
-            ]
-        for i in (4,5):
-            if row[i]:
-                row[i] = "- " + row[i]
-        rows.append(row)
-    df_fields = pd.DataFrame(rows, columns=columns)
-    return df_fields
-
-def get_filename_elements(fullpath) -> dict[str,str]:
-    filename_elements={}
-    try:
-        filename_elements["fullpath"]=fullpath
-        filename_elements["filepath"] = os.path.dirname(fullpath)
-        filename_elements["filename"] = os.path.basename(fullpath)
-        filename_elements["filename_noextension"], filename_elements["fileextension"] = os.path.splitext(filename_elements["filename"])
-        if filename_elements["filepath"]:
-            filename_elements["fullpath_noextension"] = filename_elements["filepath"] + os.path.sep + filename_elements["filename_noextension"]
-        else:
-            filename_elements["fullpath_noextension"] = filename_elements["filename_noextension"]
-    except Exception as e:
-        logger.error(f"while retrieving file name elements using '{fullpath}':")
-        logger.error(f"{str(e)}")
-        raise typer.Abort()    
-    return filename_elements
-
-def load_openapi_file(filename) -> Any:
-    fe = get_filename_elements(filename)
-    filetype = fe["fileextension"].lower()
-    if filetype not in VALID_OPENAPI_EXTENSIONS:
-            logger.error(f"Parameter file supports only following format: json, yml, yaml.")
-            raise typer.Abort()
-    else:
-        try:
-            if filetype in VALID_JSON_EXTENSIONS:
-                with open(filename, encoding="UTF-8", errors="ignore") as config_file:
-                    f = json.load(config_file)
-            elif filetype in VALID_YAML_EXTENSIONS:
-                with open(filename, encoding="UTF-8", errors="ignore") as config_file:
-                    f = yaml.safe_load(config_file)
-        except Exception as e:
-            logger.error(f"while loading file '{filename}':")
-            logger.error(f"{str(e)}")
-            raise typer.Abort()
-        else:
-            logger.log(LOGLEVEL_SUCCESS, f"File '{filename}' successfuly loaded")
-            return f
-
-def report_overview(api_object:ApiObject) -> None:
+def report_overview(api_object:ApiObject, summary:dict[str,int], spec_filter:SpecFilter=None) -> None:
     sep = '-'*15
     print() 
     print(f"{sep} Summary of Analysis {sep}")
     print(f"- Info: {api_object.api_info}")
-    print(f"- Number of servers : {len(api_object.servers)}")
-    print(f"- Number of paths : {len(api_object.paths)}")
-    print(f"- Number of schemas: {len(api_object.schemas_dict)}")
-    print(f"- Number of parameters : {len(api_object.param_dict)}")
-    print(f"- Number of fields : {len(api_object.request_fields_dict)}")
-    same_field_name = list(set(api_object.param_dict.keys()).intersection(api_object.request_fields_dict.keys()))
-    print(f"- Number of Parameters with same name as a field: {len(same_field_name)}")
+    if spec_filter and spec_filter.enabled:
+        print(f"- Filter: {spec_filter}")
+    print(f"- Number of servers : {summary['servers']}")
+    print(f"- Number of paths : {summary['paths']}")
+    print(f"- Number of schemas: {summary['schemas']}")
+    print(f"- Number of parameters : {summary['parameters']}")
+    print(f"- Number of fields : {summary['fields']}")
+    print(f"- Number of Parameters with same name as a field: {summary['common']}")
+    if api_object.incomplete:
+        print(f"- Incomplete analysis ({api_object.budget.reason}): {len(api_object.diagnostics)} step(s) skipped")
     print (sep*4)
     print()
 
-def report_table_summary(api_object:ApiObject, format:str, outfile:Path) -> None:
-    df_schemas = get_df_schemas(api_object)  
-    df_params = get_df_params(api_object)  
-    df_fields = get_df_fields(api_object)
-    df_common = pd.merge(df_params, df_fields, how="inner", on="Name", suffixes=('\n(param)', '\n(field)'))
-
-    try:
-        if format == "xlsx":
-            df_dict = {
-                "Schemas": (df_schemas,{"A:A":50, "B:B":10, "C:C":35, "D:D":100}),
-                "Parameters": (df_params,{"A:A":30, "B:E":10, "F:H":100}),
-                "Fields": (df_fields,{"A:A":30, "B:D":10, "E:G":100}),
-                "Common": (df_common, {"A:A":30, "B:E":10, "F:H":100,"I:K":10, "L:N":100})
-                }
-            save_to_xlsx(df_dict, outfile)
-        elif format == "html":
-            df_dict = {
-                "Parameters": df_params,
-                "Fields": df_fields,
-                "Common": df_common
-                }
-            save_to_html(df_dict, outfile)
-        elif format == "json":
-            save_to_json(api_object, outfile)
-    except Exception as e:
-        logger.error(f"Cannot save result to file '{outfile}'")
-        logger.error(f"{str(e)}")
-        raise typer.Abort()
-    else:
-        logger.log(LOGLEVEL_SUCCESS,f"Result saved to file: '{outfile}'")
-
-def save_to_html(df_dict:dict[str,pd.DataFrame], outfile:Path) -> None:
-    html_top = f"""
-<!doctype html>
-<html lang="en">
-<head>
-    <!-- Required meta tags -->
-    <meta charset="utf-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
-    <!-- Optional meta tags -->
-    <meta name="description" content="Data Dictionary from openapi">
-    <meta name="author" content="{__author__}">
-    <meta name="generator" content="Python script">
-
-    <!-- Bootstrap CSS -->
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.2.2/dist/css/bootstrap.min.css" rel="stylesheet" integrity="sha384-Zenh87qX5JnK2Jl0vWa8Ck2rdkQ2Bzep5IDxbcnCeuOxjzrPF/et3URy9Bv1WTRi" crossorigin="anonymous">
-
-    <title>Data Dictionary - {os.path.basename(all_args["openapi_file"])}</title>
-</head>
-<body>
-    <h1>Data Dictionary</h1>
-    <div style="margin: 2rem;">
-    <hr>    
-    <article><strong>Source: </strong>{os.path.abspath(all_args["openapi_file"])}</article>
-    <article><strong>Generated on: </strong>{datetime.datetime.now()}</article>
-    <hr>
-    <div class="accordion" id="accordion_openapi">
-    """
-    html_end = f"""
-    </div>
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.2.2/dist/js/bootstrap.min.js" integrity="sha384-IDwe1+LCz02ROU9k972gdyvl+AESN10+x7tBKgc9I5HFtuNz0wWnPclzo6p9vxnk" crossorigin="anonymous"></script>
-</body>
-</html>
+def get_memory_usage(profiler:Profiler) -> tuple[int, int]:
+    """ Peak memory of load & analysis and memory retained by the analysis (traced at the start of the summary, once the
+    content of the file is released), from the stages recorded by the profiler.
     """
-    with open(outfile, "w") as f:
-        f.write(html_top)
-        for title, df in df_dict.items():
-            f.write(build_html_table(title, df))    
-        f.write(html_end)
-       
-def save_to_json(api_object:ApiObject, outfile:Path) -> None:   
-    with open(outfile, "w") as f:
-        json.dump(api_object.to_dict(), f, indent=4)
+    stages = [stats for stats in profiler.stages if stats.depth == 0]
+    peak = max(stats.peak for stats in stages if stats.name in ANALYSIS_STAGES)
+    retained = next(stats.mem_start for stats in stages if stats.name == "summary")
+    return peak, retained
 
-def save_to_xlsx(df_dict:dict[str,tuple[pd.DataFrame, dict[str,str]]], outfile=Path) -> None:
-    writer = pd.ExcelWriter(outfile, engine= "xlsxwriter")
-    for title,(df,col_size) in df_dict.items():
-        df
-        df.to_excel(writer, index=False, sheet_name=title, freeze_panes=(1,1))
-        if all_args["excel_with_layout"]:
-            try:
-                xls_formatting(writer=writer, sheet_name=title, column_names=df.columns.values, settings=col_size)
-            except Exception as e:
-                logger.error(f"Cannot customize excel file '{outfile}'")
-                logger.error(f"{str(e)}")
-            else:
-                logger.log(LOGLEVEL_SUCCESS,f"Extra layout/formatting applied on sheet '{title}'")
-    writer.close()
+def report_memory(peak:int, retained:int, low_memory:bool) -> None:
+    sep = '-'*15
+    mode = "low memory" if low_memory else "standard"
+    print(f"{sep} Memory Usage ({mode} mode) {sep}")
+    print(f"- Peak memory (load & analysis): {peak/1024/1024:.1f} MB")
+    print(f"- Retained memory (analysis result): {retained/1024/1024:.1f} MB")
+    print (sep*4)
+    print()
 
 def main(openapi_file:Path = typer.Argument(..., exists=True, readable=True, resolve_path=True, show_default=False, help="The file name (with path) of the file to be analyzed. Both JSON and YAML formats are supported."),
-        format:str = typer.Option("xlsx", "--format", "-f", help="Output format: xlsx, html, json", callback=callback_format),
+        format:str = typer.Option("xlsx", "--format", "-f", help="Output format(s): xlsx, html, json. Several formats can be requested at once as a comma separated list (i.e. xlsx,html,json)", callback=callback_format),
         outdir:Path = typer.Option(None, "--outdir", "-d", exists=False, resolve_path=True, show_default="Same directory as openapi_file", help="Location of the output file", callback=callback_outdir),
         outfile:Path = typer.Option(None, "--outfile", "-o", exists=False, resolve_path=True, show_default="Same directory and filename (with new extension) as openapi_file", help="File Name of the output file"),
         banner:bool = typer.Option(BANNER_DISPLAY, help="Display a banner at start of the program", rich_help_panel="Customization and Utils"),
         debug:bool = typer.Option(DEBUG_CONSOLE, help="Enable debug mode on the console", rich_help_panel="Customization and Utils"),
         excel_with_layout:bool = typer.Option(True, help="Do exta-formatting on all excel sheets", rich_help_panel="Customization and Utils"),
+        validate:bool = typer.Option(True, "--validate/--no-validate", help="Check the structure of the openapi file before analysis (all problems reported at once)"),
+        compact:bool = typer.Option(False, "--compact", help="Write each shared or long specification once in a Definitions sheet/section, rows referencing its ID (smaller & faster outputs)", rich_help_panel="Customization and Utils"),
+        include_path:list[str] = typer.Option(None, "--include-path", help="Analyze only the paths matching this pattern ('*': one segment, '**': any number of segments, i.e. /repos/**)", rich_help_panel="Filter"),
+        exclude_path:list[str] = typer.Option(None, "--exclude-path", help="Do not analyze the paths matching this pattern", rich_help_panel="Filter"),
+        include_tag:list[str] = typer.Option(None, "--include-tag", help="Analyze only the operations having this tag", rich_help_panel="Filter"),
+        method:list[str] = typer.Option(None, "--method", help="Analyze only the operations of this http method", callback=callback_method, rich_help_panel="Filter"),
+        low_memory:bool = typer.Option(False, "--low-memory", help="Release the openapi document as soon as the analysis is done and keep only what the dictionary needs", rich_help_panel="Performance"),
+        max_seconds:float = typer.Option(None, "--max-seconds", help="Time budget of the analysis: once exceeded, schema references are no longer expanded and a partial dictionary is produced", rich_help_panel="Performance"),
+        max_memory:float = typer.Option(None, "--max-memory", help="Memory budget (MB) of the analysis: once exceeded, schema references are no longer expanded and a partial dictionary is produced", rich_help_panel="Performance"),
+        summary_only:bool = typer.Option(False, "--summary-only", help="Only display the summary of analysis (quick counting, no output file generated)", rich_help_panel="Performance"),
+        memory_report:bool = typer.Option(False, "--memory-report", help="Report peak & retained memory of load and analysis", rich_help_panel="Performance"),
+        profile:bool = typer.Option(False, "--profile", help="Report wall time, cpu time, peak memory & object counts for each stage of the processing", rich_help_panel="Performance"),
+        profile_json:Path = typer.Option(None, "--profile-json", exists=False, resolve_path=True, help="Save profiling report as json file (implies --profile)", rich_help_panel="Performance"),
+        use_cache:bool = typer.Option(True, "--cache/--no-cache", help="Reuse loaded document, analysis & outputs cached for an unchanged openapi file", rich_help_panel="Performance"),
+        cache_dir:Path = typer.Option(CACHE_DIR, "--cache-dir", exists=False, resolve_path=True, help="Location of the cache", rich_help_panel="Performance"),
+        cache_size:int = typer.Option(CACHE_MAX_SIZE_MB, "--cache-size", help="Maximum size of the cache in MB (least recently used entries are evicted first)", rich_help_panel="Performance"),
+        profile_dir:Path = typer.Option(None, "--profile-dir", exists=False, resolve_path=True, help="Directory where to dump a cProfile file per stage (implies --profile)", rich_help_panel="Performance"),
         logfile:Path = typer.Option(LOG_FILE, "--logfile", "-l", exists=False, resolve_path=True,  help="logfile of detailed activities (debug mode)", rich_help_panel="Customization and Utils"),
         version:bool = typer.Option(False, "--version", "-v", callback=callback_version, is_eager=True, help="Display version of the program", rich_help_panel="Customization and Utils")
         ) -> None:
-    # Put all arguments in a dictionnary & perform extra validation or default value assigment
-    # Needed in order to be able to compare/use value of other parameters, what was not possible using callback procedure
-    all_args["openapi_file"]=openapi_file
-    all_args["format"]=format
-    all_args["outdir"]=outdir
-    all_args["outfile"]=outfile
-    all_args["banner"]=banner
-    all_args["debug"]=debug
-    all_args["excel_with_layout"]=excel_with_layout
-    all_args["logfile"]=logfile
-    all_args["version"]=version
-    init()
-    validate_params()
+    logger = init(banner, debug, logfile)
+    if outfile and outdir:
+        logger.warning(f"Both outdir and outfile parameters specified. outdir overwritten with path of outfile : {os.path.dirname(outfile)}")
+    profile = profile or bool(profile_json) or bool(profile_dir)
+    profiler = Profiler(enabled=profile or memory_report, count_objects=profile, cprofile_dir=profile_dir)
+    cache = ContentCache(cache_dir, max_size=cache_size*1024*1024, enabled=use_cache)
+    options = DictionaryOptions(excel_with_layout=excel_with_layout, low_memory=low_memory, summary_only=summary_only,
+                                validate=validate, cache=cache, profiler=profiler, logger=logger,
+                                max_seconds=max_seconds, max_memory_mb=max_memory, compact=compact,
+                                spec_filter=SpecFilter(include_path, exclude_path, include_tag, method))
+    logger.debug(f"Options : {options.to_json()}")
+    try:
+        result = build_dictionary(openapi_file, format, options, outdir, outfile)
+    except DictionaryError as e:
+        for line in str(e).splitlines():
+            logger.error(line)
+        raise typer.Abort()
+    report_overview(result.api_object, result.summary, options.spec_filter)
+    if memory_report:
+        report_memory(*get_memory_usage(profiler), low_memory)
 
-    api_content = load_openapi_file(all_args["openapi_file"])
-    api_object = ApiObject(api_content, logger=logger)
-    report_overview(api_object)
-    report_table_summary(api_object, all_args["format"], all_args["outfile"])
+    if profile:
+        profiler.print_report()
+        if profile_json:
+            profiler.save_json(profile_json)
+            logger.log(LOGLEVEL_SUCCESS, f"Profiling report saved to file: '{profile_json}'")
+    profiler.stop()
 
     # End of program
-    if all_args["logfile"]:
-        logger.log(LOGLEVEL_SUCCESS, f'logfile with full debug information available on : {all_args["logfile"]}')
-        
-def validate_params() -> None:
-    # Generate default value for missing outfile and/or outdir parameters
-    if all_args["outfile"] and all_args["outdir"]:  # Both parameters have been specified
-        all_args["outdir"] = os.path.dirname(os.path.abspath(all_args["outfile"]))
-        logger.warning(f"Both outdir and outfile parameters specified. outdir overwrite with path of outfile : {all_args['outdir']}")
-    elif all_args["outdir"]:        # only outdir has been specified
-        filename, _ = os.path.splitext(os.path.basename(all_args["openapi_file"]))
-        filename += "." + all_args["format"]
-        all_args["outfile"] = os.path.join(all_args["outdir"],filename)
-    elif all_args["outfile"]:       # only outfile has been specified
-        all_args["outdir"] = os.path.dirname(os.path.abspath(all_args["outfile"]))
-    else:                           # No parameter specified regarding output
-        all_args["outdir"] = os.path.dirname(os.path.abspath(all_args["openapi_file"]))
-        filename, _ = os.path.splitext(os.path.basename(all_args["openapi_file"]))
-        filename += "." + all_args["format"]
-        all_args["outfile"] = os.path.join(all_args["outdir"],filename)
-
-    # create output directory if not exists
-    outdir=all_args["outdir"]
-    if not os.path.exists(outdir):
-        logger.warning(f"Output directory doesn't exists: '{outdir}'")
-        try:
-            os.makedirs(outdir)                   
-        except Exception as e:
-            logger.error(f"Unable to create output directory '{outdir}':")
-            logger.error(f"{str(e)}")
-            raise typer.Abort()
-        else:
-            logger.log(LOGLEVEL_SUCCESS, f"Output directory successfully created : '{outdir}'")
-
-    # Adapt file extension if not correct
-    file_name, file_ext = os.path.splitext(all_args["outfile"])
-    if not file_ext == "."+all_args["format"]:
-        all_args["outfile"]= file_name + "." + all_args["format"]
-        logger.warning(f"Outfile extension '{file_ext}' doesn't correspond to requested output format '{'.'+all_args['format']}'")
-        logger.warning(f"Outfile has be adapted to '{all_args['outfile']}'")
-
-    # Print all parameters value in case of debug mode
-    all_args_str=""
-    for k,v in all_args.items():
-        all_args_str += f"  - {k}: {v}\n"
-    logger.debug(f"Parameters :\n{all_args_str}")
-
-def xls_formatting(writer:pd.ExcelWriter, sheet_name:str, column_names:list[str], settings:dict[str,str]) -> None:
-    wb = writer.book
-    ws = writer.sheets[sheet_name]
-
-    fmt_cells = wb.add_format({"text_wrap": True, "valign": "top"})
-    for k, v in settings.items():
-        ws.set_column(k,v,fmt_cells)
-    # ws.autofilter('A1:H1')
-    ws.autofilter(0,0,0,len(column_names)-1)
-
-    fmt_header = wb.add_format({
-    "bold": True,
-    "text_wrap": True,
-    "valign": "top",
-    "fg_color": "#4F81BD",
-    "font_color": "#FFFFFF",
-    "border": 1})
-    for col , value in enumerate(column_names):
-        ws.write(0, col, value, fmt_header)
+    if logfile:
+        logger.log(LOGLEVEL_SUCCESS, f"logfile with full debug information available on : {logfile}")
+    logger.shutdown()
 
 if __name__ == "__main__":
-    CONSOLE.clear_screen()
-    typer.run(main)
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        module_name, command = SUBCOMMANDS[sys.argv.pop(1)]
+        typer.run(getattr(importlib.import_module(module_name), command))
+    else:
+        CONSOLE.clear_screen()
+        typer.run(main)
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 __author__ = 'P. Saint-Amand'
 __appname__ = 'open_api_parsing'
-__version__ = '1.0.0'
+__version__ = '1.6.0'       # part of the analysis cache key: to be increased when the analysis or the pickled state of ApiObject changes
 
 # Standard Python Modules
+import copy
+import hashlib
 import json
 import logging
 import re
@@ -11,49 +13,189 @@ import sys
 from os.path import exists
 from typing import Any
 
-# External Python Modules
-from pydantic import Json
-
 # Personal Python Modules
 from utils.coloredlog import ColorLogger, get_logger, LOGLEVEL_SUCCESS, LOGLEVEL_DISABLE
+from utils.profiler import Profiler
+from utils.budget import Budget
+from openapi_validator import HTTP_METHODS, resolve_pointer
 
 def method_name():
     return sys._getframe(  ).f_back.f_code.co_name
 
+_default_logger:ColorLogger = None
+
+def get_default_logger() -> ColorLogger:
+    """ Logger (disabled) shared by all objects restored from a serialized state. """
+    global _default_logger
+    if _default_logger is None:
+        _default_logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_DISABLE)
+    return _default_logger
+
+def canonical_json(obj:Any) -> str:
+    """ json representation independent of dictionary key order (used to compare/sort spec dictionaries). """
+    return json.dumps(obj, sort_keys=True, default=str)
+
+def fingerprint(obj:Any) -> str:
+    """ Structural fingerprint of a value: hash of its canonical json (equal fingerprints <=> equal content). """
+    return hashlib.blake2b(canonical_json(obj).encode("utf-8"), digest_size=16).hexdigest()
+
+def get_items_ref(schema_specs:dict) -> str:
+    """ $ref of the items of an array schema ("" without items, inline items or items as a list). """
+    items = schema_specs.get("items")
+    return items.get("$ref","") if isinstance(items, dict) else ""
+
+def get_schema_type(schema_specs:dict) -> str:
+    """ Type of a schema ("" without type). Since OpenAPI 3.1, 'type' can be a list: 'null' is dropped (as 'nullable' is), other types are joined. """
+    schema_type = schema_specs.get("type") or ""
+    if isinstance(schema_type, list):
+        return " / ".join([value for value in schema_type if value != "null"] or schema_type)
+    return schema_type
+
+def ordered(values, deterministic:bool=False) -> list:
+    """ list of values from a set/list. In deterministic mode, values are sorted (dictionaries on their canonical json). """
+    if not deterministic:
+        return list(values)
+    try:
+        return sorted(values)
+    except TypeError:       # dictionaries or mixed types
+        return sorted(values, key=canonical_json)
+
 class ApiObject():
-    def __init__(self, api_content:Json[Any], logger:ColorLogger=None):
-        self.logger = ColorLogger()
+    """ Registries of parameters, schemas & fields of an openapi document.
+
+    With a budget (time and/or memory), expansion of schema references & association of paths stop once the budget is
+    exhausted: the entities concerned are flagged incomplete and what was skipped is listed in diagnostics.
+    """
+    def __init__(self, api_content:Any, logger:ColorLogger=None, low_memory:bool=False, profiler:Profiler=None, budget:Budget=None):
         if logger is None:
-            self.logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_DISABLE)
+            self.logger = get_default_logger()
         else:
             self.logger = logger
             self.logger.debug(f"ApiObject - Start initialization")
+        if profiler is None:
+            self.profiler = Profiler(enabled=False)
+        else:
+            self.profiler = profiler
+        self.budget:Budget = budget if budget is not None else Budget()
+        self.diagnostics:list[str] = []                             # what was skipped once the budget was exhausted
 
-        self.api_content:Json[Any] = api_content                    # Prerequisite - All other methosds will pick-up data from this field
-        self.api_version:str = api_content.get("openapi",None)      # TODO: Validate it is open API and version 3.x.x
+        self.api_content:Any = api_content                    # Prerequisite - All other methosds will pick-up data from this field
+        self.api_version:str = api_content.get("openapi",None)      # Structure checked beforehand by openapi_validator
         self.api_info:str = self.get_api_info()
         self.servers:list[str] = self.get_api_servers()
         self.paths:list[str] = self.get_api_paths()
-        self.param_ref_dict:dict[str, ApiParameterRef] = self.get_param_references()  # dictionary of param reference name with associated paths & associated & characteristics
-        self.param_dict:dict[str, ApiParameterField] = {}    # dictionary of param with associated paths & associated & characteristics
-        self.schemas_dict:dict[str, ApiSchema] = {}          # dictionary of Schemas with associated fields
-        self.request_fields_dict:dict[str, ApiRequestField] = {}    # dictionary of request fields with associated paths & associated & characteristics
-        self._get_api_params()
-        self._get_api_request_fields()
+        # Registries below are computed lazily, on first access of the corresponding property
+        self._param_ref_dict:dict[str, ApiParameterRef] = None
+        self._param_dict:dict[str, ApiParameterField] = {}
+        self._schemas_dict:dict[str, ApiSchema] = {}
+        self._request_fields_dict:dict[str, ApiRequestField] = {}
+        self._params_parsed:bool = False
+        self._fields_parsed:bool = False
+        # Inline object schemas already walked, per node identity: yaml aliases share the same node between operations
+        self._walked_objects:dict[int, tuple[dict, list[str]]] = {}
+        # (field name, identity of properties) already added: a shared node is compared to the known properties of a field only once
+        self._added_properties:set[tuple[str, int]] = set()
+        self._fingerprints:dict[str, dict[str,str]] = None        # registry -> entity name -> fingerprint, computed once
+        self.low_memory:bool = low_memory                           # document released by parse(), once all registries are final
+
+    def __getstate__(self):
+        """ Compact state used for serialization (pickle): final registries only, without document, logger nor profiler. """
+        self.parse()
+        self.get_fingerprints()                                 # kept with the cached analysis (i.e. reused by each diff)
+        state = self.__dict__.copy()
+        for attribute in ("logger", "profiler", "api_content", "budget"):
+            del state[attribute]
+        state["_param_ref_dict"] = {}
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault("diagnostics", [])
+        state.setdefault("_fingerprints", None)
+        self.__dict__.update(state)
+        self.logger = get_default_logger()
+        self.profiler = Profiler(enabled=False)
+        self.budget = Budget()
+        self.api_content = None
+
+    @property
+    def incomplete(self) -> bool:
+        """ True when part of the analysis was skipped because the budget was exhausted. """
+        return bool(self.diagnostics)
+
+    def _budget_exceeded(self, skipped:str, schema:"ApiSchema"=None) -> bool:
+        """ Check the budget before an expensive step: when exhausted, record the skipped step & flag the schema concerned. """
+        if not self.budget.exceeded():
+            return False
+        if schema is not None:
+            schema.incomplete = True
+        self.diagnostics.append(f"{skipped} ({self.budget.reason})")
+        self.logger.debug("Budget exhausted - %s", self.diagnostics[-1])
+        return True
+
+    @property
+    def param_ref_dict(self) -> dict[str, "ApiParameterRef"]:
+        """ dictionary of param reference name with associated paths & associated & characteristics """
+        if self._param_ref_dict is None:
+            with self.profiler.stage("ApiObject.get_param_references"):
+                self._param_ref_dict = self.get_param_references()
+        return self._param_ref_dict
+
+    @property
+    def param_dict(self) -> dict[str, "ApiParameterField"]:
+        """ dictionary of param with associated paths & associated & characteristics """
+        if not self._params_parsed:
+            self._params_parsed = True
+            with self.profiler.stage("ApiObject._get_api_params"):
+                self._get_api_params()
+        return self._param_dict
+
+    @property
+    def schemas_dict(self) -> dict[str, "ApiSchema"]:
+        """ dictionary of Schemas with associated fields """
+        if not self._fields_parsed:
+            self._fields_parsed = True
+            with self.profiler.stage("ApiObject._get_api_request_fields"):
+                self._get_api_request_fields()
+        return self._schemas_dict
+
+    @property
+    def request_fields_dict(self) -> dict[str, "ApiRequestField"]:
+        """ dictionary of request fields with associated paths & associated & characteristics """
+        if not self._fields_parsed:
+            self._fields_parsed = True
+            with self.profiler.stage("ApiObject._get_api_request_fields"):
+                self._get_api_request_fields()
+        return self._request_fields_dict
+
+    def parse(self):
+        """ Force computation of all registries (otherwise done on first access). In low memory mode, the document is released then. """
+        self.param_dict
+        self.request_fields_dict
+        if self.low_memory and self.api_content is not None:
+            self.release_content()
 
     def _get_api_params(self):
         self.logger.debug(f"{method_name()} - Start")
         ### Prereq : self.param_ref_dict populated
-        self._get_param_from_references()        # get all parameter name found in parameter reference
-        self._get_param_from_path_name()         # get from url name & asssociate path
-        self._get_param_from_path_cmd()          # get from path command (get, put, params), asssociate path &  characteristics
+        with self.profiler.stage("_get_param_from_references"):
+            self._get_param_from_references()        # get all parameter name found in parameter reference
+        with self.profiler.stage("_get_param_from_path_name"):
+            self._get_param_from_path_name()         # get from url name & asssociate path
+        with self.profiler.stage("_get_param_from_path_cmd"):
+            self._get_param_from_path_cmd()          # get from path command (get, put, params), asssociate path &  characteristics
         self.logger.info(f"{method_name()} - {len(self.param_dict)} parameters found in total.")
 
     def _get_api_request_fields(self):
         self.logger.debug(f"{method_name()} - Start")
-        self._get_schemas_and_fields()       # get from component/schemas & get characteristics
-        self._get_fields_from_path_cmd()     # get from path command (get, put, params) then asssociate path & characteristics
+        with self.profiler.stage("_get_schemas_and_fields"):
+            self._get_schemas_and_fields()       # get from component/schemas & get characteristics
+        with self.profiler.stage("_get_fields_from_path_cmd"):
+            self._get_fields_from_path_cmd()     # get from path command (get, put, params) then asssociate path & characteristics
+        self._walked_objects = {}                # no more walk: don't keep slices of the document alive
+        self._added_properties = set()
         self.logger.info(f"{method_name()} - {len(self.request_fields_dict)} fields found in total.")
+        if self.incomplete:
+            self.logger.warning(f"{method_name()} - Analysis incomplete: {len(self.diagnostics)} step(s) skipped ({self.budget.reason})")
 
     def _get_fields_from_path_cmd(self):
         # goals : add path to 
@@ -69,16 +211,21 @@ class ApiObject():
         #     - "oneOf": [{"$ref": "#/components/schemas/UnregisterUserInputEx"}, {"$ref": "#/components/schemas/AdaptiveUnregisterUserInput"}],
         self.logger.debug(f"{method_name()} - Start")
         for path in self.paths:
-            self.logger.debug(f"{method_name()} - Processing path '{path}'")
+            if self._budget_exceeded(f"Path '{path}' not associated to schemas & fields"):
+                continue
+            self.logger.debug(f"{method_name()} - Processing path '%s'", path)
             for cmd, cmd_specs in self.api_content["paths"][path].items():
+                if cmd not in HTTP_METHODS:     # parameters, servers, extensions (x-...) of the path: no request body
+                    continue
                 # cmd_specs can be an array in case body is using multiple templates
                 if type(cmd_specs) == dict:
                     cmd_specs= [cmd_specs]  # transfrom single entry as list
                 elif type(cmd_specs) == list:
                     pass                    #keep as it is
                 else:
-                    self.logger.warning(f"{method_name()} - unknown format for path '{path}', command {cmd}, type:{type(cmd_specs)}")
-                    self.logger.debug(f"{method_name()} - {cmd} details:\n{cmd_specs}")
+                    self.logger.warning(f"{method_name()} - unknown format for path '%s', command %s, type:%s", path, cmd, type(cmd_specs))
+                    self.logger.debug(f"{method_name()} - %s details:\n%s", cmd, cmd_specs)
+                    continue
                 
                 for spec in cmd_specs:
                     self._parse_requestBody(path, cmd, spec)
@@ -88,26 +235,33 @@ class ApiObject():
 
     def _get_param_from_path_cmd(self):
         self.logger.debug(f"{method_name()} - Start")
+        added_specs:set[tuple[str, int]] = set()     # (parameter name, identity of specs): referenced or aliased specs are added once
         for path in self.paths:
             for cmd, cmd_specs in self.api_content["paths"][path].items():
                 if cmd =="parameters":      # case parameters are specified globally for the path, not per command
-                    specs_lst = cmd_specs
-                else:                       # case parameters are specified at the command level
-                    specs_lst = cmd_specs.get("parameters",{})
+                    specs_lst = cmd_specs or []
+                elif cmd in HTTP_METHODS and isinstance(cmd_specs, dict):   # case parameters are specified at the command level
+                    specs_lst = cmd_specs.get("parameters") or []
+                else:                       # summary, description, extensions, ... of the path
+                    continue
                 for param in specs_lst:
                     param_name = param.get("name", "")
                     param_ref_name = param.get("$ref", "")
                     if param_ref_name:
-                        param_specs = self.param_ref_dict.get(param_ref_name, ApiParameterRef).specs
-                        param_name = param_specs.get("name","")          
-                    elif param_name:
-                        param_specs = param
+                        param_ref = self.param_ref_dict.get(param_ref_name)
+                        param_specs = param_ref.specs if param_ref is not None else {}
+                        param_name = param_specs.get("name","") if isinstance(param_specs, dict) else ""
                     else:
-                        self.logger.warning(f"{method_name()} - Parameter element without $ref nor name.")
-                        self.logger.debug(f"{method_name()} - Parameter details:\n{param}")
-                    if param_name and param_name not in self.param_dict:
+                        param_specs = param
+                    if not param_name:
+                        self.logger.warning(f"{method_name()} - Parameter element without $ref nor name (or reference to a parameter without name).")
+                        self.logger.debug(f"{method_name()} - Parameter details:\n%s", param)
+                        continue
+                    if param_name not in self.param_dict:
                         self.param_dict[param_name]=ApiParameterField(param_name, logger=self.logger)
-                    self.param_dict[param_name].add_spec(param_specs)
+                    if (param_name, id(param_specs)) not in added_specs:
+                        added_specs.add((param_name, id(param_specs)))
+                        self.param_dict[param_name].add_spec(param_specs)
                     self.param_dict[param_name].add_path(path)
         self.logger.info(f"{method_name()} - {len(self.param_dict)} parameters found from now.")
 
@@ -115,7 +269,7 @@ class ApiObject():
         self.logger.debug(f"{method_name()} - Start")
         for path in self.paths:
             if "{" in path:
-                self.logger.debug(f"{method_name()} - retrieving parameter(s) from path {path}")
+                self.logger.debug(f"{method_name()} - retrieving parameter(s) from path %s", path)
                 current_params = re.findall(r"{(.*?)}", path)
                 for current_param in current_params:
                     if current_param not in self.param_dict:
@@ -129,9 +283,9 @@ class ApiObject():
         self.logger.debug(f"{method_name()} - Start")
         for ref_name, ref_specs in self.param_ref_dict.items():
             param_specs = ref_specs.specs
-            param_name = param_specs.get("name","")
+            param_name = param_specs.get("name","") if isinstance(param_specs, dict) else ""
             if not param_name:
-                self.logger.error(f"{method_name()} - parameter with no name: {param_specs}")
+                self.logger.error(f"{method_name()} - parameter with no name: %s", param_specs)
             else:
                 # Create Param File Object if not exists then add specifications
                 if param_name not in self.param_dict:
@@ -141,7 +295,12 @@ class ApiObject():
 
     def _get_schemas_and_fields(self):
         self.logger.debug(f"{method_name()} - Start")
-        for schema_name_short, schema_specs in self.api_content.get("components",{}).get("schemas",{}).items():
+        for schema_name_short, schema_specs in ((self.api_content.get("components") or {}).get("schemas") or {}).items():
+            schema_name = "#/components/schemas/" + schema_name_short
+            if schema_name not in self.schemas_dict and self.budget.exceeded():
+                self.schemas_dict[schema_name] = ApiSchema(schema_name)
+                self._budget_exceeded(f"Schema '{schema_name}' not parsed", self.schemas_dict[schema_name])
+                continue
             # Create Param File Object if not exists
             self._parse_one_schema(schema_name_short, schema_specs)
         self.logger.info(f"{method_name()} - {len(self.request_fields_dict)} fields found from now.")
@@ -153,41 +312,58 @@ class ApiObject():
             self._parse_schema_specs(schema_name, schema_specs)                  
 
     def _parse_one_schema_field(self, field_name, properties, schema_name):
+            # Registries are accessed directly: this runs during their computation, once per field of each schema
+            request_fields_dict = self._request_fields_dict
             #1. Create field if not exists
-            if field_name not in self.request_fields_dict:
-                self.request_fields_dict[field_name] = ApiRequestField(field_name)
+            field_object = request_fields_dict.get(field_name)
+            if field_object is None:
+                field_object = request_fields_dict[field_name] = ApiRequestField(field_name)
             #2. Link field to schema & schema to field
             if schema_name:
-                self.schemas_dict[schema_name].add_field(field_name)                    # Add field_name to the list of fields associated to this schema
-                self.request_fields_dict[field_name].add_schema(schema_name)
-            #3. Add field properties
-            self.request_fields_dict[field_name].add_properties(properties)
+                self._schemas_dict[schema_name].add_field(field_name)                   # Add field_name to the list of fields associated to this schema
+                field_object.add_schema(schema_name)
+            #3. Add field properties (once per node: yaml aliases reach the same field with the same node again)
+            added_key = (field_name, id(properties))
+            if added_key not in self._added_properties:
+                self._added_properties.add(added_key)
+                field_object.add_properties(properties)
             #4. if properties contains schema reference, process that schema
             ref=properties.get("$ref","")
             if not ref:
-                ref=properties.get("items",{}).get("$ref","")
+                ref=get_items_ref(properties)
+            if ref and schema_name and self._budget_exceeded(f"Reference '{ref}' of field '{field_name}' not expanded in schema '{schema_name}'", self.schemas_dict[schema_name]):
+                ref = ""
             if ref:
                 # Get short name, retrieve specs, then process this schema if not yet done
                 ref_short= ref[ref.rfind('/')+1:]
-                self.logger.debug(f"Schema {schema_name} - Processing Schema reference {ref} --> {ref_short}")
-                schema_specs = self.api_content.get("components",{}).get("schemas",{}).get(ref_short,{})
+                self.logger.debug("Schema %s - Processing Schema reference %s --> %s", schema_name, ref, ref_short)
+                schema_specs = ((self.api_content.get("components") or {}).get("schemas") or {}).get(ref_short,{})
                 if ref not in self.schemas_dict:
                     self._parse_one_schema(schema_name_short=ref_short, schema_specs=schema_specs)
                 # add fields of referenced schema to current one
-                if schema_name:
-                    for field_ref in self.schemas_dict.get(ref,ApiSchema(ref)).fields:
-                        self.schemas_dict[schema_name].add_field(field_ref)                    # Add field_name to the list of fields associated to this schema
-                        self.request_fields_dict[field_ref].add_schema(schema_name)
+                if schema_name and ref in self._schemas_dict:
+                    schema_object = self._schemas_dict[schema_name]
+                    for field_ref in self._schemas_dict[ref].fields:
+                        schema_object.add_field(field_ref)                    # Add field_name to the list of fields associated to this schema
+                        request_fields_dict[field_ref].add_schema(schema_name)
     
     def _parse_requestBody(self, path, cmd, spec):
-        body_content = spec.get("requestBody",{}).get("content",{})
+        body_content = self._get_request_body(spec).get("content") or {}
         for media_type, media_object in body_content.items():
-            body_schema = media_object.get("schema",{})
-            body_schema_type = body_schema.get("type", "")
+            body_schema = media_object.get("schema") or {}
+            body_schema_type = get_schema_type(body_schema)
             body_schema_ref = body_schema.get("$ref", "")
             full_path = f"{path}/{cmd}/requestBody/content/{media_type}"
 
             fields_to_add_path = []
+            if body_schema_ref and body_schema_ref not in self.schemas_dict:
+                # Reference to another part of the document (i.e. schema of a request body of components): parsed as an inline schema
+                target = resolve_pointer(self.api_content, body_schema_ref) if body_schema_ref.startswith("#") else None
+                if isinstance(target, dict):
+                    body_schema, body_schema_type, body_schema_ref = target, get_schema_type(target), ""
+                else:
+                    self.logger.warning(f"{method_name()} - %s - schema reference '%s' not resolved: no field associated", full_path, body_schema_ref)
+                    continue
             if body_schema_ref:
                 self.schemas_dict[body_schema_ref].add_path(path)             # Associate path to the schema
                 fields_to_add_path = self.schemas_dict[body_schema_ref].fields
@@ -197,23 +373,33 @@ class ApiObject():
                 elif body_schema_type == "array":
                     fields_to_add_path = self._parse_schema_type_array(schema_name="", schema_specs=body_schema)
                 else:
-                    self.logger.warning(f"{method_name()} - {full_path} - schema type '{body_schema_type}' doesn't not contains field name. Considered as a bad practice for body part")
-                    self.logger.debug(f"{method_name()} - Schema details: {body_schema}")
+                    self.logger.warning(f"{method_name()} - %s - schema type '%s' doesn't not contains field name. Considered as a bad practice for body part", full_path, body_schema_type)
+                    self.logger.debug(f"{method_name()} - Schema details: %s", body_schema)
             else:
-                self.logger.warning(f"{method_name()} - {full_path} - schema without $ref or type.")
-                self.logger.debug(f"{method_name()} - Schema details\n{body_schema}")
+                self.logger.warning(f"{method_name()} - %s - schema without $ref or type.", full_path)
+                self.logger.debug(f"{method_name()} - Schema details\n%s", body_schema)
             
             # Associate path to all fields of the schema
-            self.logger.debug(f"{method_name()} - Add path {path} to fields {fields_to_add_path}")
-            for field in fields_to_add_path:                     
-                self.request_fields_dict.get(field, ApiRequestField(field)).add_path(path)
+            self.logger.debug(f"{method_name()} - Add path %s to fields %s", path, fields_to_add_path)
+            request_fields_dict = self.request_fields_dict
+            for field in fields_to_add_path:
+                field_object = request_fields_dict.get(field)
+                if field_object is not None:
+                    field_object.add_path(path)
+
+    def _get_request_body(self, spec:dict) -> dict:
+        """ Request body of an operation, the one of components when it is a reference ({} if none). """
+        request_body = spec.get("requestBody") or {}
+        if isinstance(request_body.get("$ref"), str) and request_body["$ref"].startswith("#"):
+            request_body = resolve_pointer(self.api_content, request_body["$ref"], {})
+        return request_body if isinstance(request_body, dict) else {}
 
     def _parse_responses(self, path, cmd, spec):
         #TODO: Parse responses ?
         pass
 
     def _parse_schema_specs(self, schema_name="", schema_specs={}):
-        schema_type = schema_specs.get("type",None)
+        schema_type = get_schema_type(schema_specs)
         schema_lst = schema_specs.get("allOf",None) or schema_specs.get("oneOf",None)
         if schema_type:
             self.schemas_dict.get(schema_name, ApiSchema(None)).type = schema_type
@@ -222,25 +408,29 @@ class ApiObject():
             elif schema_type == "string":
                 # skip as this represents a format for fields but not a field itself.
                 # self.request_fields_dict[field_name].add_properties(schema_specs)
-                self.logger.debug(f"{method_name()} - Schema '{schema_name}' of type '{schema_type}' not supported/parsed")
+                self.logger.debug(f"{method_name()} - Schema '%s' of type '%s' not supported/parsed", schema_name, schema_type)
             elif schema_type == "array":
                 self._parse_schema_type_array(schema_name, schema_specs)
             else:
-                self.logger.warning(f"{method_name()} - Schema '{schema_name}' of type '{schema_type}' not supported/parsed")
+                self.logger.warning(f"{method_name()} - Schema '%s' of type '%s' not supported/parsed", schema_name, schema_type)
         elif schema_lst:
             # TODO: allOf / oneOf
             self.schemas_dict.get(schema_name, ApiSchema(None)).type = "allOf / oneOf"
-            self.logger.warning(f"{method_name()} - Schema '{schema_name}' with allOf / oneOf --> not processed for now")
+            self.logger.warning(f"{method_name()} - Schema '%s' with allOf / oneOf --> not processed for now", schema_name)
 
         else:
             self.schemas_dict.get(schema_name, ApiSchema(None)).type = "None"
-            self.logger.warning(f"{method_name()} - Schema '{schema_name}' doesn't have 1 of the following properties ['type', 'oneOf', 'allOf'] -> type='object' format assumed.")
-            self.logger.debug(f"{method_name()} - Schema '{schema_name}' details:\n{schema_specs}")
+            self.logger.warning(f"{method_name()} - Schema '%s' doesn't have 1 of the following properties ['type', 'oneOf', 'allOf'] -> type='object' format assumed.", schema_name)
+            self.logger.debug(f"{method_name()} - Schema '%s' details:\n%s", schema_name, schema_specs)
             self._parse_schema_type_object(schema_name, schema_specs)
      
     def _parse_schema_type_array(self, schema_name="", schema_specs={}):
         fields_parsed=[]
-        ref=schema_specs.get("items", "").get("$ref","")
+        ref=get_items_ref(schema_specs)
+        if not ref:
+            if "items" not in schema_specs:
+                self.logger.warning(f"{method_name()} - Array schema '%s' without items: no field associated", schema_name)
+            return fields_parsed
         fields_parsed = self.schemas_dict.get(ref,ApiSchema(ref)).fields
         # add fields of referenced schema to current one
         if schema_name:
@@ -251,26 +441,34 @@ class ApiObject():
         return fields_parsed
 
     def _parse_schema_type_object(self, schema_name, schema_specs):
+        # Inline (anonymous) object already walked: same fields, nothing new to register
+        if not schema_name:
+            walked = self._walked_objects.get(id(schema_specs))
+            if walked is not None and walked[0] is schema_specs:
+                return walked[1]
         fields_parsed=[]
         # Loop through all fields for this schema object definition
-        for field_name, properties in schema_specs.get("properties",{}).items():
+        for field_name, properties in (schema_specs.get("properties") or {}).items():
             fields_parsed.append(field_name)
             self._parse_one_schema_field(field_name, properties, schema_name)
         
-        for field_name in schema_specs.get("required",[]):                          # Flag all fields specified as required
+        for field_name in schema_specs.get("required") or []:                            # Flag all fields specified as required
             if field_name not in self.request_fields_dict:                          # Create new field object if not exists yet
                 self.request_fields_dict[field_name] = ApiRequestField(field_name)
             self.request_fields_dict[field_name].required = True
+        if not schema_name:
+            self._walked_objects[id(schema_specs)] = (schema_specs, fields_parsed)
         return fields_parsed
 
     def get_api_info(self):
         self.logger.debug(f"{method_name()} - Start")
-        api_info_dic = self.api_content.get("info",{})
-        return api_info_dic.get("title", "") + " v" + api_info_dic.get("version", "")
+        api_info_dic = self.api_content.get("info") or {}
+        version = api_info_dic.get("version", "")
+        return api_info_dic.get("title", "") + " v" + (str(version) if version is not None else "")      # version may be read as a number
 
     def get_api_paths(self):
         self.logger.debug(f"{method_name()} - Start")
-        api_obj = self.api_content.get("paths",{})
+        api_obj = self.api_content.get("paths") or {}
         obj_type = type(api_obj)
         if obj_type == dict:
             return_value = sorted(api_obj.keys())
@@ -286,7 +484,7 @@ class ApiObject():
   
     def get_api_schemas(self):
         self.logger.debug(f"{method_name()} - Start")
-        api_schema_dic = self.api_content.get("components",{}).get("schemas",{})
+        api_schema_dic = (self.api_content.get("components") or {}).get("schemas") or {}
         if api_schema_dic:
             self.logger.info(f"{method_name()} - {len(api_schema_dic)} schemas found.")
         else:
@@ -295,13 +493,13 @@ class ApiObject():
     
     def get_api_servers(self):
         self.logger.debug(f"{method_name()} - Start")
-        api_servers_url_lst = [srv.get("url","") for srv in self.api_content.get("servers",[])]
+        api_servers_url_lst = [srv.get("url","") for srv in self.api_content.get("servers") or []]
         return sorted(api_servers_url_lst)    
   
     def get_param_references(self):
         self.logger.debug(f"{method_name()} - Start")
         param_ref_dict:dict[str, ApiParameterRef] = {}
-        for param_ref_name_short, param_specs in self.api_content.get("components",{}).get("parameters",{}).items():
+        for param_ref_name_short, param_specs in ((self.api_content.get("components") or {}).get("parameters") or {}).items():
             # Create Param File Object if not exists
             param_ref_name = "#/components/parameters/" + param_ref_name_short
             if param_ref_name not in param_ref_dict:
@@ -309,37 +507,157 @@ class ApiObject():
             param_ref_dict[param_ref_name].add_spec(param_specs)
         return param_ref_dict
 
-    def to_dict(self):
+    def get_summary(self) -> dict[str,int]:
+        """ Return the number of servers, paths, schemas, parameters & fields.
+
+        Registries already computed are used as is. Otherwise names are retrieved through cheap counting passes
+        on the openapi document, without any field resolution nor $ref expansion.
+        """
+        if self._params_parsed or self.api_content is None:
+            param_names = set(self.param_dict.keys())
+        else:
+            param_names = self._count_param_names()
+        if self._fields_parsed or self.api_content is None:
+            schema_names = set(self.schemas_dict.keys())
+            field_names = set(self.request_fields_dict.keys())
+        else:
+            schema_names, field_names = self._count_schema_and_field_names()
+        summary = {
+            "servers": len(self.servers),
+            "paths": len(self.paths or []),
+            "schemas": len(schema_names),
+            "parameters": len(param_names),
+            "fields": len(field_names),
+            "common": len(param_names.intersection(field_names))
+        }
+        return summary
+
+    def _count_param_names(self) -> set[str]:
+        self.logger.debug(f"{method_name()} - Start")
+        param_refs = (self.api_content.get("components") or {}).get("parameters") or {}
+        param_names = {param_specs.get("name","") for param_specs in param_refs.values() if isinstance(param_specs, dict)}
+        for path in self.paths or []:
+            param_names.update(re.findall(r"{(.*?)}", path))
+            for cmd, cmd_specs in self.api_content["paths"][path].items():
+                if cmd =="parameters":
+                    specs_lst = cmd_specs or []
+                elif cmd in HTTP_METHODS and type(cmd_specs) == dict:
+                    specs_lst = cmd_specs.get("parameters") or []
+                else:
+                    continue
+                for param in specs_lst:
+                    param_ref_name = param.get("$ref", "")
+                    if param_ref_name:
+                        param_specs = param_refs.get(param_ref_name[param_ref_name.rfind('/')+1:],{})
+                        param_names.add(param_specs.get("name","") if isinstance(param_specs, dict) else "")
+                    else:
+                        param_names.add(param.get("name", ""))
+        param_names.discard("")
+        return param_names
+
+    def _count_schema_and_field_names(self) -> tuple[set[str],set[str]]:
+        self.logger.debug(f"{method_name()} - Start")
+        components_schemas = (self.api_content.get("components") or {}).get("schemas") or {}
+        schema_names = {"#/components/schemas/" + schema_name_short for schema_name_short in components_schemas}
+        field_names = set()
+
+        def count_object(schema_specs):
+            for properties in (schema_specs.get("properties") or {}).values():
+                ref = properties.get("$ref","") or get_items_ref(properties)
+                if ref:
+                    schema_names.add("#/components/schemas/" + ref[ref.rfind('/')+1:])
+            field_names.update((schema_specs.get("properties") or {}).keys())
+            field_names.update(schema_specs.get("required") or [])
+
+        # Same rules as _parse_schema_specs: only 'object' schemas (or schemas without type/allOf/oneOf) define fields
+        for schema_specs in components_schemas.values():
+            schema_type = get_schema_type(schema_specs)
+            if schema_type == "object" or not (schema_type or schema_specs.get("allOf",None) or schema_specs.get("oneOf",None)):
+                count_object(schema_specs)
+        # Inline request bodies
+        for path in self.paths or []:
+            for cmd, cmd_specs in self.api_content["paths"][path].items():
+                if cmd not in HTTP_METHODS:
+                    continue
+                if type(cmd_specs) == dict:
+                    cmd_specs = [cmd_specs]
+                elif type(cmd_specs) != list:
+                    continue
+                for spec in cmd_specs:
+                    if type(spec) != dict:
+                        continue
+                    for media_object in (self._get_request_body(spec).get("content") or {}).values():
+                        body_schema = media_object.get("schema") or {}
+                        if not body_schema.get("$ref", "") and get_schema_type(body_schema) == "object":
+                            count_object(body_schema)
+        return schema_names, field_names
+
+    def release_content(self):
+        """ Drop the raw openapi document & intermediate structures once all registries are final.
+
+        Only the slices of the document referenced by the registries (specs/properties of each field) remain in memory.
+        """
+        self.logger.debug(f"{method_name()} - Releasing openapi document & parameter references")
+        self.api_content = None
+        self._param_ref_dict = {}
+
+    def subset(self, schemas:set[str], params:set[str], fields:set[str]) -> "ApiObject":
+        """ Analysis restricted to some schemas, parameters & fields (i.e. those of one tag). Entities are shared, not copied. """
+        self.parse()
+        subset = copy.copy(self)
+        subset._schemas_dict = {name: schema for name, schema in self._schemas_dict.items() if name in schemas}
+        subset._param_dict = {name: param for name, param in self._param_dict.items() if name in params}
+        subset._request_fields_dict = {name: field for name, field in self._request_fields_dict.items() if name in fields}
+        subset._fingerprints = None
+        return subset
+
+    def get_fingerprints(self) -> dict[str, dict[str,str]]:
+        """ Structural fingerprint of each schema, parameter & field, per registry (schemas_dict, param_dict, request_fields_dict).
+
+        Computed once per analysis (entities no longer change once parsed) and pickled with it.
+        """
+        if self._fingerprints is None:
+            self._fingerprints = {registry: {name: entity.fingerprint() for name, entity in getattr(self, registry).items()}
+                                  for registry in ("schemas_dict", "param_dict", "request_fields_dict")}
+        return self._fingerprints
+
+    def to_dict(self, deterministic:bool=False):
+        """ Dictionary of Schemas, Parameters & Fields.
+
+        In deterministic mode, all lists are sorted so that the same analysis always gives the same output
+        (byte-level comparison possible with to_json).
+        """
         to_return={}
 
         schemas_lst=[]
         for k,v in sorted(self.schemas_dict.items()):
-            schemas_lst.append(v.to_dict())
+            schemas_lst.append(v.to_dict(deterministic))
         to_return["Schemas"]=schemas_lst
 
         params_lst=[]
         for k,v in sorted(self.param_dict.items()):
-            params_lst.append(v.to_dict())
+            params_lst.append(v.to_dict(deterministic))
         to_return["Parameters"]=params_lst
 
         fields_lst=[]
         for k,v in sorted(self.request_fields_dict.items()):
-            fields_lst.append(v.to_dict())
+            fields_lst.append(v.to_dict(deterministic))
         to_return["Fields"]=fields_lst
-        
+
+        if self.diagnostics:
+            to_return["Diagnostics"]=list(self.diagnostics)
         return to_return
 
-    def to_json(self, indent=None):
-        return json.dumps(self.to_dict(), indent=indent)
+    def to_json(self, indent=None, deterministic:bool=False):
+        return json.dumps(self.to_dict(deterministic), indent=indent, sort_keys=deterministic, default=str)
         
 class ApiParameterRef():
     def __init__(self, ref_name:str, logger:ColorLogger=None):
-        self.logger = ColorLogger()
         if logger is None:
-            self.logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_DISABLE)
+            self.logger = get_default_logger()
         else:
             self.logger = logger
-            self.logger.debug(f"ApiParameterRef - Initialization of '{ref_name}'")
+            self.logger.debug("ApiParameterRef - Initialization of '%s'", ref_name)
 
         self.ref_name:str = ref_name
         self.specs:dict = {}
@@ -350,6 +668,15 @@ class ApiParameterRef():
     def __repr__(self):
         return self.__str__()
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["logger"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = get_default_logger()
+
     def add_spec(self, spec:dict):       
         self.specs = spec
  
@@ -362,12 +689,11 @@ class ApiParameterRef():
 
 class ApiParameterField():
     def __init__(self, fieldname:str, logger:ColorLogger=None):
-        self.logger = ColorLogger()
         if logger is None:
-            self.logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_DISABLE)
+            self.logger = get_default_logger()
         else:
             self.logger = logger
-            self.logger.debug(f"ApiParameterField - Initialization of '{fieldname}'")
+            self.logger.debug("ApiParameterField - Initialization of '%s'", fieldname)
 
         self.fieldname:str = fieldname
         self.descriptions:set(str) = set()
@@ -397,6 +723,15 @@ class ApiParameterField():
     def __repr__(self):
         return self.__str__()
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["logger"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = get_default_logger()
+
     def add_description(self, description:str):
         if description:
             self.descriptions.add(description)
@@ -427,29 +762,33 @@ class ApiParameterField():
             self.add_description(spec.get("description",""))
             self.add_required(spec.get("required",False))
             self.add_location(spec.get("in",""))
-            self.add_schema(spec.get("schema",{}))
-            self.add_schema_type(spec.get("schema",{}).get("type",""))
+            self.add_schema(spec.get("schema") or {})
+            self.add_schema_type(get_schema_type(spec.get("schema") or {}))
 
-    def to_dict(self):
-        to_return = {"fieldname": self.fieldname, "descriptions": list(self.descriptions), "locations":list(self.locations), "paths": list(self.paths), "required":self.required,
-                     "schemas": list(self.schemas), "schema_types": list(self.schema_types), "specs": list(self.specs)
+    def to_dict(self, deterministic:bool=False):
+        to_return = {"fieldname": self.fieldname, "descriptions": ordered(self.descriptions, deterministic), "locations": ordered(self.locations, deterministic),
+                     "paths": ordered(self.paths, deterministic), "required":self.required, "schemas": ordered(self.schemas, deterministic),
+                     "schema_types": ordered(self.schema_types, deterministic), "specs": ordered(self.specs, deterministic)
                      }
         return to_return
         
-    def to_json(self, indent=None):
-        return json.dumps(self.to_dict(), indent=indent)
+    def to_json(self, indent=None, deterministic:bool=False):
+        return json.dumps(self.to_dict(deterministic), indent=indent, sort_keys=deterministic, default=str)
+
+    def fingerprint(self) -> str:
+        return fingerprint(self.to_dict(deterministic=True))
 
 class ApiSchema():
     def __init__(self, schemaname:str, logger:ColorLogger=None):
-        self.logger = ColorLogger()
         if logger is None:
-            self.logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_DISABLE)
+            self.logger = get_default_logger()
         else:
             self.logger = logger
-            self.logger.debug(f"ApiSchema - Initialization of '{schemaname}'")
+            self.logger.debug("ApiSchema - Initialization of '%s'", schemaname)
 
         self.schemaname:str = schemaname
         self.type:str = ""
+        self.incomplete:bool = False                # references not (fully) expanded: budget of the analysis exhausted
         self.fields:set(str) = set()
         self.paths:set(str) = set()
         # self.properties:list[dict] = []
@@ -461,6 +800,16 @@ class ApiSchema():
     def __repr__(self):
         return self.__str__()
     
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["logger"]
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault("incomplete", False)
+        self.__dict__.update(state)
+        self.logger = get_default_logger()
+
     def add_path(self, path:str):
         if path:
             self.paths.add(path)
@@ -469,21 +818,25 @@ class ApiSchema():
         if fieldname:
             self.fields.add(fieldname)
     
-    def to_dict(self):
-        to_return = {"schemaname": self.schemaname, "type": self.type, "fields": list(self.fields), "paths": list(self.paths)}
+    def to_dict(self, deterministic:bool=False):
+        to_return = {"schemaname": self.schemaname, "type": self.type, "fields": ordered(self.fields, deterministic), "paths": ordered(self.paths, deterministic)}
+        if self.incomplete:
+            to_return["incomplete"] = True
         return to_return
 
-    def to_json(self, indent=None):
-        return json.dumps(self.to_dict(), indent=indent)
+    def to_json(self, indent=None, deterministic:bool=False):
+        return json.dumps(self.to_dict(deterministic), indent=indent, sort_keys=deterministic, default=str)
+
+    def fingerprint(self) -> str:
+        return fingerprint(self.to_dict(deterministic=True))
 
 class ApiRequestField():
     def __init__(self, fieldname:str, logger:ColorLogger=None):
-        self.logger = ColorLogger()
         if logger is None:
-            self.logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_DISABLE)
+            self.logger = get_default_logger()
         else:
             self.logger = logger
-            self.logger.debug(f"ApiRequestField - Initialization of '{fieldname}'")
+            self.logger.debug("ApiRequestField - Initialization of '%s'", fieldname)
         
         self.fieldname:str = fieldname
         self.descriptions:set(str) = set()
@@ -499,6 +852,15 @@ class ApiRequestField():
     def __repr__(self):
         return self.__str__()
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["logger"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = get_default_logger()
+
     def add_description(self, description:str):
         if description:
             self.descriptions.add(description)
@@ -508,10 +870,11 @@ class ApiRequestField():
             self.paths.add(path)
 
     def add_properties(self, properties:dict):
+        # Properties are kept by reference (nodes shared by yaml aliases are stored once). 'in' compares identity first
         if properties and properties not in self.properties:
             self.properties.append(properties)
             self.add_description(properties.get("description",""))
-            self.add_type(properties.get("type",""))
+            self.add_type(get_schema_type(properties))
 
     def add_schema(self, schema:str):
         if schema:
@@ -521,14 +884,18 @@ class ApiRequestField():
         if type:
             self.types.add(type)
 
-    def to_dict(self):
-        to_return = {"fieldname": self.fieldname, "descriptions": list(self.descriptions), "paths": list(self.paths), 
-                     "properties": list(self.properties), "required":self.required, "schemas": list(self.schemas), "types": list(self.types)
+    def to_dict(self, deterministic:bool=False):
+        to_return = {"fieldname": self.fieldname, "descriptions": ordered(self.descriptions, deterministic), "paths": ordered(self.paths, deterministic), 
+                     "properties": ordered(self.properties, deterministic), "required":self.required, "schemas": ordered(self.schemas, deterministic),
+                     "types": ordered(self.types, deterministic)
                      }
         return to_return
         
-    def to_json(self, indent=None):
-        return json.dumps(self.to_dict(), indent=indent)
+    def to_json(self, indent=None, deterministic:bool=False):
+        return json.dumps(self.to_dict(deterministic), indent=indent, sort_keys=deterministic, default=str)
+
+    def fingerprint(self) -> str:
+        return fingerprint(self.to_dict(deterministic=True))
 
 if __name__ == "__main__":
     import yaml
@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'openapi_validator'
+__version__ = '1.2.0'       # part of the analysis cache key: to be increased when the rules change
+
+'''
+Structural validation of an OpenAPI 3.x document, before any analysis.
+
+Checks are declared in the rule table RULES (one Rule per check, per kind of node) and compiled once per validator:
+rules are grouped per kind of node, so that the document is walked once and each node only runs its own checks.
+All problems are returned at once; issues of severity 'error' would make the analysis fail (or be wrong), 'warning' not.
+
+    python openapi_validator.py sample_input/*.yaml      # exit code 1 if a document has errors
+'''
+
+# Standard Python Modules
+import re
+from typing import Any, Callable
+from urllib.parse import unquote
+
+# External Python Modules
+
+# Personal Python Modules
+from params import *
+
+SEVERITY_ERROR = "error"
+SEVERITY_WARNING = "warning"
+HTTP_METHODS = ["get", "put", "post", "delete", "options", "head", "patch", "trace"]
+PATH_ITEM_FIELDS = HTTP_METHODS + ["$ref", "summary", "description", "servers", "parameters"]
+PARAMETER_LOCATIONS = ["query", "header", "path", "cookie"]
+# Keys holding a map of names (their own keys are never keywords) & keys holding literal values (never walked for references)
+NAME_MAP_KEYS = {"paths", "schemas", "properties", "patternProperties", "parameters", "responses", "requestBodies", "headers", "examples",
+                 "securitySchemes", "links", "callbacks", "content", "encoding", "mapping", "definitions", "variables"}
+LITERAL_KEYS = {"example", "default", "enum", "const"}
+# Kind of the nodes held by a key: items of a list / values of a map of names (ITEM_KINDS) or the value itself (VALUE_KINDS)
+ITEM_KINDS = {"parameters": "parameter", "requestBodies": "request_body", "responses": "response", "schemas": "schema", "properties": "schema",
+              "patternProperties": "schema", "allOf": "schema", "oneOf": "schema", "anyOf": "schema", "headers": "header", "examples": "example",
+              "links": "link", "callbacks": "callback", "securitySchemes": "security_scheme"}
+VALUE_KINDS = {"requestBody": "request_body", "schema": "schema", "items": "schema", "not": "schema", "additionalProperties": "schema"}
+# Component type a reference must target, per kind of node holding the reference
+REF_COMPONENTS = {"parameter": "parameters", "request_body": "requestBodies", "response": "responses", "schema": "schemas", "header": "headers",
+                  "example": "examples", "link": "links", "callback": "callbacks", "security_scheme": "securitySchemes"}
+COMPONENTS_PREFIX = "#/components/"
+_MISSING = object()
+VERSION_REGEX = re.compile(r"^3\.\d+(\.\d+)?(-[\w.]+)?$")
+
+class ValidationIssue():
+    def __init__(self, location:str, rule_id:str, severity:str, message:str):
+        self.location:str = location            # json pointer of the node (i.e. '/paths/~1pets/get/parameters/0')
+        self.rule_id:str = rule_id
+        self.severity:str = severity
+        self.message:str = message
+
+    def __str__(self):
+        return f"{self.location or '/'} - {self.message} [{self.rule_id}]"
+
+    def __repr__(self):
+        return f"ValidationIssue('{self.location}', '{self.rule_id}')"
+
+    def to_dict(self):
+        to_return = {"location": self.location, "rule_id": self.rule_id, "severity": self.severity, "message": self.message}
+        return to_return
+
+class Rule():
+    """ One check on one kind of node.
+
+    - kind: node checked (document, info, server, components, path_item, operation, parameter, request_body, media_type, response, schema, ref)
+    - field: if set, check receives node[field] (None if missing) instead of the node
+    - check: return True when the node is valid
+    - message: reported message, '{value}' is replaced by the checked value
+    """
+    def __init__(self, kind:str, rule_id:str, check:Callable[[Any], bool], message:str, field:str=None, severity:str=SEVERITY_ERROR):
+        self.kind = kind
+        self.rule_id = rule_id
+        self.check = check
+        self.message = message
+        self.field = field
+        self.severity = severity
+
+def is_optional(value_type:type) -> Callable[[Any], bool]:
+    return lambda value: value is None or isinstance(value, value_type)
+
+def as_list(value:Any) -> list:
+    """ value if it is a list, else an empty list (wrong types are reported by their own rule). """
+    return value if isinstance(value, list) else []
+
+def is_string_list(value:Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+def has_unique_parameters(value:Any) -> bool:
+    """ True when a list of parameters holds no duplicate: same reference, or same name & location. """
+    params = [param for param in as_list(value) if isinstance(param, dict)]
+    keys = [repr(param["$ref"]) if "$ref" in param else repr((param.get("name"), param.get("in"))) for param in params]
+    return len(set(keys)) == len(keys)
+
+def short_repr(value:Any, max_length:int=60) -> str:
+    value = repr(value)
+    return value if len(value) <= max_length else value[:max_length] + "..."
+
+RULES = [
+    # Document
+    Rule("document", "document-object", lambda node: isinstance(node, dict), "document must be an object (found {value})"),
+    Rule("document", "openapi-version", lambda value: isinstance(value, str) and bool(VERSION_REGEX.match(value)),
+         "'openapi' must be a 3.x version (found {value})", field="openapi"),
+    Rule("document", "info-object", lambda value: isinstance(value, dict) and "title" in value and "version" in value,
+         "'info' must be an object with 'title' and 'version'", field="info"),
+    Rule("info", "info-title-string", lambda value: isinstance(value, str), "'title' must be a string (found {value})", field="title"),
+    Rule("info", "info-version-string", lambda value: isinstance(value, str), "'version' should be a string (found {value})", field="version",
+         severity=SEVERITY_WARNING),
+    Rule("document", "servers-list", is_optional(list), "'servers' must be a list (found {value})", field="servers"),
+    Rule("document", "paths-object", is_optional(dict), "'paths' must be an object (found {value})", field="paths"),
+    Rule("document", "components-object", is_optional(dict), "'components' must be an object (found {value})", field="components"),
+    Rule("components", "components-schemas-object", is_optional(dict), "'schemas' must be an object (found {value})", field="schemas"),
+    Rule("components", "components-parameters-object", is_optional(dict), "'parameters' must be an object (found {value})", field="parameters"),
+    Rule("components", "components-request-bodies-object", is_optional(dict), "'requestBodies' must be an object (found {value})", field="requestBodies"),
+    Rule("server", "server-object", lambda node: isinstance(node, dict), "server must be an object (found {value})"),
+    Rule("server", "server-url", lambda value: isinstance(value, str), "'url' of a server must be a string (found {value})", field="url"),
+    # Path items & operations
+    Rule("path_item", "path-key", lambda key: isinstance(key, str) and key.startswith("/"), "path must start with '/' (found {value})", field="__key__"),
+    Rule("path_item", "path-item-object", lambda node: isinstance(node, dict), "path item must be an object (found {value})"),
+    Rule("path_item", "path-parameters-list", is_optional(list), "'parameters' must be a list (found {value})", field="parameters"),
+    Rule("path_item", "path-parameters-unique", has_unique_parameters, "'parameters' must not hold the same parameter twice", field="parameters",
+         severity=SEVERITY_WARNING),
+    Rule("path_item", "path-servers-list", is_optional(list), "'servers' must be a list (found {value})", field="servers"),
+    Rule("path_item", "path-item-fields", lambda node: not isinstance(node, dict) or all(key in PATH_ITEM_FIELDS or str(key).startswith("x-") for key in node),
+         "unknown field(s) in path item: {value}", severity=SEVERITY_WARNING),
+    Rule("operation", "operation-object", lambda node: isinstance(node, dict), "operation must be an object (found {value})"),
+    Rule("operation", "operation-parameters-list", is_optional(list), "'parameters' must be a list (found {value})", field="parameters"),
+    Rule("operation", "operation-parameters-unique", has_unique_parameters, "'parameters' must not hold the same parameter twice", field="parameters",
+         severity=SEVERITY_WARNING),
+    Rule("operation", "operation-request-body-object", is_optional(dict), "'requestBody' must be an object (found {value})", field="requestBody"),
+    Rule("operation", "operation-responses-object", is_optional(dict), "'responses' must be an object (found {value})", field="responses"),
+    Rule("operation", "operation-servers-list", is_optional(list), "'servers' must be a list (found {value})", field="servers"),
+    Rule("request_body", "request-body-object", lambda node: isinstance(node, dict), "request body must be an object (found {value})"),
+    Rule("request_body", "request-body-content-object", is_optional(dict), "'content' must be an object (found {value})", field="content"),
+    Rule("response", "response-object", lambda node: isinstance(node, dict), "response must be an object (found {value})"),
+    Rule("response", "response-content-object", is_optional(dict), "'content' must be an object (found {value})", field="content"),
+    Rule("media_type", "media-type-object", lambda node: isinstance(node, dict), "media type must be an object (found {value})"),
+    Rule("media_type", "media-type-schema-object", is_optional(dict), "'schema' must be an object (found {value})", field="schema"),
+    # Parameters (not a reference)
+    Rule("parameter", "parameter-object", lambda node: isinstance(node, dict), "parameter must be an object (found {value})"),
+    Rule("parameter", "parameter-name", lambda value: isinstance(value, str) and bool(value), "parameter without 'name'", field="name"),
+    Rule("parameter", "parameter-in", lambda value: value in PARAMETER_LOCATIONS, f"'in' must be one of {PARAMETER_LOCATIONS} (found {{value}})", field="in"),
+    Rule("parameter", "path-parameter-required", lambda node: not isinstance(node, dict) or node.get("in") != "path" or node.get("required") is True,
+         "path parameter must be required", severity=SEVERITY_WARNING),
+    Rule("parameter", "parameter-required-boolean", is_optional(bool), "'required' must be a boolean (found {value})", field="required"),
+    Rule("parameter", "parameter-description-string", is_optional(str), "'description' must be a string (found {value})", field="description"),
+    Rule("parameter", "parameter-schema-object", is_optional(dict), "'schema' must be an object (found {value})", field="schema"),
+    # Schemas (of components, media types & parameters, with their properties, items & sub-schemas)
+    Rule("schema", "schema-object", lambda node: isinstance(node, dict), "schema must be an object (found {value})"),
+    Rule("schema", "schema-type", lambda value: value is None or isinstance(value, str) or is_string_list(value),
+         "'type' must be a string or a list of strings (found {value})", field="type"),
+    Rule("schema", "schema-properties-object", is_optional(dict), "'properties' must be an object (found {value})", field="properties"),
+    Rule("schema", "schema-required-list", lambda value: value is None or is_string_list(value),
+         "'required' must be a list of property names (found {value})", field="required"),
+    Rule("schema", "schema-description-string", is_optional(str), "'description' must be a string (found {value})", field="description"),
+    Rule("schema", "schema-all-of-list", is_optional(list), "'allOf' must be a list (found {value})", field="allOf"),
+    Rule("schema", "schema-one-of-list", is_optional(list), "'oneOf' must be a list (found {value})", field="oneOf"),
+    Rule("schema", "schema-any-of-list", is_optional(list), "'anyOf' must be a list (found {value})", field="anyOf"),
+    # References ($ref value)
+    Rule("ref", "ref-string", lambda value: isinstance(value, str) and bool(value), "'$ref' must be a non empty string (found {value})"),
+    Rule("ref", "ref-local", lambda value: not isinstance(value, str) or value.startswith("#"), "external reference not checked: {value}", severity=SEVERITY_WARNING),
+]
+
+def compile_rules(rules:list[Rule]) -> dict[str, tuple[Rule]]:
+    """ Rules grouped per kind of node. """
+    compiled = {}
+    for rule in rules:
+        compiled.setdefault(rule.kind, []).append(rule)
+    return {kind: tuple(kind_rules) for kind, kind_rules in compiled.items()}
+
+def escape_pointer(key:Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+def resolve_pointer(document:Any, ref:str, default:Any=None) -> Any:
+    """ Node targeted by a local reference (json pointer after '#'), default if it does not exist. """
+    node = document
+    pointer = unquote(ref[1:])
+    if not pointer:
+        return node
+    for token in pointer.lstrip("/").split("/"):
+        token = token.replace("~1", "/").replace("~0", "~")
+        if isinstance(node, dict) and token in node:
+            node = node[token]
+        elif isinstance(node, list) and token.isdigit() and int(token) < len(node):
+            node = node[int(token)]
+        else:
+            return default
+    return node
+
+class OpenApiValidator():
+    """ Validate documents against a rule table compiled once (reuse the same validator for a batch of documents). """
+    def __init__(self, rules:list[Rule]=RULES):
+        self.rules:dict[str, tuple[Rule]] = compile_rules(rules)
+
+    def check(self, kind:str, node:Any, location:str, issues:list[ValidationIssue], key:str=None) -> bool:
+        """ Run all rules of a kind on a node. Return False if an error was found. """
+        valid = True
+        for rule in self.rules.get(kind, ()):
+            if rule.field == "__key__":
+                value = key
+            elif rule.field:
+                if not isinstance(node, dict):
+                    continue
+                value = node.get(rule.field)
+            else:
+                value = node
+            if rule.check(value):
+                continue
+            if rule.rule_id == "path-item-fields":
+                value = ", ".join(str(k) for k in node if k not in PATH_ITEM_FIELDS and not str(k).startswith("x-"))
+            else:
+                value = short_repr(value)
+            issues.append(ValidationIssue(location, rule.rule_id, rule.severity, rule.message.format(value=value)))
+            if rule.severity == SEVERITY_ERROR:
+                valid = False
+        return valid
+
+    def validate(self, document:Any) -> list[ValidationIssue]:
+        issues = []
+        # Each node is walked further as long as its type allows it, whatever other errors found: all problems are reported
+        self.check("document", document, "", issues)
+        if not isinstance(document, dict):
+            return issues
+        if isinstance(document.get("info"), dict):
+            self.check("info", document["info"], "/info", issues)
+        self._validate_servers(document.get("servers"), "/servers", issues)
+        walked_schemas = set()          # schemas shared by several nodes (yaml aliases, common sub-schemas) are checked once
+        components = document.get("components") or {}
+        self.check("components", components, "/components", issues)
+        if isinstance(components, dict):
+            schemas = components.get("schemas") or {}
+            for name, schema in (schemas.items() if isinstance(schemas, dict) else []):
+                self._validate_schema(schema, f"/components/schemas/{escape_pointer(name)}", issues, walked_schemas)
+            params = components.get("parameters") or {}
+            for name, param in (params.items() if isinstance(params, dict) else []):
+                self._validate_parameter(param, f"/components/parameters/{escape_pointer(name)}", issues, walked_schemas)
+            request_bodies = components.get("requestBodies") or {}
+            for name, request_body in (request_bodies.items() if isinstance(request_bodies, dict) else []):
+                self._validate_request_body(request_body, f"/components/requestBodies/{escape_pointer(name)}", issues, walked_schemas)
+        paths = document.get("paths") or {}
+        for path, path_item in (paths.items() if isinstance(paths, dict) else []):
+            location = f"/paths/{escape_pointer(path)}"
+            self.check("path_item", path_item, location, issues, key=path)
+            if not isinstance(path_item, dict):
+                continue
+            self._validate_servers(path_item.get("servers"), f"{location}/servers", issues)
+            for i, param in enumerate(as_list(path_item.get("parameters"))):
+                self._validate_parameter(param, f"{location}/parameters/{i}", issues, walked_schemas)
+            for method in HTTP_METHODS:
+                if method in path_item:
+                    self._validate_operation(path_item[method], f"{location}/{method}", issues, walked_schemas)
+        self._validate_refs(document, issues)
+        return issues
+
+    def _validate_servers(self, servers:Any, location:str, issues:list[ValidationIssue]) -> None:
+        for i, server in enumerate(as_list(servers)):
+            self.check("server", server, f"{location}/{i}", issues)
+
+    def _validate_operation(self, operation:Any, location:str, issues:list[ValidationIssue], walked_schemas:set[int]) -> None:
+        self.check("operation", operation, location, issues)
+        if not isinstance(operation, dict):
+            return
+        self._validate_servers(operation.get("servers"), f"{location}/servers", issues)
+        for i, param in enumerate(as_list(operation.get("parameters"))):
+            self._validate_parameter(param, f"{location}/parameters/{i}", issues, walked_schemas)
+        if isinstance(operation.get("requestBody"), dict):
+            self._validate_request_body(operation["requestBody"], f"{location}/requestBody", issues, walked_schemas)
+        responses = operation.get("responses") or {}
+        for status, response in (responses.items() if isinstance(responses, dict) else []):
+            response_location = f"{location}/responses/{escape_pointer(status)}"
+            if isinstance(response, dict) and "$ref" in response:
+                continue
+            self.check("response", response, response_location, issues)
+            if isinstance(response, dict):
+                self._validate_content(response.get("content"), f"{response_location}/content", issues, walked_schemas)
+
+    def _validate_request_body(self, request_body:Any, location:str, issues:list[ValidationIssue], walked_schemas:set[int]) -> None:
+        if isinstance(request_body, dict) and "$ref" in request_body:
+            return                      # target checked with all references
+        self.check("request_body", request_body, location, issues)
+        if isinstance(request_body, dict):
+            self._validate_content(request_body.get("content"), f"{location}/content", issues, walked_schemas)
+
+    def _validate_content(self, content:dict, location:str, issues:list[ValidationIssue], walked_schemas:set[int]) -> None:
+        if not isinstance(content, dict):
+            return
+        for media_type, media_object in content.items():
+            media_location = f"{location}/{escape_pointer(media_type)}"
+            self.check("media_type", media_object, media_location, issues)
+            if isinstance(media_object, dict) and isinstance(media_object.get("schema"), dict):
+                self._validate_schema(media_object["schema"], f"{media_location}/schema", issues, walked_schemas)
+
+    def _validate_parameter(self, param:Any, location:str, issues:list[ValidationIssue], walked_schemas:set[int]) -> None:
+        if isinstance(param, dict) and "$ref" in param:
+            return                      # target checked with all references
+        self.check("parameter", param, location, issues)
+        if isinstance(param, dict) and isinstance(param.get("schema"), dict):
+            self._validate_schema(param["schema"], f"{location}/schema", issues, walked_schemas)
+
+    def _validate_schema(self, schema:Any, location:str, issues:list[ValidationIssue], walked_schemas:set[int]) -> None:
+        """ Check a schema & its sub-schemas (properties, items, allOf / oneOf / anyOf, not, additionalProperties).
+
+        Referenced schemas are not followed: each of them is checked as a schema of components (or where it is defined).
+        """
+        stack = [(schema, location)]
+        while stack:
+            schema, location = stack.pop()
+            if isinstance(schema, dict):
+                if id(schema) in walked_schemas:
+                    continue
+                walked_schemas.add(id(schema))
+            self.check("schema", schema, location, issues)
+            if not isinstance(schema, dict):
+                continue
+            properties = schema.get("properties")
+            for name, property_schema in (properties.items() if isinstance(properties, dict) else []):
+                stack.append((property_schema, f"{location}/properties/{escape_pointer(name)}"))
+            if "items" in schema:
+                stack.append((schema["items"], f"{location}/items"))
+            for key in ("allOf", "oneOf", "anyOf"):
+                for i, sub_schema in enumerate(as_list(schema.get(key))):
+                    stack.append((sub_schema, f"{location}/{key}/{i}"))
+            for key in ("not", "additionalProperties"):
+                if isinstance(schema.get(key), dict):
+                    stack.append((schema[key], f"{location}/{key}"))
+
+    def _validate_refs(self, document:dict, issues:list[ValidationIssue]) -> None:
+        """ Check every '$ref' of the document resolves to an existing node of the expected kind (single walk, shared YAML nodes visited once).
+
+        Keys of maps of names (i.e. 'properties') are names, not keywords: a property named '$ref' is not a reference.
+        Literal values (examples, defaults, enums) are not walked. The kind of each node (parameter, schema, ...) is known from
+        the key holding it: a reference must target a component of this kind (see check_ref_kind).
+        """
+        resolved = {}
+        visited = set()
+        stack = [(document, None, False, None)]     # (node, location as linked tuple (parent, key), node is a map of names, kind)
+        while stack:
+            node, location, name_map, kind = stack.pop()
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            if isinstance(node, dict):
+                if name_map:
+                    for key, value in node.items():     # values of a map of names: kind given by the key of the map
+                        if isinstance(value, (dict, list)):
+                            stack.append((value, (location, key), False, kind))
+                    continue
+                if "$ref" in node:
+                    ref = node["$ref"]
+                    ref_location = self._location_to_str(location) + "/$ref"
+                    if self.check("ref", ref, ref_location, issues) and isinstance(ref, str) and ref.startswith("#"):
+                        if ref not in resolved:
+                            resolved[ref] = self._resolve(document, ref)
+                        if not resolved[ref]:
+                            issues.append(ValidationIssue(ref_location, "ref-target", SEVERITY_ERROR, f"unresolved reference: '{ref}'"))
+                        else:
+                            message = check_ref_kind(ref, kind)
+                            if message:     # a schema of another component is still analyzed (as the schema of the same short name)
+                                severity = SEVERITY_WARNING if kind == "schema" else SEVERITY_ERROR
+                                issues.append(ValidationIssue(ref_location, "ref-kind", severity, message))
+                for key, value in node.items():
+                    if not isinstance(value, (dict, list)) or key in LITERAL_KEYS:
+                        continue
+                    if (kind == "example" and key == "value") or (kind == "schema" and key == "examples"):
+                        continue                        # literal values of an example object / of a json schema
+                    if key in ITEM_KINDS:
+                        stack.append((value, (location, key), key in NAME_MAP_KEYS, ITEM_KINDS[key]))
+                    else:
+                        stack.append((value, (location, key), key in NAME_MAP_KEYS, VALUE_KINDS.get(key)))
+            else:
+                for i, value in enumerate(node):        # items of a list: kind given by the key of the list
+                    if isinstance(value, (dict, list)):
+                        stack.append((value, (location, i), False, kind))
+
+    @staticmethod
+    def _location_to_str(location:tuple) -> str:
+        keys = []
+        while location:
+            location, key = location
+            keys.append(escape_pointer(key))
+        return "/" + "/".join(reversed(keys)) if keys else ""
+
+    @staticmethod
+    def _resolve(document:dict, ref:str) -> bool:
+        """ True if the local reference (json pointer after '#') targets an existing node. """
+        return resolve_pointer(document, ref, default=_MISSING) is not _MISSING
+
+def check_ref_kind(ref:str, kind:str) -> str:
+    """ Problem with the target of a local reference held by a node of a given kind ("" if none).
+
+    Parameters, request bodies, responses, ... must reference a component of their own type ('#/components/parameters/<name>', ...).
+    Schemas may reference any schema of the document (i.e. the schema of a request body), but not a component of another type.
+    """
+    expected = REF_COMPONENTS.get(kind)
+    if expected is None:
+        return ""
+    component_type, _, name = ref[len(COMPONENTS_PREFIX):].partition("/") if ref.startswith(COMPONENTS_PREFIX) else ("", "", "")
+    if kind == "schema":
+        if component_type and component_type != expected and name and "/" not in name:
+            return f"reference of a schema must not target a component of '{component_type}': '{ref}'"
+        return ""
+    if component_type != expected or not name or "/" in name:
+        return f"reference of a {kind.replace('_', ' ')} must target '{COMPONENTS_PREFIX}{expected}/<name>' (found '{ref}')"
+    return ""
+
+_default_validator:OpenApiValidator = None
+
+def validate_document(document:Any) -> list[ValidationIssue]:
+    """ All structural issues of an openapi document, using the default rule table (compiled on first call). """
+    global _default_validator
+    if _default_validator is None:
+        _default_validator = OpenApiValidator()
+    return _default_validator.validate(document)
+
+def get_errors(issues:list[ValidationIssue]) -> list[ValidationIssue]:
+    return [issue for issue in issues if issue.severity == SEVERITY_ERROR]
+
+if __name__ == "__main__":
+    import typer
+    from spec_commands import validate
+    typer.run(validate)
@@ -13,6 +13,7 @@ CUR_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(CUR_DIR,"data")
 LOG_DIR = os.path.join(CUR_DIR,"log")
 OUT_DIR = os.path.join(CUR_DIR,"out")
+CACHE_DIR = os.path.join(CUR_DIR,"cache")
 
 ### Following parameters will be ingnore when using cli verion (as will be entered as parameters)
 # Logging
@@ -21,9 +22,13 @@ OUT_DIR = os.path.join(CUR_DIR,"out")
 LOGLEVEL_CONSOLE = LOGLEVEL_SUCCESS
 LOGLEVEL_FILE = LOGLEVEL_DISABLE
 LOG_FILE = None     #Sample: os.path.join(LOG_DIR,"logfile.log")
+LOG_DEDUP_MAX_REPEATS = 5   # Same message logged more often is only counted (summary at the end). 0: no deduplication
 OUT_FILE = None     #Sample: os.path.join(OUT_DIR,"output.csv")
 IN_FILE = None      #Sample: os.path.join(DATA_DIR,"input.csv")
 
+# Cache settings
+CACHE_MAX_SIZE_MB = 500
+
 # Banner settings
 BANNER_DISPLAY = True
 BANNER_SELECTION = "random"
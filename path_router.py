@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'api_path_router'
+__version__ = '1.0.0'
+
+'''
+Match concrete requests (i.e. 'GET /users/42/orders') to the operations of an openapi file (i.e. 'GET /users/{userId}/orders').
+
+Path templates are compiled once into a trie of segments. At each level, a literal segment is tried first, then segments
+mixing text & parameters (i.e. '{name}.json'), then a full parameter segment; the first complete match wins
+(the most literal template, as required by the openapi specification).
+
+python main.py logmatch spec.yaml access.log access.log.1.gz     # usage counts per operation & parameter
+'''
+
+# Standard Python Modules
+import gzip
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+from urllib.parse import urlsplit
+
+# External Python Modules
+import typer
+
+# Personal Python Modules
+from params import *
+from openapi_validator import HTTP_METHODS
+
+ANY_METHOD = "*"
+PARAM_REGEX = re.compile(r"{(.*?)}")
+# Request line of a log line: b"METHOD /path" & query string, between double quotes (common/combined log format) or at start of line
+QUOTED_REQUEST_REGEX = re.compile(rb'"([A-Za-z]+ [^ ?"]+)(?:\?([^ "]*))?')
+PLAIN_REQUEST_REGEX = re.compile(rb'\s*([A-Za-z]+ [^ ?"\r\n]+)(?:\?([^ "\r\n]*))?')
+MATCH_CACHE_SIZE = 100000       # number of distinct (method, path) kept with their match result
+
+class RouteNode():
+    """ One segment level of the trie.
+
+    Templates differing only by the names of their parameters (i.e. '/users/{id}' & '/users/{userId}/orders') share the same nodes:
+    values are captured by position, each operation keeping the parameter names of its own template.
+    """
+    __slots__ = ("literals", "patterns", "param", "operations", "param_names")
+
+    def __init__(self):
+        self.literals:dict[str,RouteNode] = {}                       # literal segment -> node
+        self.patterns:list[tuple[re.Pattern,RouteNode]] = []         # segment mixing text & parameters
+        self.param:RouteNode = None                                  # segment made of a single parameter
+        self.operations:dict[str,str] = {}                           # method -> operation name (template complete at this node)
+        self.param_names:dict[str,tuple[str]] = {}                   # method -> names of the parameters of its template, in order
+
+class PathRouter():
+    """ Trie of the path templates of an openapi file, with a bounded cache of already matched paths. """
+    def __init__(self, base_paths:list[str]=None, cache_size:int=MATCH_CACHE_SIZE):
+        self.root:RouteNode = RouteNode()
+        self.base_paths:list[str] = sorted({p.rstrip("/") for p in base_paths or [] if p.rstrip("/")}, key=len, reverse=True)
+        self.operations:list[str] = []
+        self.cache_size:int = cache_size
+        self._cache:dict[tuple[str,str],tuple] = {}
+
+    @classmethod
+    def from_document(cls, api_content:dict, cache_size:int=MATCH_CACHE_SIZE) -> "PathRouter":
+        """ Router of all operations of an openapi document (path of the servers urls used as base paths). """
+        base_paths = [urlsplit(server.get("url","")).path for server in api_content.get("servers",[]) if isinstance(server, dict)]
+        router = cls(base_paths, cache_size)
+        paths = api_content.get("paths",{})
+        for path, path_item in (paths.items() if isinstance(paths, dict) else []):
+            if isinstance(path_item, dict):
+                router.add(path, [method for method in HTTP_METHODS if isinstance(path_item.get(method), dict)])
+        return router
+
+    @classmethod
+    def from_api_object(cls, api_object:Any, cache_size:int=MATCH_CACHE_SIZE) -> "PathRouter":
+        """ Router of an analysis. Once the document is released (low memory mode), paths match any method. """
+        if api_object.api_content is not None:
+            return cls.from_document(api_object.api_content, cache_size)
+        router = cls([urlsplit(url).path for url in api_object.servers], cache_size)
+        for path in api_object.paths:
+            router.add(path, [ANY_METHOD])
+        return router
+
+    def add(self, template:str, methods:list[str]) -> None:
+        node = self.root
+        names = []
+        for segment in template.strip("/").split("/"):
+            if "{" not in segment:
+                node = node.literals.setdefault(segment, RouteNode())
+            elif segment.startswith("{") and segment.endswith("}") and segment.count("{") == 1:
+                names.append(segment[1:-1])
+                if node.param is None:
+                    node.param = RouteNode()
+                node = node.param
+            else:
+                names.extend(PARAM_REGEX.findall(segment))
+                regex = "^" + "".join(re.escape(part) if i % 2 == 0 else "([^/]+?)" for i, part in enumerate(PARAM_REGEX.split(segment))) + "$"
+                for pattern, child in node.patterns:
+                    if pattern.pattern == regex:
+                        node = child
+                        break
+                else:
+                    child = RouteNode()
+                    node.patterns.append((re.compile(regex), child))
+                    node = child
+        for method in methods:
+            node.operations[method.lower()] = f"{method.upper()} {template}"
+            node.param_names[method.lower()] = tuple(names)
+            self.operations.append(node.operations[method.lower()])
+        self._cache.clear()
+
+    def _match_greedy(self, method:str, segments:list[str]) -> RouteNode:
+        """ Node reached by always taking the preferred branch (literal, mixed, parameter), None if it does not complete the match.
+
+        Enough for nearly all requests: the full search is only needed when a literal branch is a dead end.
+        """
+        node = self.root
+        for segment in segments:
+            child = node.literals.get(segment)
+            if child is None:
+                for pattern, pattern_child in node.patterns:
+                    if pattern.match(segment):
+                        child = pattern_child
+                        break
+                else:
+                    if not segment:
+                        return None
+                    child = node.param
+                    if child is None:
+                        return None
+            node = child
+        if method in node.operations or ANY_METHOD in node.operations:
+            return node
+        return None
+
+    def _match_segments(self, method:str, segments:list[str]) -> tuple[RouteNode, list]:
+        """ (node, parameter values in order) completing the match of all segments for method, (None, []) if no match.
+
+        Depth first search without recursion: alternatives of a level are stacked by increasing priority
+        (parameter, then mixed segments, then literal), so the literal segment is always tried first.
+        """
+        last = len(segments)
+        values = []
+        stack = [(self.root, 0, 0, ())]         # (node, position, number of values before the node, values added by the node)
+        while stack:
+            node, position, size, added = stack.pop()
+            del values[size:]
+            values.extend(added)
+            if position == last:
+                if method in node.operations or ANY_METHOD in node.operations:
+                    return node, values
+                continue
+            segment = segments[position]
+            size = len(values)
+            if node.param is not None and segment:
+                stack.append((node.param, position + 1, size, (segment,)))
+            for pattern, child in reversed(node.patterns):
+                match = pattern.match(segment)
+                if match:
+                    stack.append((child, position + 1, size, match.groups()))
+            child = node.literals.get(segment)
+            if child is not None:
+                stack.append((child, position + 1, size, ()))
+        return None, []
+
+    def match(self, method:str, path:str) -> tuple[str, dict[str,str]]:
+        """ (operation name, path parameter values) of a request, (None, {}) if no operation matches.
+
+        The path must not contain the query string. Base paths of the servers are removed when needed.
+        """
+        operation, values = self.lookup(method, path)
+        return operation, dict(values)
+
+    def lookup(self, method:str, path:str) -> tuple[str, tuple[tuple[str,str]]]:
+        """ Same as match with parameters as (name, value) pairs, from the cache for an already seen request. """
+        key = (method, path)
+        result = self._cache.get(key)
+        if result is None:
+            result = self.resolve(method, path)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[key] = result
+        return result
+
+    def resolve_operation(self, method:str, path:str) -> str:
+        """ Operation of a request (None if no match), without extracting parameter values. """
+        method = method.lower()
+        segments = path.strip("/").split("/")
+        node = self._match_greedy(method, segments) or self._match_segments(method, segments)[0]
+        if node is None and self.base_paths:
+            return self.resolve(method, path)[0]
+        return None if node is None else node.operations.get(method) or node.operations[ANY_METHOD]
+
+    def resolve(self, method:str, path:str) -> tuple[str, tuple[tuple[str,str]]]:
+        """ Same as lookup, without cache. """
+        method = method.lower()
+        candidates = [path] + [path[len(base):] for base in self.base_paths if path.startswith(base + "/") or path == base]
+        for candidate in candidates:
+            node, values = self._match_segments(method, candidate.strip("/").split("/"))
+            if node is not None:
+                method = method if method in node.operations else ANY_METHOD
+                return node.operations[method], tuple(zip(node.param_names[method], values))
+        return None, ()
+
+class UsageCounter():
+    """ Usage counts of a stream of requests: per operation, per path & query parameter. Unmatched requests are counted per path.
+
+    Log lines are processed as bytes: a request line is decoded & matched only the first time it is seen (bounded cache).
+    Values of path parameters are counted per parameter, up to max_values distinct values each (later new values are only
+    counted as other values).
+    """
+    def __init__(self, router:PathRouter, max_unmatched:int=10000, cache_size:int=MATCH_CACHE_SIZE, max_values:int=1000):
+        self.router:PathRouter = router
+        self.max_unmatched:int = max_unmatched
+        self.max_values:int = max_values
+        self.cache_size:int = cache_size
+        self.lines:int = 0
+        self.requests:int = 0
+        self.counts:dict[str,int] = {}                         # operation -> number of requests
+        self.query_counts:dict[tuple[str,bytes],int] = {}      # (operation, query parameter name) -> number of requests
+        self.path_counts:dict[tuple[str,str],dict[str,int]] = {}   # (operation, path parameter name) -> value -> number of requests
+        self.other_values:dict[tuple[str,str],int] = {}        # (operation, path parameter name) -> requests with a value not kept
+        self.unmatched:dict[bytes,int] = {}
+        self._cache:dict[bytes,tuple] = {}                     # b"METHOD /path" -> (operation ("" if no match), path parameter values)
+
+    @property
+    def matched(self) -> int:
+        return sum(self.counts.values())
+
+    def _resolve(self, request:bytes) -> tuple[str, tuple[tuple[str,str]]]:
+        """ (operation, path parameter values) of a b"METHOD /path" request (("", ()) if no operation matches). """
+        method, _, path = request.decode("latin-1").partition(" ")
+        if not path.startswith("/"):
+            path = urlsplit(path).path or "/"       # absolute url (proxy logs)
+        operation, values = self.router.resolve(method, path)
+        result = (operation or "", values)
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[request] = result
+        return result
+
+    def add(self, method:str, target:str) -> str:
+        """ Count one request. Return the operation matched (None if no match). """
+        request = f"{method} {target.partition('?')[0]}".encode("latin-1")
+        self.add_lines([f'"{method} {target}"'.encode("latin-1")])
+        return (self._cache.get(request) or self._resolve(request))[0] or None
+
+    def add_lines(self, lines:Iterable[bytes]) -> None:
+        """ Count the requests of log lines: request line between the first pair of double quotes
+        (common/combined log format: '... "GET /path?query HTTP/1.1" 200 ...'), or the whole line ('GET /path').
+        """
+        cache, counts, query_counts, unmatched = self._cache, self.counts, self.query_counts, self.unmatched
+        path_counts, other_values, max_values = self.path_counts, self.other_values, self.max_values
+        resolve = self._resolve
+        nb_lines = nb_requests = 0
+        search, match = QUOTED_REQUEST_REGEX.search, PLAIN_REQUEST_REGEX.match
+        for line in lines:
+            nb_lines += 1
+            request = search(line) or match(line)
+            if request is None:
+                continue
+            key, query = request.groups()
+            nb_requests += 1
+            result = cache.get(key)
+            if result is None:
+                result = resolve(key)
+            operation, values = result
+            if not operation:
+                if key in unmatched or len(unmatched) < self.max_unmatched:
+                    unmatched[key] = unmatched.get(key, 0) + 1
+                continue
+            counts[operation] = counts.get(operation, 0) + 1
+            for name, value in values:
+                param_key = (operation, name)
+                param_values = path_counts.get(param_key)
+                if param_values is None:
+                    param_values = path_counts[param_key] = {}
+                if value in param_values or len(param_values) < max_values:
+                    param_values[value] = param_values.get(value, 0) + 1
+                else:
+                    other_values[param_key] = other_values.get(param_key, 0) + 1
+            if query:
+                for item in query.split(b"&"):
+                    name = item.partition(b"=")[0]
+                    if name:
+                        query_key = (operation, name)
+                        query_counts[query_key] = query_counts.get(query_key, 0) + 1
+        self.lines += nb_lines
+        self.requests += nb_requests
+
+    def to_dict(self, top:int=20):
+        operations = {}
+        for operation, count in sorted(self.counts.items(), key=lambda item: item[1], reverse=True):
+            operations[operation] = {"requests": count, "path_params": {}, "query_params": {}}
+        for (operation, name), param_values in sorted(self.path_counts.items()):
+            values = sorted(param_values.items(), key=lambda item: item[1], reverse=True)
+            operations[operation]["path_params"][name] = {"requests": sum(param_values.values()) + self.other_values.get((operation, name), 0),
+                "distinct_values": len(param_values), "other_values": self.other_values.get((operation, name), 0), "top_values": dict(values[:top])}
+        for (operation, name), count in sorted(self.query_counts.items()):
+            operations[operation]["query_params"][name.decode("latin-1")] = count
+        unmatched = sorted(self.unmatched.items(), key=lambda item: item[1], reverse=True)[:top]
+        to_return = {
+            "lines": self.lines,
+            "requests": self.requests,
+            "matched": self.matched,
+            "operations": operations,
+            "unused_operations": sorted(set(self.router.operations) - set(self.counts)),
+            "top_unmatched": {key.decode("latin-1"): count for key, count in unmatched},
+        }
+        return to_return
+
+    def to_json(self, indent=None, top:int=20):
+        return json.dumps(self.to_dict(top), indent=indent)
+
+def read_lines(filename:Path, block_size:int=1024*1024) -> Iterator[bytes]:
+    """ Lines of a log file, gzip compressed or not ('-' for standard input), read by blocks. """
+    if str(filename) == "-":
+        f = sys.stdin.buffer
+    else:
+        with open(filename, "rb") as f:
+            compressed = f.read(2) == b"\x1f\x8b"
+        f = gzip.open(filename, "rb") if compressed else open(filename, "rb")
+    with f:
+        rest = b""
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            lines = (rest + block).split(b"\n")
+            rest = lines.pop()
+            yield from lines
+        if rest:
+            yield rest
+
+def logmatch(openapi_file:Path = typer.Argument(..., exists=True, readable=True, resolve_path=True, show_default=False, help="openapi file (JSON or YAML)"),
+        logfiles:list[Path] = typer.Argument(..., show_default=False, help="Access log file(s), plain or gzip ('-' for standard input)"),
+        outfile:Path = typer.Option(None, "--outfile", "-o", resolve_path=True, help="Save usage counts as json file"),
+        top:int = typer.Option(20, "--top", help="Number of unmatched paths reported"),
+        use_cache:bool = typer.Option(True, "--cache/--no-cache", help="Reuse the document cached for an unchanged openapi file"),
+        ) -> None:
+    from utils.cache import ContentCache
+    from data_dictionary import DictionaryError, DictionaryOptions, get_document
+    options = DictionaryOptions(cache=ContentCache(CACHE_DIR, max_size=CACHE_MAX_SIZE_MB*1024*1024, enabled=use_cache))
+    try:
+        router = PathRouter.from_document(get_document(openapi_file, options))
+    except DictionaryError as e:
+        print(str(e))
+        raise typer.Exit(code=1)
+    counter = UsageCounter(router)
+    start = time.perf_counter()
+    for logfile in logfiles:
+        counter.add_lines(read_lines(logfile))
+    duration = time.perf_counter() - start
+
+    sep = '-'*15
+    print(f"{sep} Usage of operations {sep}")
+    print(f"- Lines: {counter.lines} ({counter.lines/duration if duration else 0:,.0f} lines/s)")
+    print(f"- Requests matched: {counter.matched}/{counter.requests}")
+    for operation, count in sorted(counter.counts.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"    {count:>10}  {operation}")
+    print(sep*3)
+    if outfile:
+        with open(outfile, "w") as f:
+            f.write(counter.to_json(indent=4, top=top))
+        print(f"Usage counts saved to file: '{outfile}'")
+
+if __name__ == "__main__":
+    typer.run(logmatch)
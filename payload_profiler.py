@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'api_payload_profiler'
+__version__ = '1.0.0'
+
+'''
+Usage of the fields of the data dictionary by real traffic (python main.py payloads spec.yaml capture.ndjson ...).
+
+Each line of the capture files is a json record of one request or response body:
+    {"method": "POST", "path": "/pets", "direction": "request", "body": {"name": "rex", "tag": null}}
+("url" accepted instead of "path", body as json object or string, "direction" defaults to "request").
+
+The record is mapped to its operation (path_router), then every key of the body (at any depth) is counted against the fields
+known for this operation: fields of its request body (request_fields_dict) & of the schemas it reaches (schemas_dict, schema_graph).
+Counts are held in mergeable accumulators: files (and byte ranges of large plain files) are profiled in parallel processes,
+then their profiles are merged.
+'''
+
+# Standard Python Modules
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Iterator, TYPE_CHECKING
+
+# External Python Modules
+import typer
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Personal Python Modules
+from params import *
+from utils.cache import ContentCache
+from openapi_parsing import ApiObject
+from path_router import PathRouter, read_lines
+from schema_graph import SchemaGraph
+
+CHUNK_SIZE = 64*1024*1024           # plain capture files are split in byte ranges of this size, profiled in parallel
+STAT_COLUMNS = ["field_name", "documented", "nb_payload", "nb_value", "nb_null", "null_rate", "min_length", "max_length"]
+XLSX_LAYOUT = {
+    "Fields": {"A:A":30, "B:H":12},
+    "Unknown fields": {"A:A":60, "B:B":30, "C:C":12, "D:D":12},
+    "Operations": {"A:A":60, "B:B":12},
+}
+
+class FieldUsage():
+    """ Usage of one field: payloads containing it, values, null values & range of value lengths (mergeable). """
+    __slots__ = ("payloads", "values", "nulls", "min_length", "max_length")
+
+    def __init__(self):
+        self.payloads:int = 0
+        self.values:int = 0
+        self.nulls:int = 0
+        self.min_length:int = None
+        self.max_length:int = None
+
+    def add_length(self, length:int) -> None:
+        if self.min_length is None or length < self.min_length:
+            self.min_length = length
+        if self.max_length is None or length > self.max_length:
+            self.max_length = length
+
+    def merge(self, other:"FieldUsage") -> None:
+        self.payloads += other.payloads
+        self.values += other.values
+        self.nulls += other.nulls
+        if other.min_length is not None:
+            self.add_length(other.min_length)
+            self.add_length(other.max_length)
+
+    def to_dict(self):
+        to_return = {"nb_payload": self.payloads, "nb_value": self.values, "nb_null": self.nulls,
+                     "null_rate": self.nulls / self.values if self.values else 0.0,
+                     "min_length": self.min_length or 0, "max_length": self.max_length or 0}
+        return to_return
+
+class UsageProfile():
+    """ Counts accumulated over a stream of records. Profiles of separate streams are combined with merge. """
+    def __init__(self):
+        self.records:int = 0
+        self.invalid:int = 0                                    # lines which are not a json record with a body
+        self.unmatched:int = 0                                  # records not matching any operation
+        self.operations:dict[str,int] = {}                      # "METHOD /template direction" -> number of payloads
+        self.fields:dict[str,FieldUsage] = {}
+        self.unknown:dict[tuple[str,str],int] = {}              # (operation, field) -> payloads with a field unknown for the operation
+
+    def merge(self, other:"UsageProfile") -> "UsageProfile":
+        self.records += other.records
+        self.invalid += other.invalid
+        self.unmatched += other.unmatched
+        for operation, count in other.operations.items():
+            self.operations[operation] = self.operations.get(operation, 0) + count
+        for name, usage in other.fields.items():
+            if name not in self.fields:
+                self.fields[name] = FieldUsage()
+            self.fields[name].merge(usage)
+        for key, count in other.unknown.items():
+            self.unknown[key] = self.unknown.get(key, 0) + count
+        return self
+
+class PayloadProfiler():
+    """ Map payloads to their operation & accumulate the usage of their fields in a UsageProfile. """
+    def __init__(self, api_object:ApiObject, router:PathRouter, schema_graph:SchemaGraph):
+        self.router:PathRouter = router
+        self.schema_graph:SchemaGraph = schema_graph
+        self.dictionary_fields:set[str] = set(api_object.request_fields_dict)
+        self._path_fields:dict[str,set[str]] = {}               # template path -> fields of its request bodies
+        for field_name, field in api_object.request_fields_dict.items():
+            for path in field.paths:
+                self._path_fields.setdefault(path, set()).add(field_name)
+        self._schema_fields:dict[str,set[str]] = {name: schema.fields for name, schema in api_object.schemas_dict.items()}
+        self._operation_fields:dict[str,frozenset[str]] = {}
+
+    @classmethod
+    def from_document(cls, api_content:dict) -> "PayloadProfiler":
+        api_object = ApiObject(api_content)
+        api_object.parse()
+        return cls(api_object, PathRouter.from_document(api_content), SchemaGraph(api_content))
+
+    def get_operation_fields(self, operation:str) -> frozenset[str]:
+        """ Fields documented for an operation (computed on first use). """
+        fields = self._operation_fields.get(operation)
+        if fields is None:
+            fields = set(self._path_fields.get(operation.partition(" ")[2], ()))
+            for schema in self.schema_graph.schemas_reachable_from(operation):
+                fields.update(self._schema_fields.get(schema, ()))
+            fields = self._operation_fields[operation] = frozenset(fields)
+        return fields
+
+    def add_payload(self, profile:UsageProfile, operation:str, body:Any) -> None:
+        """ Count every key of a body (nested objects & arrays of objects included) once per payload for presence. """
+        known = self.get_operation_fields(operation)
+        fields = profile.fields
+        seen = set()
+        stack = [body]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(item for item in node if isinstance(item, (dict, list)))
+                continue
+            for name, value in node.items():
+                usage = fields.get(name)
+                if usage is None:
+                    usage = fields[name] = FieldUsage()
+                if name not in seen:
+                    seen.add(name)
+                    usage.payloads += 1
+                    if name not in known:
+                        key = (operation, name)
+                        profile.unknown[key] = profile.unknown.get(key, 0) + 1
+                usage.values += 1
+                if value is None:
+                    usage.nulls += 1
+                elif isinstance(value, (dict, list)):
+                    if isinstance(value, list):
+                        usage.add_length(len(value))
+                    stack.append(value)
+                elif isinstance(value, str):
+                    usage.add_length(len(value))
+                else:
+                    usage.add_length(len(str(value)))
+
+    def add_lines(self, lines:Iterable[bytes], profile:UsageProfile=None) -> UsageProfile:
+        profile = profile or UsageProfile()
+        for line in lines:
+            if not line.strip():
+                continue
+            profile.records += 1
+            try:
+                record = json.loads(line)
+                body = record.get("body")
+                if isinstance(body, str):
+                    body = json.loads(body)
+                method = record.get("method", "GET")
+                path = record.get("path") or record.get("url", "")
+            except (ValueError, AttributeError):
+                profile.invalid += 1
+                continue
+            if not isinstance(body, (dict, list)) or not isinstance(path, str) or not isinstance(method, str):
+                profile.invalid += 1
+                continue
+            operation = self.router.lookup(method, path.partition("?")[0])[0]
+            if operation is None:
+                profile.unmatched += 1
+                continue
+            key = f"{operation} {record.get('direction', 'request')}"
+            profile.operations[key] = profile.operations.get(key, 0) + 1
+            self.add_payload(profile, operation, body)
+        return profile
+
+    def to_dataframes(self, profile:UsageProfile) -> dict[str,"pd.DataFrame"]:
+        """ Usage per field (dictionary fields never seen included), unknown fields per operation & payloads per operation. """
+        import pandas as pd
+        rows = []
+        for name in sorted(self.dictionary_fields | set(profile.fields)):
+            usage = profile.fields.get(name) or FieldUsage()
+            stats = usage.to_dict()
+            rows.append([name, name in self.dictionary_fields] + [stats[column] for column in STAT_COLUMNS[2:]])
+        unknown = [[operation, name, count, name in self.dictionary_fields] for (operation, name), count in sorted(profile.unknown.items())]
+        return {
+            "Fields": pd.DataFrame(rows, columns=STAT_COLUMNS),
+            "Unknown fields": pd.DataFrame(unknown, columns=["operation", "field_name", "nb_payload", "documented_elsewhere"]),
+            "Operations": pd.DataFrame(sorted(profile.operations.items()), columns=["operation", "nb_payload"]),
+        }
+
+    def to_dict(self, profile:UsageProfile):
+        unknown = {}
+        for (operation, name), count in sorted(profile.unknown.items()):
+            unknown.setdefault(operation, {})[name] = count
+        to_return = {
+            "records": profile.records,
+            "invalid": profile.invalid,
+            "unmatched": profile.unmatched,
+            "operations": dict(sorted(profile.operations.items())),
+            "fields": {name: dict((profile.fields.get(name) or FieldUsage()).to_dict(), documented=name in self.dictionary_fields)
+                       for name in sorted(self.dictionary_fields | set(profile.fields))},
+            "unknown_fields": unknown,
+        }
+        return to_return
+
+def read_range(filename:Path, start:int, end:int) -> Iterator[bytes]:
+    """ Lines of a plain file starting in the byte range [start, end[. """
+    with open(filename, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()            # end of the line started before the range (owned by the previous range)
+        position = f.tell()
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line
+
+def get_tasks(filenames:list[Path], chunk_size:int=CHUNK_SIZE) -> list[tuple[str,int,int]]:
+    """ (file, start, end) to profile: byte ranges for plain files, whole file (end=-1) for gzip files. """
+    tasks = []
+    for filename in filenames:
+        with open(filename, "rb") as f:
+            compressed = f.read(2) == b"\x1f\x8b"
+        size = os.path.getsize(filename)
+        if compressed or size <= chunk_size:
+            tasks.append((str(filename), 0, -1))
+        else:
+            tasks.extend((str(filename), start, min(start + chunk_size, size)) for start in range(0, size, chunk_size))
+    return tasks
+
+_worker_profiler:PayloadProfiler = None
+
+def init_worker(openapi_file:Path, cache_dir:Path, use_cache:bool) -> None:
+    """ Build the profiler once per worker process (document reused from the cache). """
+    from data_dictionary import DictionaryOptions, get_document
+    global _worker_profiler
+    options = DictionaryOptions(cache=ContentCache(cache_dir, max_size=CACHE_MAX_SIZE_MB*1024*1024, enabled=use_cache))
+    _worker_profiler = PayloadProfiler.from_document(get_document(openapi_file, options))
+
+def profile_task(task:tuple[str,int,int]) -> UsageProfile:
+    filename, start, end = task
+    lines = read_lines(filename) if end == -1 else read_range(filename, start, end)
+    return _worker_profiler.add_lines(lines)
+
+def profile_files(openapi_file:Path, filenames:list[Path], workers:int=None, use_cache:bool=True, chunk_size:int=CHUNK_SIZE) -> tuple[PayloadProfiler, UsageProfile]:
+    """ Profile capture files in parallel processes (workers=1: in the current process) and merge their profiles. """
+    tasks = get_tasks(filenames, chunk_size)
+    init_worker(openapi_file, CACHE_DIR, use_cache)
+    profile = UsageProfile()
+    if workers == 1 or len(tasks) == 1:
+        for task in tasks:
+            profile.merge(profile_task(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(openapi_file, CACHE_DIR, use_cache)) as executor:
+            for task_profile in executor.map(profile_task, tasks):
+                profile.merge(task_profile)
+    return _worker_profiler, profile
+
+def payloads(openapi_file:Path = typer.Argument(..., exists=True, readable=True, resolve_path=True, show_default=False, help="openapi file (JSON or YAML)"),
+        captures:list[Path] = typer.Argument(..., exists=True, readable=True, show_default=False, help="NDJSON capture file(s) of request/response bodies, plain or gzip"),
+        format:str = typer.Option("json", "--format", "-f", help="Format of the report: json, xlsx"),
+        outfile:Path = typer.Option(None, "--outfile", "-o", resolve_path=True, help="Save the report to this file"),
+        workers:int = typer.Option(None, "--workers", "-w", show_default="Number of CPUs", help="Number of processes profiling the capture files"),
+        use_cache:bool = typer.Option(True, "--cache/--no-cache", help="Reuse the document cached for an unchanged openapi file"),
+        ) -> None:
+    from data_dictionary import DictionaryError, render_xlsx_sheets
+    if format not in ("json", "xlsx"):
+        raise typer.BadParameter("Possible values for format are: ['json', 'xlsx']")
+    try:
+        profiler, profile = profile_files(openapi_file, captures, workers, use_cache)
+    except DictionaryError as e:
+        print(str(e))
+        raise typer.Exit(code=1)
+    used = [name for name in profiler.dictionary_fields if name in profile.fields]
+    sep = '-'*15
+    print(f"{sep} Usage of fields {sep}")
+    print(f"- Records: {profile.records} ({profile.invalid} invalid, {profile.unmatched} not matching any operation)")
+    print(f"- Operations seen: {len({operation.rpartition(' ')[0] for operation in profile.operations})}/{len(profiler.router.operations)}")
+    print(f"- Dictionary fields used: {len(used)}/{len(profiler.dictionary_fields)}")
+    print(f"- Fields not documented for their operation: {len({name for _, name in profile.unknown})}")
+    print(sep*3)
+    if outfile:
+        if format == "xlsx":
+            data = render_xlsx_sheets(profiler.to_dataframes(profile), XLSX_LAYOUT)
+        else:
+            data = json.dumps(profiler.to_dict(profile), indent=4).encode()
+        with open(outfile, "wb") as f:
+            f.write(data)
+        print(f"Report saved to file: '{outfile}'")
+
+if __name__ == "__main__":
+    typer.run(payloads)
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'api_schema_graph'
+__version__ = '1.0.0'
+
+'''
+Reachability graph of the schemas of an openapi file (python main.py graph spec.yaml).
+
+Edges: schema -> schema referenced anywhere in its definition (properties, items, allOf/oneOf/anyOf, ...),
+operation -> root schema referenced by its parameters, request body or responses.
+
+Cycles are collapsed into strongly connected components, then the transitive closure is computed once on the resulting DAG
+as bitsets (python int, one bit per schema / operation), in both directions:
+    - schemas reachable from each operation (or schema)
+    - operations (or schemas) reaching each schema
+so that impact analysis queries ("which operations touch schema X") are answered from the index, without walking the graph.
+'''
+
+# Standard Python Modules
+import json
+from typing import Any
+
+# External Python Modules
+
+# Personal Python Modules
+from params import *
+from openapi_validator import HTTP_METHODS, LITERAL_KEYS, NAME_MAP_KEYS, resolve_pointer
+
+SCHEMA_PREFIX = "#/components/schemas/"
+
+def get_bits(bitset:int) -> list[int]:
+    """ Indexes of the bits set in a bitset. """
+    indexes = []
+    while bitset:
+        low_bit = bitset & -bitset
+        indexes.append(low_bit.bit_length() - 1)
+        bitset ^= low_bit
+    return indexes
+
+def get_strongly_connected_components(successors:list[list[int]]) -> list[list[int]]:
+    """ Strongly connected components (Tarjan, iterative), in reverse topological order: a component comes after all components it reaches. """
+    index_of = [-1] * len(successors)
+    low_link = [0] * len(successors)
+    on_stack = [False] * len(successors)
+    stack, components = [], []
+    counter = 0
+    for root in range(len(successors)):
+        if index_of[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, next_child = work.pop()
+            if next_child == 0:
+                index_of[node] = low_link[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            recurse = False
+            children = successors[node]
+            while next_child < len(children):
+                child = children[next_child]
+                next_child += 1
+                if index_of[child] == -1:
+                    work.append((node, next_child))
+                    work.append((child, 0))
+                    recurse = True
+                    break
+                if on_stack[child]:
+                    low_link[node] = min(low_link[node], index_of[child])
+            if recurse:
+                continue
+            if low_link[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+            if work:
+                parent = work[-1][0]
+                low_link[parent] = min(low_link[parent], low_link[node])
+    return components
+
+class SchemaGraph():
+    """ Schema & operation graph of an openapi document with its precomputed transitive indexes. """
+    def __init__(self, api_content:dict):
+        self.api_content:dict = api_content
+        self.schemas:list[str] = sorted(SCHEMA_PREFIX + name for name in (api_content.get("components") or {}).get("schemas") or {})
+        self.operations:list[str] = []
+        self.schema_edges:dict[str,list[str]] = {}          # schema -> schemas directly referenced
+        self.operation_edges:dict[str,list[str]] = {}       # operation -> root schemas
+        self.cycles:list[list[str]] = []
+        self._cyclic:set[int] = set()                       # schemas belonging to a cycle (reachable from themselves)
+        self._schema_index:dict[str,int] = {}
+        self._operation_index:dict[str,int] = {}
+        self._schema_reach:list[int] = []                   # schema -> bitset of schemas reachable (itself included)
+        self._schema_reached_by:list[int] = []              # schema -> bitset of schemas reaching it (itself included)
+        self._operation_reach:list[int] = []                # operation -> bitset of schemas reachable
+        self._operations_reaching:list[int] = []            # schema -> bitset of operations reaching it
+        self._build_edges()
+        self._build_index()
+
+    def _get_schema_refs(self, node:Any) -> set[str]:
+        """ Schemas referenced in a node. References to other components (request bodies, responses, parameters) are followed. """
+        refs = set()
+        visited = set()
+        stack = [(node, False)]                             # (node, node is a map of names)
+        while stack:
+            node, name_map = stack.pop()
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            if isinstance(node, dict):
+                if name_map:
+                    stack.extend((value, False) for value in node.values() if isinstance(value, (dict, list)))
+                    continue
+                ref = node.get("$ref")
+                if isinstance(ref, str):
+                    if ref.startswith(SCHEMA_PREFIX):
+                        refs.add(SCHEMA_PREFIX + ref[len(SCHEMA_PREFIX):].split("/")[0])
+                        continue
+                    target = resolve_pointer(self.api_content, ref) if ref.startswith("#") else None
+                    if isinstance(target, (dict, list)):
+                        stack.append((target, False))
+                for key, value in node.items():
+                    if isinstance(value, (dict, list)) and key not in LITERAL_KEYS and key != "examples":
+                        stack.append((value, key in NAME_MAP_KEYS))
+            else:
+                stack.extend((value, False) for value in node if isinstance(value, (dict, list)))
+        return refs
+
+    def _build_edges(self) -> None:
+        known = set(self.schemas)
+        for name, schema_specs in ((self.api_content.get("components") or {}).get("schemas") or {}).items():
+            self.schema_edges[SCHEMA_PREFIX + name] = sorted(self._get_schema_refs(schema_specs) & known)
+        paths = self.api_content.get("paths",{})
+        for path, path_item in (paths.items() if isinstance(paths, dict) else []):
+            if not isinstance(path_item, dict):
+                continue
+            path_refs = self._get_schema_refs(path_item.get("parameters") or [])
+            for method in HTTP_METHODS:
+                operation = path_item.get(method)
+                if not isinstance(operation, dict):
+                    continue
+                operation_name = f"{method.upper()} {path}"
+                self.operations.append(operation_name)
+                self.operation_edges[operation_name] = sorted((self._get_schema_refs(operation) | path_refs) & known)
+
+    def _build_index(self) -> None:
+        self._schema_index = {name: i for i, name in enumerate(self.schemas)}
+        self._operation_index = {name: i for i, name in enumerate(self.operations)}
+        successors = [[self._schema_index[ref] for ref in self.schema_edges[name]] for name in self.schemas]
+
+        # Condensation: one node per strongly connected component (reverse topological order)
+        components = get_strongly_connected_components(successors)
+        component_of = [0] * len(self.schemas)
+        for c, component in enumerate(components):
+            for member in component:
+                component_of[member] = c
+            if len(component) > 1 or component[0] in successors[component[0]]:
+                self.cycles.append(sorted(self.schemas[member] for member in component))
+                self._cyclic.update(component)
+        members = [sum(1 << member for member in component) for component in components]
+        component_successors = [{component_of[child] for member in component for child in successors[member]} - {c}
+                                for c, component in enumerate(components)]
+
+        # Forward closure: components reached by a component are processed before it
+        reach = list(members)
+        for c in range(len(components)):
+            for d in component_successors[c]:
+                reach[c] |= reach[d]
+        # Backward closure: components in topological order, each one propagating to its successors
+        reached_by = list(members)
+        operations_reaching = [0] * len(components)
+        for o, operation in enumerate(self.operations):
+            for root in self.operation_edges[operation]:
+                operations_reaching[component_of[self._schema_index[root]]] |= 1 << o
+        for c in reversed(range(len(components))):
+            for d in component_successors[c]:
+                reached_by[d] |= reached_by[c]
+                operations_reaching[d] |= operations_reaching[c]
+
+        self._schema_reach = [reach[component_of[i]] for i in range(len(self.schemas))]
+        self._schema_reached_by = [reached_by[component_of[i]] for i in range(len(self.schemas))]
+        self._operations_reaching = [operations_reaching[component_of[i]] for i in range(len(self.schemas))]
+        self._operation_reach = []
+        for operation in self.operations:
+            bitset = 0
+            for root in self.operation_edges[operation]:
+                bitset |= self._schema_reach[self._schema_index[root]]
+            self._operation_reach.append(bitset)
+
+    def get_schema_name(self, schema:str) -> str:
+        """ Full name of a schema ('Pet' or '#/components/schemas/Pet'). """
+        name = schema if schema.startswith(SCHEMA_PREFIX) else SCHEMA_PREFIX + schema
+        if name not in self._schema_index:
+            raise KeyError(f"unknown schema '{schema}'")
+        return name
+
+    def get_operation_name(self, operation:str) -> str:
+        """ Full name of an operation ('get /pets' or 'GET /pets'). """
+        method, _, path = operation.strip().partition(" ")
+        name = f"{method.upper()} {path.strip()}"
+        if name not in self._operation_index:
+            raise KeyError(f"unknown operation '{operation}'")
+        return name
+
+    def operations_reaching(self, schema:str) -> list[str]:
+        """ Operations using a schema, directly or through nested references. """
+        bitset = self._operations_reaching[self._schema_index[self.get_schema_name(schema)]]
+        return [self.operations[o] for o in get_bits(bitset)]
+
+    def schemas_reachable_from(self, operation:str) -> list[str]:
+        """ Schemas used by an operation, directly or through nested references. """
+        bitset = self._operation_reach[self._operation_index[self.get_operation_name(operation)]]
+        return [self.schemas[i] for i in get_bits(bitset)]
+
+    def schemas_referenced_by(self, schema:str) -> list[str]:
+        """ Schemas reachable from a schema (itself excluded unless it belongs to a cycle). """
+        i = self._schema_index[self.get_schema_name(schema)]
+        bitset = self._schema_reach[i] if i in self._cyclic else self._schema_reach[i] & ~(1 << i)
+        return [self.schemas[j] for j in get_bits(bitset)]
+
+    def schemas_referencing(self, schema:str) -> list[str]:
+        """ Schemas reaching a schema (itself excluded unless it belongs to a cycle). """
+        i = self._schema_index[self.get_schema_name(schema)]
+        bitset = self._schema_reached_by[i] if i in self._cyclic else self._schema_reached_by[i] & ~(1 << i)
+        return [self.schemas[j] for j in get_bits(bitset)]
+
+    def to_dict(self):
+        to_return = {
+            "schemas": self.schemas,
+            "operations": self.operations,
+            "edges": {"schemas": self.schema_edges, "operations": self.operation_edges},
+            "cycles": self.cycles,
+            "index": {
+                "operations_by_schema": {schema: [self.operations[o] for o in get_bits(self._operations_reaching[i])] for i, schema in enumerate(self.schemas)},
+                "schemas_by_operation": {operation: [self.schemas[i] for i in get_bits(self._operation_reach[o])] for o, operation in enumerate(self.operations)},
+            },
+        }
+        return to_return
+
+    def to_json(self, indent=None):
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_dot(self) -> str:
+        """ Graphviz representation: operations as boxes, schemas as ellipses (members of a cycle in red). """
+        lines = ["digraph schemas {", "    rankdir=LR;", '    node [shape=ellipse, fontsize=10];']
+        for i, schema in enumerate(self.schemas):
+            color = ', color="red"' if i in self._cyclic else ""
+            lines.append(f'    "{schema}" [label="{schema[len(SCHEMA_PREFIX):]}"{color}];')
+        for operation in self.operations:
+            lines.append(f'    "{operation}" [shape=box];')
+        for operation, roots in self.operation_edges.items():
+            lines.extend(f'    "{operation}" -> "{root}";' for root in roots)
+        for schema, refs in self.schema_edges.items():
+            lines.extend(f'    "{schema}" -> "{ref}";' for ref in refs)
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+if __name__ == "__main__":
+    import typer
+    from spec_commands import graph
+    typer.run(graph)
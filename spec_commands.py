@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'api_spec_commands'
+__version__ = '1.0.0'
+
+'''
+Command line tools on openapi files built on the library modules (python main.py validate specs/*.yaml, python main.py graph spec.yaml).
+
+Commands are kept out of openapi_validator.py & schema_graph.py: these modules are used by the data dictionary API,
+which does not load typer.
+'''
+
+# Standard Python Modules
+import logging
+import time
+from pathlib import Path
+
+# External Python Modules
+import typer
+
+# Personal Python Modules
+from params import *
+from utils.coloredlog import get_logger
+from openapi_validator import SEVERITY_ERROR, OpenApiValidator, get_errors
+
+def validate(openapi_files:list[Path] = typer.Argument(..., exists=True, readable=True, help="openapi file(s) to validate"),
+        warnings:bool = typer.Option(True, help="Also display warnings"),
+        ) -> None:
+    from data_dictionary import DictionaryError, load_document
+    logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_SUCCESS, success_level=LOGLEVEL_SUCCESS)
+    validator = OpenApiValidator()
+    nb_invalid = 0
+    for openapi_file in openapi_files:
+        try:
+            document = load_document(openapi_file)
+        except DictionaryError as e:
+            logger.error(f"{openapi_file}: {str(e)}")
+            nb_invalid += 1
+            continue
+        start = time.perf_counter()
+        issues = validator.validate(document)
+        duration = time.perf_counter() - start
+        errors = get_errors(issues)
+        for issue in issues:
+            if issue.severity == SEVERITY_ERROR:
+                logger.error(f"{openapi_file}: {issue}")
+            elif warnings:
+                logger.warning(f"{openapi_file}: {issue}")
+        if errors:
+            nb_invalid += 1
+            logger.error(f"{openapi_file}: {len(errors)} error(s), {len(issues) - len(errors)} warning(s) ({duration*1000:.1f} ms)")
+        else:
+            logger.log(LOGLEVEL_SUCCESS, f"{openapi_file}: valid, {len(issues)} warning(s) ({duration*1000:.1f} ms)")
+    if nb_invalid:
+        raise typer.Exit(code=1)
+
+def graph(openapi_file:Path = typer.Argument(..., exists=True, readable=True, resolve_path=True, show_default=False, help="openapi file (JSON or YAML)"),
+        format:str = typer.Option("json", "--format", "-f", help="Export format: json, dot"),
+        outfile:Path = typer.Option(None, "--outfile", "-o", resolve_path=True, help="Export the graph & its index to this file"),
+        schemas:list[str] = typer.Option(None, "--schema", "-s", help="Print the operations reaching this schema (short or full name)"),
+        operations:list[str] = typer.Option(None, "--operation", "-p", help="Print the schemas reachable from this operation (i.e. 'POST /pets')"),
+        validate:bool = typer.Option(True, "--validate/--no-validate", help="Check the structure of the openapi file first"),
+        use_cache:bool = typer.Option(True, "--cache/--no-cache", help="Reuse the document cached for an unchanged openapi file"),
+        ) -> None:
+    from utils.cache import ContentCache
+    from data_dictionary import DictionaryError, DictionaryOptions, get_schema_graph
+    if format not in ("json", "dot"):
+        raise typer.BadParameter("Possible values for format are: ['json', 'dot']")
+    logger = get_logger(logger_name=__appname__, console_loglevel=logging.ERROR, success_level=LOGLEVEL_SUCCESS)
+    options = DictionaryOptions(cache=ContentCache(CACHE_DIR, max_size=CACHE_MAX_SIZE_MB*1024*1024, enabled=use_cache), logger=logger, validate=validate)
+    try:
+        schema_graph = get_schema_graph(openapi_file, options)
+    except DictionaryError as e:
+        for line in str(e).splitlines():
+            logger.error(line)
+        raise typer.Exit(code=1)
+    sep = '-'*15
+    print(f"{sep} Schema graph {sep}")
+    print(f"- Schemas: {len(schema_graph.schemas)} ({sum(len(refs) for refs in schema_graph.schema_edges.values())} references, {len(schema_graph.cycles)} cycle(s))")
+    print(f"- Operations: {len(schema_graph.operations)}")
+    try:
+        for schema in schemas or []:
+            reaching = schema_graph.operations_reaching(schema)
+            print(f"- Operations reaching '{schema}':")
+            print("".join([f"    {operation}\n" for operation in reaching]), end="")
+        for operation in operations or []:
+            reachable = schema_graph.schemas_reachable_from(operation)
+            print(f"- Schemas reachable from '{operation}':")
+            print("".join([f"    {schema}\n" for schema in reachable]), end="")
+    except KeyError as e:
+        logger.error(e.args[0])
+        raise typer.Exit(code=1)
+    print(sep*3)
+    if outfile:
+        with open(outfile, "w") as f:
+            f.write(schema_graph.to_dot() if format == "dot" else schema_graph.to_json(indent=4))
+        print(f"Schema graph saved to file: '{outfile}'")
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'api_spec_filter'
+__version__ = '1.0.0'
+
+'''
+Selection of a part of an openapi file before its analysis (python main.py spec.yaml --include-path "/repos/**" --method get).
+
+Operations are kept by path pattern (include / exclude), tag and method. The filtered document keeps only these operations,
+plus the schemas & parameters of components reachable from them: references are followed from the kept operations only,
+so the work done (filtering, then analysis) depends on the selected part, not on the size of the whole document.
+The original document is not modified: the filtered one shares its nodes.
+'''
+
+# Standard Python Modules
+import re
+from typing import Any
+from urllib.parse import unquote
+
+# External Python Modules
+
+# Personal Python Modules
+from openapi_validator import HTTP_METHODS, LITERAL_KEYS, NAME_MAP_KEYS, resolve_pointer
+
+COMPONENTS_PREFIX = "#/components/"
+PRUNED_COMPONENTS = ["schemas", "parameters"]      # components listed as entities of the data dictionary
+
+def compile_path_pattern(pattern:str) -> re.Pattern:
+    """ Regex of a path pattern: '*' matches within one segment, '**' any number of segments ('/repos/**' matches '/repos' too). """
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "(/.*)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return re.compile(regex + "$")
+
+class SpecFilter():
+    """ Operations to keep from an openapi document.
+
+    - include_paths: path patterns of the operations kept (None: all paths)
+    - exclude_paths: path patterns of the operations removed (applied after include_paths)
+    - include_tags: operations having at least one of these tags (None: all operations)
+    - methods: http methods kept (None: all methods)
+    """
+    def __init__(self, include_paths:list[str]=None, exclude_paths:list[str]=None, include_tags:list[str]=None, methods:list[str]=None):
+        self.include_paths:list[str] = list(include_paths or [])
+        self.exclude_paths:list[str] = list(exclude_paths or [])
+        self.include_tags:list[str] = list(include_tags or [])
+        self.methods:list[str] = [method.lower() for method in methods or []]
+        for method in self.methods:
+            if method not in HTTP_METHODS:
+                raise ValueError(f"unknown http method '{method}' (possible values: {', '.join(HTTP_METHODS)})")
+        self._include_regex:list[re.Pattern] = [compile_path_pattern(pattern) for pattern in self.include_paths]
+        self._exclude_regex:list[re.Pattern] = [compile_path_pattern(pattern) for pattern in self.exclude_paths]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.include_paths or self.exclude_paths or self.include_tags or self.methods)
+
+    def __str__(self):
+        criteria = [f"{name}={','.join(values)}" for name, values in (("include_paths", self.include_paths), ("exclude_paths", self.exclude_paths),
+                    ("include_tags", self.include_tags), ("methods", self.methods)) if values]
+        return "; ".join(criteria) or "no filter"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def get_key(self) -> str:
+        """ Part of the cache key of an analysis made on the filtered document (order of the criteria is irrelevant). """
+        return repr([sorted(self.include_paths), sorted(self.exclude_paths), sorted(self.include_tags), sorted(self.methods)])
+
+    def keep_path(self, path:str) -> bool:
+        if self._include_regex and not any(regex.match(path) for regex in self._include_regex):
+            return False
+        return not any(regex.match(path) for regex in self._exclude_regex)
+
+    def keep_operation(self, method:str, operation:dict) -> bool:
+        if self.methods and method not in self.methods:
+            return False
+        if self.include_tags:
+            tags = operation.get("tags") or []
+            return any(tag in self.include_tags for tag in tags if isinstance(tag, str))
+        return True
+
+    def apply(self, api_content:dict) -> tuple[dict, dict[str,dict[str,int]]]:
+        """ Filtered document & counts of what was kept: {"operations"|"schemas"|"parameters": {"kept": n, "total": n}}. """
+        counts = {"operations": {"kept": 0, "total": 0}}
+        paths = api_content.get("paths",{})
+        kept_paths = {}
+        for path, path_item in (paths.items() if isinstance(paths, dict) else []):
+            if not isinstance(path_item, dict):
+                continue
+            methods = [method for method in HTTP_METHODS if isinstance(path_item.get(method), dict)]
+            counts["operations"]["total"] += len(methods)
+            if not self.keep_path(path):
+                continue
+            kept_methods = [method for method in methods if self.keep_operation(method, path_item[method])]
+            if not kept_methods:
+                continue
+            counts["operations"]["kept"] += len(kept_methods)
+            kept_paths[path] = {key: value for key, value in path_item.items() if key not in HTTP_METHODS or key in kept_methods}
+        filtered = dict(api_content)
+        filtered["paths"] = kept_paths
+        components = api_content.get("components")
+        if isinstance(components, dict):
+            reachable = get_reachable_components(api_content, list(kept_paths.values()))
+            filtered["components"] = dict(components)
+            for component_type in PRUNED_COMPONENTS:
+                entities = components.get(component_type)
+                if not isinstance(entities, dict):
+                    continue
+                kept = reachable.get(component_type, set())
+                filtered["components"][component_type] = {name: specs for name, specs in entities.items() if name in kept}
+                counts[component_type] = {"kept": len(filtered["components"][component_type]), "total": len(entities)}
+        return filtered, counts
+
+def get_reachable_components(api_content:dict, node:Any) -> dict[str,set[str]]:
+    """ Components (type -> names) referenced from a node, directly or through other components. Each node is walked once. """
+    reachable:dict[str,set[str]] = {}
+    visited = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if id(node) in visited:
+            continue
+        visited.add(id(node))
+        if isinstance(node, list):
+            stack.extend(value for value in node if isinstance(value, (dict, list)))
+            continue
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#"):
+            if ref.startswith(COMPONENTS_PREFIX):
+                component_type, _, name = ref[len(COMPONENTS_PREFIX):].partition("/")
+                name = name.split("/")[0]
+                reachable.setdefault(component_type, set()).add(unquote(name).replace("~1", "/").replace("~0", "~"))
+                ref = COMPONENTS_PREFIX + component_type + "/" + name     # whole component, not only the part referenced
+            target = resolve_pointer(api_content, ref)
+            if isinstance(target, (dict, list)):
+                stack.append(target)
+        for key, value in node.items():
+            if not isinstance(value, (dict, list)) or key in LITERAL_KEYS or key == "examples":
+                continue
+            if key in NAME_MAP_KEYS and isinstance(value, dict):
+                stack.extend(item for item in value.values() if isinstance(item, (dict, list)))   # map of names: its keys are never keywords
+            else:
+                stack.append(value)
+    return reachable
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'spec_generator'
+__version__ = '1.0.0'
+
+# Standard Python Modules
+import json
+import os
+import random
+from pathlib import Path
+
+# External Python Modules
+import typer
+import yaml
+
+# Personal Python Modules
+from params import *
+from utils.coloredlog import get_logger
+
+### Global Variables
+METHODS = ["get", "post", "put", "patch", "delete"]
+BODY_METHODS = ["post", "put", "patch"]
+PARAM_LOCATIONS = ["query", "header", "cookie"]
+SCALAR_TYPES = [("string", None), ("string", "date-time"), ("string", "uuid"), ("integer", "int64"), ("integer", "int32"), ("number", "double"), ("boolean", None)]
+
+logger = get_logger(logger_name=__appname__, console_loglevel=LOGLEVEL_SUCCESS, success_level=LOGLEVEL_SUCCESS)
+
+class SpecGenerator():
+    """ Generate a valid, reproducible (seeded) OpenAPI 3.0 document of configurable size and shape.
+
+    Shape options:
+    - operations / schemas: size of the document
+    - width: number of properties per schema
+    - ref_depth: length of $ref chains (schema -> property -> schema -> ...)
+    - allof_ratio: share of schemas defined with allOf (referenced base schema + own properties)
+    - cyclic_ratio: share of schemas having a property referencing back a previous schema (reference cycles)
+    - path_params: number of parameters declared at path level (on top of path template parameters)
+    - vocabulary: number of distinct field names (small vocabulary => many fields shared between schemas)
+    - shared_fragments: number of property fragments reused as the same object in several schemas
+      (dumped as anchors/aliases in YAML)
+    """
+    def __init__(self, operations:int=100, schemas:int=50, width:int=10, ref_depth:int=3, allof_ratio:float=0.1, cyclic_ratio:float=0.05,
+                 path_params:int=2, vocabulary:int=500, shared_fragments:int=0, tags:int=10, seed:int=0):
+        self.nb_operations = operations
+        self.nb_schemas = max(schemas, 1)
+        self.width = width
+        self.ref_depth = ref_depth
+        self.allof_ratio = allof_ratio
+        self.cyclic_ratio = cyclic_ratio
+        self.path_params = path_params
+        self.vocabulary = max(vocabulary, 1)
+        self.nb_shared_fragments = shared_fragments
+        self.nb_tags = max(tags, 1)
+        self.random = random.Random(seed)
+        self.shared_fragments:list[dict] = []
+
+    def schema_name(self, i:int) -> str:
+        return f"Schema{i:06d}"
+
+    def schema_ref(self, i:int) -> str:
+        return "#/components/schemas/" + self.schema_name(i)
+
+    def field_name(self) -> str:
+        return f"field{self.random.randrange(self.vocabulary):06d}"
+
+    def scalar_property(self) -> dict:
+        schema_type, schema_format = self.random.choice(SCALAR_TYPES)
+        prop = {"type": schema_type, "description": f"Generated {schema_type} value {self.random.randrange(1000)}"}
+        if schema_format:
+            prop["format"] = schema_format
+        if schema_type == "string" and not schema_format and self.random.random() < 0.2:
+            prop["enum"] = [f"value{k}" for k in range(self.random.randint(2, 12))]
+        return prop
+
+    def build_shared_fragments(self):
+        self.shared_fragments = []
+        for _ in range(self.nb_shared_fragments):
+            fragment = self.scalar_property()
+            fragment["description"] = "Shared fragment " + fragment["description"]
+            fragment["example"] = {"nested": [self.random.randrange(100) for _ in range(5)]}
+            self.shared_fragments.append(fragment)
+
+    def build_schema(self, i:int) -> dict:
+        properties = {}
+        for _ in range(self.width):
+            if self.shared_fragments and self.random.random() < 0.3:
+                properties[self.field_name()] = self.random.choice(self.shared_fragments)   # same object => YAML alias
+            else:
+                properties[self.field_name()] = self.scalar_property()
+        # $ref chains: schema i references schema i+1, until end of chain
+        if self.ref_depth and (i + 1) % (self.ref_depth + 1) and i + 1 < self.nb_schemas:
+            if self.random.random() < 0.5:
+                properties[f"child{i % 97}"] = {"$ref": self.schema_ref(i + 1)}
+            else:
+                properties[f"children{i % 89}"] = {"type": "array", "items": {"$ref": self.schema_ref(i + 1)}}
+        # Cyclic references: back to a previous schema
+        if i and self.random.random() < self.cyclic_ratio:
+            properties[f"parent{i % 83}"] = {"$ref": self.schema_ref(self.random.randrange(i))}
+        required = sorted(self.random.sample(sorted(properties), k=min(len(properties), self.random.randint(0, 3))))
+        schema = {"type": "object", "description": f"Generated schema {i}", "properties": properties}
+        if required:
+            schema["required"] = required
+        if i and self.random.random() < self.allof_ratio:
+            schema = {"allOf": [{"$ref": self.schema_ref(self.random.randrange(i))}, schema]}
+        return schema
+
+    def build_parameter(self, k:int) -> dict:
+        location = PARAM_LOCATIONS[k % len(PARAM_LOCATIONS)]
+        prop = self.scalar_property()
+        return {"name": f"param{k:05d}", "in": location, "description": f"Generated {location} parameter {k}",
+                "required": self.random.random() < 0.3, "schema": {"type": prop["type"]}}
+
+    def build_operation(self, path:str, method:str, k:int) -> dict:
+        operation = {
+            "operationId": f"{method}Operation{k:06d}",
+            "summary": f"Generated operation {k}",
+            "tags": [f"tag{self.random.randrange(self.nb_tags):03d}"],
+            "parameters": [{"$ref": f"#/components/parameters/Param{self.random.randrange(self.nb_component_params):05d}"}],
+            "responses": {"200": {"description": "OK", "content": {"application/json": {"schema": {"$ref": self.schema_ref(self.random.randrange(self.nb_schemas))}}}}},
+        }
+        if method in BODY_METHODS:
+            choice = self.random.random()
+            if choice < 0.7:
+                body_schema = {"$ref": self.schema_ref(self.random.randrange(self.nb_schemas))}
+            elif choice < 0.85:
+                body_schema = {"type": "array", "items": {"$ref": self.schema_ref(self.random.randrange(self.nb_schemas))}}
+            else:
+                body_schema = {"type": "object", "properties": {self.field_name(): self.scalar_property() for _ in range(self.width)}}
+            operation["requestBody"] = {"content": {"application/json": {"schema": body_schema}}}
+        return operation
+
+    def generate(self) -> dict:
+        self.build_shared_fragments()
+        self.nb_component_params = max(self.path_params * 4, 10)
+        document = {
+            "openapi": "3.0.3",
+            "info": {"title": "Generated API", "version": "1.0.0", "description": f"Synthetic spec: {self.nb_operations} operations, {self.nb_schemas} schemas"},
+            "servers": [{"url": "https://api.example.com/v1"}],
+            "tags": [{"name": f"tag{t:03d}"} for t in range(self.nb_tags)],
+            "paths": {},
+            "components": {
+                "schemas": {self.schema_name(i): self.build_schema(i) for i in range(self.nb_schemas)},
+                "parameters": {f"Param{k:05d}": self.build_parameter(k) for k in range(self.nb_component_params)},
+            },
+        }
+        k = 0
+        p = 0
+        while k < self.nb_operations:
+            path = f"/resource{p // 3:05d}" + ["", "/{id}", "/{id}/items/{itemId}"][p % 3]
+            path_item = {}
+            # path template parameters & extra path-level parameters
+            path_parameters = [{"name": name, "in": "path", "required": True, "schema": {"type": "string"}} for name in ("id", "itemId") if "{" + name + "}" in path]
+            path_parameters += [{"$ref": f"#/components/parameters/Param{k:05d}"} for k in self.random.sample(range(self.nb_component_params), self.path_params)]
+            if path_parameters:
+                path_item["parameters"] = path_parameters
+            for method in self.random.sample(METHODS, k=min(self.random.randint(1, len(METHODS)), self.nb_operations - k)):
+                path_item[method] = self.build_operation(path, method, k)
+                k += 1
+            document["paths"][path] = path_item
+            p += 1
+        return document
+
+def save_document(document:dict, outfile:Path) -> None:
+    _, file_ext = os.path.splitext(outfile)
+    with open(outfile, "w", encoding="UTF-8") as f:
+        if file_ext.lower() in VALID_YAML_EXTENSIONS:
+            dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+            yaml.dump(document, f, Dumper=dumper, sort_keys=False)
+        else:
+            json.dump(document, f)
+
+def generate(outfile:Path = typer.Argument(..., help="File name of the generated spec (.json, .yaml or .yml)"),
+        operations:int = typer.Option(100, help="Number of operations"),
+        schemas:int = typer.Option(50, help="Number of schemas in components/schemas"),
+        width:int = typer.Option(10, help="Number of properties per schema"),
+        ref_depth:int = typer.Option(3, help="Length of $ref chains between schemas"),
+        allof_ratio:float = typer.Option(0.1, help="Share of schemas defined with allOf"),
+        cyclic_ratio:float = typer.Option(0.05, help="Share of schemas with a reference back to a previous schema"),
+        path_params:int = typer.Option(2, help="Number of extra parameters declared at path level"),
+        vocabulary:int = typer.Option(500, help="Number of distinct field names"),
+        shared_fragments:int = typer.Option(0, help="Number of property fragments shared between schemas (YAML anchors)"),
+        tags:int = typer.Option(10, help="Number of tags"),
+        seed:int = typer.Option(0, help="Seed of the random generator (same seed => same document)"),
+        ) -> None:
+    if os.path.splitext(outfile)[1].lower() not in VALID_OPENAPI_EXTENSIONS:
+        raise typer.BadParameter(f"outfile extension must be one of {VALID_OPENAPI_EXTENSIONS}")
+    generator = SpecGenerator(operations=operations, schemas=schemas, width=width, ref_depth=ref_depth, allof_ratio=allof_ratio, cyclic_ratio=cyclic_ratio,
+                              path_params=path_params, vocabulary=vocabulary, shared_fragments=shared_fragments, tags=tags, seed=seed)
+    document = generator.generate()
+    save_document(document, outfile)
+    logger.log(LOGLEVEL_SUCCESS, f"Spec with {len(document['paths'])} paths, {operations} operations & {schemas} schemas saved to file: '{outfile}'")
+
+if __name__ == "__main__":
+    typer.run(generate)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'test_cache'
+__version__ = '1.0.0'
+
+'''
+Size bound & eviction of the content cache (python -m pytest tests).
+'''
+
+# Standard Python Modules
+import os
+import time
+
+# External Python Modules
+
+# Personal Python Modules
+from utils.cache import TMP_MAX_AGE, TMP_PREFIX, ContentCache
+
+def get_size(cache_dir) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(cache_dir) for name in files)
+
+def test_size_bound(tmp_path):
+    cache = ContentCache(tmp_path, max_size=10_000)
+    for i in range(100):
+        cache.put("output", ContentCache.make_key(i), b"x" * 500)
+        assert get_size(tmp_path) <= 10_000
+    assert cache.get("output", ContentCache.make_key(99)) is not None
+    assert cache.get("output", ContentCache.make_key(0)) is None
+
+def test_scans(tmp_path, monkeypatch):
+    """ The cache folder is scanned once, then only when the running total exceeds max_size. """
+    cache = ContentCache(tmp_path, max_size=10_000)
+    nb_scans = 0
+    get_entries = cache.get_entries
+    def counting_get_entries():
+        nonlocal nb_scans
+        nb_scans += 1
+        return get_entries()
+    monkeypatch.setattr(cache, "get_entries", counting_get_entries)
+    for i in range(100):
+        cache.put("output", ContentCache.make_key(i), b"x" * 500)
+    assert nb_scans <= 1 + 100 // 2        # eviction to 90% of max_size leaves room for 2 entries at least
+
+def test_replaced_entry(tmp_path):
+    cache = ContentCache(tmp_path, max_size=10_000)
+    for _ in range(50):
+        cache.put("output", "key", b"x" * 5_000)
+    assert cache._total_size == 5_000
+
+def test_temporary_files(tmp_path):
+    """ Files of entries being written by another process are never evicted, unless left for a long time. """
+    cache = ContentCache(tmp_path, max_size=1_000)
+    os.makedirs(tmp_path / "output")
+    in_flight = tmp_path / "output" / f"{TMP_PREFIX}in_flight"
+    in_flight.write_bytes(b"x" * 5_000)
+    left = tmp_path / "output" / f"{TMP_PREFIX}left"
+    left.write_bytes(b"x" * 5_000)
+    os.utime(left, (time.time() - TMP_MAX_AGE - 1, time.time() - TMP_MAX_AGE - 1))
+    for i in range(10):
+        cache.put("output", ContentCache.make_key(i), b"x" * 500)
+    cache.evict()
+    assert in_flight.exists()
+    assert not left.exists()
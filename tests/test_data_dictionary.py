@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'test_data_dictionary'
+__version__ = '1.0.0'
+
+'''
+build_dictionary: output files & hashing of the spec (python -m pytest tests).
+'''
+
+# Standard Python Modules
+import os
+
+# External Python Modules
+import pytest
+
+# Personal Python Modules
+from utils.cache import ContentCache
+from data_dictionary import DictionaryOptions, build_dictionary
+
+SOURCE = "sample_input/pet_store.yaml"
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_spec_hashed_once(tmp_path, monkeypatch, use_cache):
+    """ Cache keys of all layers derive from one hash of the spec (also when the analysis is retrieved from cache). """
+    with open(SOURCE, "rb") as f:
+        content = f.read()
+    nb_hashes = 0
+    make_key = ContentCache.make_key
+    def counting_make_key(*parts):
+        nonlocal nb_hashes
+        nb_hashes += content in parts
+        return make_key(*parts)
+    monkeypatch.setattr(ContentCache, "make_key", staticmethod(counting_make_key))
+    options = DictionaryOptions(cache=ContentCache(tmp_path / "cache", enabled=use_cache))
+    build_dictionary(SOURCE, ["json"], options, outdir=tmp_path)
+    build_dictionary(SOURCE, ["json"], options, outdir=tmp_path)
+    assert nb_hashes == 2
+
+def test_outfile(tmp_path):
+    result = build_dictionary(SOURCE, ["json", "xlsx"], DictionaryOptions(excel_with_layout=False), outfile=tmp_path / "out" / "dictionary.txt")
+    assert result.outfiles == {"json": str(tmp_path / "out" / "dictionary.json"), "xlsx": str(tmp_path / "out" / "dictionary.xlsx")}
+    assert all(os.path.isfile(outfile) for outfile in result.outfiles.values())
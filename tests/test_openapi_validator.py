@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'test_openapi_validator'
+__version__ = '1.0.0'
+
+'''
+Every document accepted by the validator must be analyzed without error (python -m pytest tests).
+
+Documents the analysis cannot handle are rejected with the rule concerned; all others (samples, OpenAPI 3.1 shapes and
+seeded random mutations of a small document) go through parsing, summary, tables, schema graph & filter.
+'''
+
+# Standard Python Modules
+import copy
+import glob
+import json
+import random
+
+# External Python Modules
+import pytest
+import yaml
+
+# Personal Python Modules
+from openapi_parsing import ApiObject
+from openapi_validator import SEVERITY_WARNING, get_errors, validate_document
+from dictionary_tables import ApiTables
+from schema_graph import SchemaGraph
+from spec_filter import SpecFilter
+
+DOCUMENT = {
+    "openapi": "3.0.3",
+    "info": {"title": "Users", "version": "1.0", "description": "Users API"},
+    "servers": [{"url": "https://a.example.com"}, {"url": "https://b.example.com"}],
+    "paths": {
+        "/users/{id}": {
+            "parameters": [{"$ref": "#/components/parameters/Id"}],
+            "get": {
+                "tags": ["users"],
+                "parameters": [{"name": "q", "in": "query", "description": "Search", "schema": {"type": "string"}}],
+                "responses": {"200": {"description": "User", "content": {"application/json": {"schema": {"$ref": "#/components/schemas/User"}}}}},
+            },
+            "post": {
+                "requestBody": {"content": {"application/json": {"schema": {"type": "object", "required": ["name"], "properties": {
+                    "name": {"type": "string", "description": "Name"},
+                    "friends": {"type": "array", "items": {"$ref": "#/components/schemas/User"}}}}}}},
+                "responses": {"201": {"description": "Created"}},
+            },
+            "put": {"requestBody": {"$ref": "#/components/requestBodies/User"}, "responses": {"200": {"$ref": "#/components/responses/Ok"}}},
+            "patch": {"requestBody": {"content": {"application/json": {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/User"}}}}}},
+        },
+    },
+    "components": {
+        "schemas": {
+            "User": {"type": "object", "required": ["id"], "description": "User", "properties": {
+                "id": {"type": "integer", "description": "Identifier"},
+                "name": {"type": "string", "nullable": True},
+                "tags": {"type": "array", "items": {"type": "string"}},
+                "address": {"$ref": "#/components/schemas/Address"},
+                "friends": {"type": "array", "items": {"$ref": "#/components/schemas/User"}}}},
+            "Address": {"properties": {"city": {"type": "string", "enum": ["Paris", "Lyon"]}}},
+            "Users": {"type": "array", "items": {"$ref": "#/components/schemas/User"}},
+            "Any": {"allOf": [{"$ref": "#/components/schemas/User"}, {"type": "object"}]},
+        },
+        "parameters": {"Id": {"name": "id", "in": "path", "required": True, "description": "Identifier", "schema": {"type": "integer"}}},
+        "requestBodies": {"User": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/User"}}}}},
+        "responses": {"Ok": {"description": "Ok"}},
+    },
+}
+# Values randomly put in place of nodes of the document
+VALUES = ["x", "", 5, 1.5, True, None, [], {}, ["a"], [1], {"a": "b"}, {"a": 1}, [{"a": 1}], ["string", "null"], {"type": "object"},
+          {"type": ["string", "null"]}, {"$ref": "#/components/schemas/User"}, {"$ref": "#/components/parameters/Id"}, "#/components/schemas/User"]
+KEYS = ["type", "required", "items", "properties", "description", "schema", "name", "in", "$ref", "allOf", "content", "parameters",
+        "servers", "title", "x-extension"]
+
+def analyze(document:dict) -> None:
+    """ All steps run on a validated document (raise on the first failure). """
+    ApiObject(copy.deepcopy(document)).get_summary()
+    api_object = ApiObject(document)
+    api_object.parse()
+    api_object.to_json(deterministic=True)
+    api_object.get_summary()
+    api_object.get_fingerprints()
+    ApiTables(api_object)
+    ApiTables(api_object, compact=True)
+    SchemaGraph(document)
+    SpecFilter(include_paths=["/users/**"], methods=["get"]).apply(document)
+
+def get_rule_ids(document:dict) -> set[str]:
+    return {issue.rule_id for issue in get_errors(validate_document(document))}
+
+def mutate(document:dict, rnd:random.Random) -> dict:
+    """ Replace, remove or add 1 to 3 random nodes of a document. """
+    for _ in range(rnd.choice([1, 1, 2, 3])):
+        nodes = []
+        stack = [document]
+        while stack:
+            node = stack.pop()
+            items = node.items() if isinstance(node, dict) else enumerate(node) if isinstance(node, list) else []
+            for key, value in items:
+                nodes.append((node, key))
+                stack.append(value)
+        parent, key = rnd.choice(nodes)
+        choice = rnd.random()
+        if choice < 0.6:
+            parent[key] = copy.deepcopy(rnd.choice(VALUES))
+        elif choice < 0.8 and isinstance(parent, dict):
+            del parent[key]
+        elif isinstance(parent[key], dict):
+            parent[key][rnd.choice(KEYS)] = copy.deepcopy(rnd.choice(VALUES))
+    return document
+
+def with_change(path:list, value) -> dict:
+    """ Copy of DOCUMENT with one node replaced. """
+    document = copy.deepcopy(DOCUMENT)
+    node = document
+    for key in path[:-1]:
+        node = node[key]
+    node[path[-1]] = value
+    return document
+
+def test_document_is_valid():
+    assert get_rule_ids(DOCUMENT) == set()
+    analyze(copy.deepcopy(DOCUMENT))
+
+@pytest.mark.parametrize("path, value, rule_id", [
+    (["components", "schemas", "Address", "properties", "city"], "str", "schema-object"),
+    (["components", "schemas", "User", "properties", "tags", "items"], "string", "schema-object"),
+    (["components", "schemas", "User", "required"], True, "schema-required-list"),
+    (["components", "schemas", "User", "required"], ["id", 1], "schema-required-list"),
+    (["components", "schemas", "User", "properties", "id", "description"], 5, "schema-description-string"),
+    (["components", "schemas", "User", "type"], 5, "schema-type"),
+    (["components", "schemas", "Any", "allOf"], {"type": "object"}, "schema-all-of-list"),
+    (["paths", "/users/{id}", "post", "requestBody", "content", "application/json", "schema", "properties", "name"], "str", "schema-object"),
+    (["paths", "/users/{id}", "get", "parameters", 0, "schema"], "string", "parameter-schema-object"),
+    (["paths", "/users/{id}", "get", "parameters", 0, "description"], ["a"], "parameter-description-string"),
+    (["components", "parameters", "Id", "schema", "type"], ["integer", 5], "schema-type"),
+    (["components", "requestBodies", "User", "content"], "json", "request-body-content-object"),
+    (["servers"], {"url": "https://a.example.com"}, "servers-list"),
+    (["servers", 0], "https://a.example.com", "server-object"),
+    (["servers", 1, "url"], 5, "server-url"),
+    (["paths", "/users/{id}", "get", "servers"], [{"url": None}], "server-url"),
+    (["info", "title"], 5, "info-title-string"),
+    (["paths", "/users/{id}", "parameters", 0, "$ref"], "#/components/schemas/User", "ref-kind"),
+    (["paths", "/users/{id}", "parameters", 0, "$ref"], "#/components/parameters/Id/schema", "ref-kind"),
+    (["paths", "/users/{id}", "put", "requestBody", "$ref"], "#/components/schemas/User", "ref-kind"),
+    (["paths", "/users/{id}", "put", "responses", "200", "$ref"], "#/components/requestBodies/User", "ref-kind"),
+    (["paths", "/users/{id}", "get", "parameters", 0], {"$ref": "#/components/parameters/Missing"}, "ref-target"),
+])
+def test_rejected(path, value, rule_id):
+    assert rule_id in get_rule_ids(with_change(path, value))
+
+@pytest.mark.parametrize("path, value", [
+    (["components", "schemas", "User", "properties", "name", "type"], ["string", "null"]),     # OpenAPI 3.1
+    (["components", "schemas", "User", "type"], ["object", "null"]),
+    (["components", "parameters", "Id", "schema", "type"], ["integer", "string"]),
+    (["info", "version"], 1.0),                                                                 # warning only
+    (["components", "schemas", "User", "properties", "id"], {"$ref": "#/components/requestBodies/User/content/application~1json/schema"}),
+    (["paths", "/users/{id}", "x-extension"], ["a", {"requestBody": 5}]),
+    (["paths", "/users/{id}", "post", "requestBody", "content", "application/json", "schema", "required"], None),
+])
+def test_accepted(path, value):
+    document = with_change(path, value)
+    assert get_rule_ids(document) == set()
+    analyze(document)
+
+def test_duplicated_parameters():
+    document = with_change(["paths", "/users/{id}", "parameters"], [{"$ref": "#/components/parameters/Id"}, {"$ref": "#/components/parameters/Id"}])
+    warnings = {issue.rule_id for issue in validate_document(document) if issue.severity == SEVERITY_WARNING}
+    assert "path-parameters-unique" in warnings
+    analyze(document)
+
+def test_type_list():
+    api_object = ApiObject(with_change(["components", "schemas", "User", "properties", "name", "type"], ["string", "null"]))
+    assert api_object.request_fields_dict["name"].types == {"string"}
+
+@pytest.mark.parametrize("filename", sorted(glob.glob("sample_input/*")))
+def test_samples(filename):
+    with open(filename, encoding="UTF-8") as f:
+        document = json.load(f) if filename.endswith(".json") else yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    assert get_rule_ids(document) == set()
+    analyze(document)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_mutations(seed):
+    rnd = random.Random(seed)
+    nb_accepted = 0
+    for i in range(1000):
+        document = mutate(copy.deepcopy(DOCUMENT), rnd)
+        if get_rule_ids(document):
+            continue
+        nb_accepted += 1
+        try:
+            analyze(document)
+        except Exception as e:
+            pytest.fail(f"mutation {i} (seed {seed}) accepted by the validator but not analyzed: {e!r}\n{json.dumps(document, default=str)}")
+    assert nb_accepted > 100
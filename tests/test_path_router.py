@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'test_path_router'
+__version__ = '1.0.0'
+
+'''
+Matching of requests to path templates, with the names of their parameters (python -m pytest tests).
+'''
+
+# Standard Python Modules
+
+# External Python Modules
+import pytest
+import yaml
+
+# Personal Python Modules
+from path_router import HTTP_METHODS, PARAM_REGEX, PathRouter
+
+def test_sibling_templates():
+    router = PathRouter()
+    router.add("/users/{id}", ["get"])
+    router.add("/users/{userId}/orders", ["get"])
+    assert router.match("get", "/users/42/orders") == ("GET /users/{userId}/orders", {"userId": "42"})
+    assert router.match("get", "/users/42") == ("GET /users/{id}", {"id": "42"})
+
+def test_same_template_per_method():
+    router = PathRouter()
+    router.add("/users/{id}", ["get"])
+    router.add("/users/{userId}", ["delete"])
+    router.add("/files/{name}.{ext}", ["get"])
+    router.add("/files/{base}.{format}", ["put"])
+    assert router.match("delete", "/users/42") == ("DELETE /users/{userId}", {"userId": "42"})
+    assert router.match("get", "/users/42") == ("GET /users/{id}", {"id": "42"})
+    assert router.match("get", "/files/a.json") == ("GET /files/{name}.{ext}", {"name": "a", "ext": "json"})
+    assert router.match("put", "/files/a.json") == ("PUT /files/{base}.{format}", {"base": "a", "format": "json"})
+
+def test_literal_first():
+    router = PathRouter(["/api/v1"])
+    router.add("/users/{id}", ["get"])
+    router.add("/users/me", ["get"])
+    assert router.match("get", "/api/v1/users/me") == ("GET /users/me", {})
+    assert router.match("GET", "/api/v1/users/7") == ("GET /users/{id}", {"id": "7"})
+    assert router.match("post", "/users/7") == (None, {})
+
+@pytest.mark.parametrize("filename", ["sample_input/github.yaml", "sample_input/oss.yaml"])
+def test_every_operation(filename):
+    with open(filename, encoding="UTF-8") as f:
+        document = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    router = PathRouter.from_document(document)
+    for path, path_item in document["paths"].items():
+        names = PARAM_REGEX.findall(path)
+        concrete_path = PARAM_REGEX.sub(lambda match: "v" + match.group(1), path)
+        for method in HTTP_METHODS:
+            if method in path_item:
+                operation, values = router.match(method, concrete_path)
+                assert operation == f"{method.upper()} {path}"
+                assert values == {name: "v" + name for name in names}
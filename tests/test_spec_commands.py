@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+__author__ = 'P. Saint-Amand'
+__appname__ = 'test_spec_commands'
+__version__ = '1.0.0'
+
+'''
+Exit codes of the command line tools built on the library modules (python -m pytest tests).
+'''
+
+# Standard Python Modules
+
+# External Python Modules
+import pytest
+import typer
+from typer.testing import CliRunner
+
+# Personal Python Modules
+from spec_commands import graph, validate
+
+def run(command, args:list[str]):
+    app = typer.Typer()
+    app.command()(command)
+    return CliRunner().invoke(app, args)
+
+@pytest.mark.parametrize("args, exit_code", [
+    (["sample_input/pet_store.yaml", "--no-cache", "-s", "Pet", "-p", "GET /pet/{petId}"], 0),
+    (["sample_input/pet_store.yaml", "--no-cache", "-s", "Unknown"], 1),
+    (["sample_input/pet_store.yaml", "--no-cache", "-p", "GET /unknown"], 1),
+    (["sample_input/pet_store.yaml", "--no-cache", "-f", "svg"], 2),
+])
+def test_graph(args, exit_code):
+    assert run(graph, args).exit_code == exit_code
+
+def test_validate():
+    assert run(validate, ["sample_input/pet_store.yaml", "sample_input/oss.yaml"]).exit_code == 0
@@ -0,0 +1,71 @@
+### Import standard modules
+import os
+import sys
+import time
+try:
+    import resource             # Not available on Windows: memory budget not enforced there
+except ImportError:
+    resource = None
+
+### Import external modules
+
+### Import personal modules
+
+MEMORY_CHECK_INTERVAL = 256     # memory is read once every N checks (time is checked at each one)
+
+def get_rss() -> int:
+    """ Current resident set size of the process in bytes (peak RSS when the current one is not available, None otherwise). """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+### Limits of time & memory for one processing, checked cooperatively by the processing itself
+class Budget():
+    """ Time (seconds since start) and memory (growth of RSS since start, in MB) allowed to a processing.
+
+    The processing calls exceeded() at its checkpoints & stops expensive work once it returns True. Exhaustion is final:
+    once a limit is hit, exceeded() keeps returning True and reason tells which limit was hit.
+    """
+    def __init__(self, max_seconds:float=None, max_memory_mb:float=None):
+        self.max_seconds:float = max_seconds
+        self.max_memory_mb:float = max_memory_mb
+        self.reason:str = ""
+        self._deadline:float = None
+        self._memory_limit:int = None
+        self._checks:int = 0
+        self.start()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_seconds is not None or self.max_memory_mb is not None
+
+    def start(self) -> None:
+        """ (Re)start counting from now. """
+        self.reason = ""
+        self._checks = 0
+        self._deadline = time.perf_counter() + self.max_seconds if self.max_seconds is not None else None
+        self._memory_limit = None
+        if self.max_memory_mb is not None:
+            rss = get_rss()
+            if rss is not None:
+                self._memory_limit = rss + int(self.max_memory_mb * 1024 * 1024)
+
+    def exceeded(self) -> bool:
+        if self.reason:
+            return True
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            self.reason = f"time budget of {self.max_seconds}s exceeded"
+        elif self._memory_limit is not None:
+            self._checks += 1
+            if self._checks % MEMORY_CHECK_INTERVAL == 1 and get_rss() > self._memory_limit:
+                self.reason = f"memory budget of {self.max_memory_mb} MB exceeded"
+        return bool(self.reason)
+
+    def to_dict(self):
+        return {"max_seconds": self.max_seconds, "max_memory_mb": self.max_memory_mb, "reason": self.reason}
@@ -0,0 +1,149 @@
+### Import standard modules
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+### Import external modules
+
+### Import personal modules
+
+### Global Variables
+TMP_PREFIX = ".tmp-"            # entries being written (renamed to their key once complete)
+TMP_MAX_AGE = 3600              # seconds after which a temporary file is considered left by a crashed process
+EVICT_RATIO = 0.9               # eviction goes below this ratio of max_size, so that it does not run again at the next put
+
+### Content-addressed file cache with size-bounded LRU eviction
+class ContentCache():
+    """ Store binary entries per layer (i.e. 'document', 'analysis', 'output') under a key derived from their inputs.
+
+    Entries are files: <cache_dir>/<layer>/<key[:2]>/<key>. Last access time is tracked through the file modification
+    time, so the least recently used entries are evicted first when the total size exceeds max_size.
+
+    The total size is scanned once, then kept as a running total of the entries written: the cache folder is scanned
+    again only when this total exceeds max_size (entries written by other processes are counted at that point).
+    """
+    def __init__(self, cache_dir:Path, max_size:int=500*1024*1024, enabled:bool=True):
+        self.cache_dir:Path = cache_dir
+        self.max_size:int = max_size
+        self.enabled:bool = enabled
+        self.hits:int = 0
+        self.misses:int = 0
+        self._lock = threading.Lock()
+        self._total_size:int = None             # running total of the size of entries (None until the first scan)
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """ sha256 of all parts (bytes are hashed as is, other values through their string representation). """
+        sha = hashlib.sha256()
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = str(part).encode("utf-8")
+            sha.update(len(part).to_bytes(8, "little"))
+            sha.update(part)
+        return sha.hexdigest()
+
+    def _entry_path(self, layer:str, key:str) -> str:
+        return os.path.join(self.cache_dir, layer, key[:2], key)
+
+    def get(self, layer:str, key:str) -> bytes:
+        """ Content of an entry (None if not in cache). """
+        if not self.enabled:
+            return None
+        entry = self._entry_path(layer, key)
+        try:
+            with open(entry, "rb") as f:
+                data = f.read()
+            os.utime(entry)                 # mark as recently used
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def get_file(self, layer:str, key:str, outfile:Path) -> bool:
+        """ Copy an entry to outfile. Return False if not in cache. """
+        if not self.enabled:
+            return False
+        entry = self._entry_path(layer, key)
+        try:
+            shutil.copyfile(entry, outfile)
+            os.utime(entry)
+        except OSError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def put(self, layer:str, key:str, data:bytes) -> None:
+        if not self.enabled:
+            return
+        entry = self._entry_path(layer, key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        # Write in a temporary file then rename: concurrent readers never see a partial entry
+        fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(entry), prefix=TMP_PREFIX)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            replaced_size = os.stat(entry).st_size
+        except OSError:
+            replaced_size = 0
+        os.replace(tmp_name, entry)
+        with self._lock:
+            if self._total_size is None:
+                self._total_size = sum(size for _, size, _ in self.get_entries())
+            else:
+                self._total_size += len(data) - replaced_size
+            over_limit = self._total_size > self.max_size
+        if over_limit:
+            self.evict()
+
+    def put_file(self, layer:str, key:str, infile:Path) -> None:
+        if not self.enabled:
+            return
+        with open(infile, "rb") as f:
+            self.put(layer, key, f.read())
+
+    def get_entries(self) -> list[tuple[float, int, str]]:
+        """ All entries as (last access time, size, path). Temporary files of entries being written are skipped. """
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                entry = os.path.join(root, name)
+                try:
+                    stat = os.stat(entry)
+                except OSError:
+                    continue
+                if name.startswith(TMP_PREFIX):
+                    if time.time() - stat.st_mtime > TMP_MAX_AGE:
+                        try:
+                            os.remove(entry)
+                        except OSError:
+                            pass
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry))
+        return entries
+
+    def evict(self) -> None:
+        """ Remove least recently used entries until total size is below max_size (EVICT_RATIO of it when over max_size). """
+        with self._lock:
+            entries = self.get_entries()
+            total_size = sum(size for _, size, _ in entries)
+            target_size = self.max_size * EVICT_RATIO if total_size > self.max_size else self.max_size
+            for _, size, entry in sorted(entries):
+                if total_size <= target_size:
+                    break
+                try:
+                    os.remove(entry)
+                except OSError:
+                    continue
+                total_size -= size
+            self._total_size = total_size
+
+    def clear(self) -> None:
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        with self._lock:
+            self._total_size = None
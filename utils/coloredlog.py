@@ -8,11 +8,18 @@ Description:
     - colored console logging
     - Logging to file
     - Possibility to log on both conosle & file but using different formatter for console and log file
+    - Queued mode: records are written to console/file by a background thread (QueueHandler/QueueListener)
+    - Repeated messages (same template) coalesced into a count, reported by a summary at the end
 '''
+import atexit
 import colorama as c
+import copy
 import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
 from pathlib import Path
 
 LOGLEVEL_SUCCESS = 15
@@ -43,11 +50,54 @@ class ColorFormatter(logging.Formatter):
     }
     def format(self, record):
         color = self.COLORS.get(record.levelname, "")
-        if color:           
+        if color:
+            # Colors applied on a copy: the record is shared with other handlers (i.e. log file)
+            record = copy.copy(record)
             record.levelname = color + record.levelname
-            record.msg = record.msg  + self.color_reset 
+            record.msg = str(record.msg) + self.color_reset
         return logging.Formatter.format(self, record)
 
+class DuplicateFilter(logging.Filter):
+    """ Let pass the first max_repeats records of a same message template (record.msg before % args), then only count them.
+    Applies to levels from min_level to max_level (warnings by default: debug details & errors are never filtered).
+    Use %-style arguments for the variable part of messages so that they are recognized as repetitions
+    (i.e. logger.warning("Schema %s not parsed", name)).
+    """
+    def __init__(self, max_repeats:int=5, min_level:int=logging.WARNING, max_level:int=logging.WARNING):
+        super().__init__()
+        self.max_repeats = max_repeats
+        self.min_level = min_level
+        self.max_level = max_level
+        self.counts:dict[tuple,int] = {}
+        self.first_records:dict[tuple,logging.LogRecord] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not self.min_level <= record.levelno <= self.max_level or getattr(record, "summary", False):
+            return True
+        key = (record.levelno, record.msg)
+        with self._lock:
+            count = self.counts.get(key, 0) + 1
+            self.counts[key] = count
+            if count == 1:
+                self.first_records[key] = record
+        return count <= self.max_repeats
+
+    def get_suppressed(self) -> list[tuple[logging.LogRecord, int]]:
+        """ (first record, total count) of each message template repeated more than max_repeats times. """
+        with self._lock:
+            return [(self.first_records[key], count) for key, count in self.counts.items() if count > self.max_repeats]
+
+    @staticmethod
+    def get_template(record:logging.LogRecord) -> str:
+        """ Message with its variable parts replaced by '*'. """
+        if not record.args:
+            return str(record.msg)
+        try:
+            return str(record.msg) % tuple("*" for _ in record.args)
+        except (TypeError, ValueError):
+            return record.getMessage()
+
 class ColorLoggerOptions():
     def __init__(self, 
                 console:bool=True, 
@@ -55,7 +105,9 @@ class ColorLoggerOptions():
                 console_logging_level = logging.WARNING,
                 logfile_name:Path = "",
                 logfile_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'),
-                logfile_logging_level = logging.DEBUG
+                logfile_logging_level = logging.DEBUG,
+                queued:bool = False,
+                dedup_max_repeats:int = 0
                 ):
         self.console = console
         self.console_formatter = console_formatter
@@ -63,6 +115,8 @@ class ColorLoggerOptions():
         self.logfile_name = logfile_name
         self.logfile_formatter = logfile_formatter
         self.logfile_logging_level = logfile_logging_level
+        self.queued = queued                            # write records from a background thread
+        self.dedup_max_repeats = dedup_max_repeats      # 0: no deduplication of repeated messages
     
     def to_json(self, indent:int=None):
         result = {
@@ -73,14 +127,19 @@ class ColorLoggerOptions():
             "logfile_name": str(self.logfile_name),
             # "logfile_formatter": "logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')",
             "logfile_formatter": get_formatter_definition(self.logfile_formatter),
-            "logfile_logging_level": self.logfile_logging_level
+            "logfile_logging_level": self.logfile_logging_level,
+            "queued": self.queued,
+            "dedup_max_repeats": self.dedup_max_repeats
         }
         return json.dumps(result, indent=indent)
 
 class ColorLogger(logging.getLoggerClass()):
     def __init__(self, name:str="default", options=ColorLoggerOptions()):
         logging.Logger.__init__(self, name, logging.DEBUG)
-        
+        self.listener:logging.handlers.QueueListener = None
+        self.dedup_filter:DuplicateFilter = None
+        handlers = []
+
         # Will log to a logfile
         if options.logfile_name:
             path = os.path.dirname(os.path.abspath(options.logfile_name))
@@ -97,16 +156,53 @@ class ColorLogger(logging.getLoggerClass()):
                 fh = logging.FileHandler(options.logfile_name, encoding='utf-8')
                 fh.setLevel(options.logfile_logging_level)
                 fh.setFormatter(options.logfile_formatter)
-                self.addHandler(fh)
+                handlers.append(fh)
 
         # Put the console handler as last otherwise message is modified with color and appear as well in the file
         if options.console:
             ch = logging.StreamHandler()
             ch.setLevel(options.console_logging_level)
             ch.setFormatter(options.console_formatter)
-            self.addHandler(ch)
+            handlers.append(ch)
+
+        # Records below the level of all handlers are dropped at once (message not even formatted)
+        min_level = min([h.level for h in handlers], default=LOGLEVEL_DISABLE)
+        self.setLevel(min_level)
+        if options.dedup_max_repeats:
+            self.dedup_filter = DuplicateFilter(max_repeats=options.dedup_max_repeats)
+            self.addFilter(self.dedup_filter)
+        if options.queued and handlers:
+            # Caller only puts records in a queue, console & file are written by the listener thread
+            log_queue = queue.SimpleQueue()
+            qh = logging.handlers.QueueHandler(log_queue)
+            qh.setLevel(min_level)
+            self.addHandler(qh)
+            self.listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+            self.listener.start()
+            atexit.register(self.shutdown)
+        else:
+            for handler in handlers:
+                self.addHandler(handler)
+
+    def log_summary(self) -> None:
+        """ Log once each message repeated more than allowed by the duplicate filter, with its number of occurrences. """
+        if not self.dedup_filter:
+            return
+        for record, count in self.dedup_filter.get_suppressed():
+            self.log(record.levelno, f"{DuplicateFilter.get_template(record)} \u00d7{count:,}", extra={"summary": True})
+
+    def shutdown(self) -> None:
+        """ Log the summary of repeated messages, then flush & stop the listener thread (queued mode). Can be called several times. """
+        self.log_summary()
+        if self.dedup_filter:
+            self.removeFilter(self.dedup_filter)
+            self.dedup_filter = None
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
 
-def get_logger(logger_name:str=None, console_loglevel:int=LOGLEVEL_SUCCESS, file_loglevel:int=LOGLEVEL_DISABLE, logfile:Path=None, success_level=LOGLEVEL_SUCCESS) -> ColorLogger:
+def get_logger(logger_name:str=None, console_loglevel:int=LOGLEVEL_SUCCESS, file_loglevel:int=LOGLEVEL_DISABLE, logfile:Path=None, success_level=LOGLEVEL_SUCCESS,
+               queued:bool=False, dedup_max_repeats:int=0) -> ColorLogger:
     if not logger_name:
         logger_name, _ = os.path.splitext(os.path.basename(__file__))
     if (not logfile or logfile =="None") and file_loglevel != LOGLEVEL_DISABLE:
@@ -114,7 +210,8 @@ def get_logger(logger_name:str=None, console_loglevel:int=LOGLEVEL_SUCCESS, file
     if logfile and file_loglevel == LOGLEVEL_DISABLE:
         file_loglevel = logging.DEBUG
     logging.addLevelName(success_level, 'SUCCESS')
-    log_options = ColorLoggerOptions(logfile_name=logfile, console_logging_level=console_loglevel, logfile_logging_level=file_loglevel)
+    log_options = ColorLoggerOptions(logfile_name=logfile, console_logging_level=console_loglevel, logfile_logging_level=file_loglevel,
+                                     queued=queued, dedup_max_repeats=dedup_max_repeats)
     logger = ColorLogger(name=logger_name, options=log_options)
     # save_logger_options(log_options)
     return logger
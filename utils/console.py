@@ -1,6 +1,7 @@
 ### Import external modules
 import os
 import random
+import sys
 import colorama as c
 
 class Console():
@@ -50,7 +51,12 @@ class Console():
         return file_in
 
     def clear_screen(self):
-        os.system("cls||clear")
+        """ Clear terminal using ANSI escape sequences (translated by colorama on Windows), without spawning a shell.
+        Nothing is done when output is redirected, so that files & pipes are not polluted by control characters.
+        """
+        if sys.stdout.isatty():
+            sys.stdout.write("\033[2J\033[3J\033[H")
+            sys.stdout.flush()
 
     def get_app_banner(self, selection="random", banner_lst=[], appversion="", creator=""):
         """ Construct an AppBanner from a possible list toghether with application version and application creator
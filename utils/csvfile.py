@@ -1,14 +1,172 @@
 ### Import standard modules
-from cmath import nan
 import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Any
 
 ### Import external modules
+import numpy as np
 import pandas as pd
 
 ### Import personal modules
-from console import Console
-from coloredlog import ColorLogger, get_logger, LOGLEVEL_SUCCESS, LOGLEVEL_DISABLE
+from utils.coloredlog import ColorLogger, get_logger, LOGLEVEL_SUCCESS, LOGLEVEL_DISABLE
+from utils.sketch import HyperLogLog
+
+VALID_HASHING = ["blake2s", "blake2b", "md5", "sha1", "sha224", "sha256", "sha384", "sha512", "sha3_224", "sha3_256", "sha3_384", "sha3_512"]
+VALID_ALGORITHM = ["index", "length"] + VALID_HASHING
+MEMO_MAX_SIZE = 1000000         # hashed values kept in memory (per process) for repeated values
+
+### Pseudonymize columns of dataframes: hash, length or dense index of each value, computed per column (no per-cell evaluation)
+class ColumnTransformer():
+    """ Empty & missing values give NaN for hashing algorithms, 0 for 'length' & 'index'.
+
+    Each distinct value of a column is transformed once (pandas factorize); hashes are memoized across chunks.
+    The 'index' algorithm numbers distinct values from 1, in order of appearance, with one index shared by all columns & chunks.
+    """
+    def __init__(self, algorithm:str="blake2s", salt:str=""):
+        if algorithm not in VALID_ALGORITHM:
+            raise ValueError(f"Unknown Algorithm specified: {algorithm}")
+        self.algorithm:str = algorithm
+        self.salt:bytes = (salt or "").encode()
+        self.index:dict[str,int] = {}
+        self._memo:dict[str,str] = {}
+        self._hash = getattr(hashlib, algorithm) if algorithm in VALID_HASHING else None
+
+    def hash_values(self, values:np.ndarray) -> list[str]:
+        memo = self._memo
+        if len(memo) > MEMO_MAX_SIZE:
+            memo.clear()
+        hash_function, salt = self._hash, self.salt
+        hashed = []
+        for value in values:
+            digest = memo.get(value)
+            if digest is None:
+                digest = memo[value] = hash_function(salt + value.encode()).hexdigest()
+            hashed.append(digest)
+        return hashed
+
+    def transform_partial(self, df:pd.DataFrame) -> dict[str,Any]:
+        """ Part of the transformation which does not depend on other chunks (can run in another process).
+
+        'index': (codes, distinct values) of each column, numbered by complete. Other algorithms: final columns.
+        """
+        partial = {}
+        for column in df.columns:
+            series = df[column].mask(df[column] == "")
+            if self.algorithm == "length":
+                partial[column] = series.str.len().fillna(0).astype(int)
+                continue
+            codes, uniques = pd.factorize(series)
+            if self.algorithm == "index":
+                partial[column] = (codes, list(uniques))
+            else:
+                hashed = np.array(self.hash_values(uniques) + [np.nan], dtype=object)
+                partial[column] = pd.Series(hashed[codes], index=df.index)      # code -1 (missing) -> last element
+        return partial
+
+    def complete(self, partial:dict[str,Any], index:pd.Index) -> pd.DataFrame:
+        if self.algorithm != "index":
+            return pd.DataFrame(partial, index=index)
+        columns = {}
+        dense_index = self.index
+        for column, (codes, uniques) in partial.items():
+            ids = np.array([dense_index.setdefault(value, len(dense_index) + 1) for value in uniques] + [0], dtype=np.int64)
+            columns[column] = ids[codes]
+        return pd.DataFrame(columns, index=index)
+
+    def transform(self, df:pd.DataFrame) -> pd.DataFrame:
+        return self.complete(self.transform_partial(df), df.index)
+
+_worker_transformer:ColumnTransformer = None
+
+def _init_worker(algorithm:str, salt:str) -> None:
+    global _worker_transformer
+    _worker_transformer = ColumnTransformer(algorithm, salt)
+
+def _transform_partial(df:pd.DataFrame) -> dict[str,Any]:
+    return _worker_transformer.transform_partial(df)
+
+### Mergeable statistics of columns, computed chunk by chunk
+class ColumnStats():
+    """ Count of values, min/max & distinct lengths and distinct values of one column.
+
+    Distinct values are exact (kept in a set) unless distinct_limit is given: beyond that number of values, the set is
+    replaced by a HyperLogLog sketch, so memory stays bounded whatever the size of the file.
+    """
+    def __init__(self, distinct_limit:int=None):
+        self.distinct_limit:int = distinct_limit
+        self.nb_value:int = 0
+        self.min_length:int = None
+        self.max_length:int = None
+        self.lengths:set[int] = set()
+        self.values:set[str] = set()
+        self.sketch:HyperLogLog = None
+
+    @property
+    def nb_unique_value(self) -> int:
+        return self.sketch.count() if self.sketch else len(self.values)
+
+    def add(self, series:pd.Series) -> None:
+        series = series.dropna()
+        if series.empty:
+            return
+        lengths = series.str.len()
+        self.nb_value += len(series)
+        self.min_length = min(int(lengths.min()), self.min_length if self.min_length is not None else int(lengths.min()))
+        self.max_length = max(int(lengths.max()), self.max_length or 0)
+        self.lengths.update(int(length) for length in lengths.unique())
+        self.add_distinct(series.unique())
+
+    def add_distinct(self, values) -> None:
+        if self.sketch:
+            self.sketch.add_values(values)
+            return
+        self.values.update(values)
+        if self.distinct_limit is not None and len(self.values) > self.distinct_limit:
+            self.sketch = HyperLogLog()
+            self.sketch.add_values(list(self.values))
+            self.values = set()
+
+    def merge(self, other:"ColumnStats") -> "ColumnStats":
+        self.nb_value += other.nb_value
+        if other.min_length is not None:
+            self.min_length = other.min_length if self.min_length is None else min(self.min_length, other.min_length)
+            self.max_length = other.max_length if self.max_length is None else max(self.max_length, other.max_length)
+        self.lengths |= other.lengths
+        if other.sketch:
+            if not self.sketch:
+                self.sketch = HyperLogLog()
+                self.sketch.add_values(list(self.values))
+                self.values = set()
+            self.sketch.merge(other.sketch)
+        else:
+            self.add_distinct(list(other.values))
+        return self
+
+class TableStats():
+    """ ColumnStats of every column of a CSV file: chunks (or files) are added separately & merged. """
+    def __init__(self, distinct_limit:int=None):
+        self.distinct_limit:int = distinct_limit
+        self.columns:dict[str,ColumnStats] = {}
+
+    def add(self, df:pd.DataFrame) -> "TableStats":
+        for column in df.columns:
+            self.columns.setdefault(column, ColumnStats(self.distinct_limit)).add(df[column])
+        return self
+
+    def merge(self, other:"TableStats") -> "TableStats":
+        for column, stats in other.columns.items():
+            self.columns.setdefault(column, ColumnStats(self.distinct_limit)).merge(stats)
+        return self
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """ Same columns as CSVFile.get_stat. """
+        rows = [[column, s.nb_value, s.nb_unique_value, s.min_length or 0, s.max_length or 0, len(s.lengths)] for column, s in self.columns.items()]
+        return pd.DataFrame(rows, columns=["column_name", "nb_value", "nb_unique_value", "min_length", "max_length", "nb_unique_length"])
+
+def _chunk_stats(df:pd.DataFrame, distinct_limit:int) -> TableStats:
+    return TableStats(distinct_limit).add(df)
 
 ### Read & write CSV File using Pandas dataframes
 class CSVFile():
@@ -20,8 +178,8 @@ class CSVFile():
         self.logger = ColorLogger()
         self.stat = pd.DataFrame()
 
-        self.VALID_HASHING = ["blake2s", "blake2b", "md5", "sha1", "sha224", "sha256", "sha384", "sha512", "sha3_224", "sha3_256", "sha3_384", "sha3_512"]
-        self.VALID_ALGORITHM = ["index", "length"] + self.VALID_HASHING
+        self.VALID_HASHING = VALID_HASHING
+        self.VALID_ALGORITHM = VALID_ALGORITHM
         
         if logger is None:
             self.logger = get_logger(logger_name="ParameterFile", console_loglevel=LOGLEVEL_DISABLE)
@@ -36,6 +194,7 @@ class CSVFile():
         """
         if not chunksize:
             chunksize = self.chunksize
+        df_iterator = None
         try:
             df_iterator = pd.read_csv(self.filename, 
                                         encoding="utf-8", 
@@ -65,46 +224,98 @@ class CSVFile():
             self.stat["nb_value"] = list(self.content.count())
             self.stat["nb_unique_value"] = list(self.content.nunique())
             
-            df_len = self.content.applymap(lambda x: len(x), na_action="ignore")
+            df_len = self.content.apply(lambda column: column.str.len())
             self.stat["min_length"]  = list(df_len.min())
             self.stat["max_length"] = list(df_len.max())
             self.stat["nb_unique_length"] = list(df_len.nunique())
             self.stat[["min_length", "max_length"]] = self.stat[["min_length", "max_length"]].fillna("0").astype(int)   ## Necessary step as numeric column with NaN value are considered as float
         return self.stat
 
+    def get_stat_file(self, chunksize:int=None, workers:int=1, distinct_limit:int=None) -> pd.DataFrame():
+        """[Same statistics as get_stat, computed by streaming the CSV file chunk by chunk (content not kept in memory)]
+            distinct_limit: number of distinct values per column counted exactly, approximated beyond (None: always exact)
+            workers > 1: statistics of chunks are computed in a pool of processes & merged
+        Returns:
+            DataFrame: A dataFrame with some statistics on each columns
+        """
+        self.stat = pd.DataFrame()
+        df_iterator = self.get_chunk_iterator(chunksize)
+        if df_iterator is None:
+            return self.stat
+        stats = TableStats(distinct_limit)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()           # at most 2 chunks per worker in flight
+                for chunk in df_iterator:
+                    pending.append(executor.submit(_chunk_stats, chunk, distinct_limit))
+                    if len(pending) > 2 * workers:
+                        stats.merge(pending.popleft().result())
+                while pending:
+                    stats.merge(pending.popleft().result())
+        else:
+            for chunk in df_iterator:
+                stats.add(chunk)
+        self.stat = stats.to_dataframe()
+        return self.stat
+
     def hash_content(self, fields_to_transform:list, algorithm:str="blake2s", salt:str="", display_salt:bool=True) -> pd.DataFrame():
         # TO DO: Check if not better to transform the content of the object instead of returning an other Data Frame and not modifying object
         df_transformed = pd.DataFrame()
-        algorithm_hash = ""
-        missing_value = ""
-        distinct_values = []
-        VALID_HASHING = ["blake2s", "blake2b", "md5", "sha1", "sha224", "sha256", "sha384", "sha512", "sha3_224", "sha3_256", "sha3_384", "sha3_512"]
-
         if fields_to_transform:
-            if algorithm in VALID_HASHING:
-                if display_salt:
-                    print(f"Salt: {salt}")
-                if salt is None:
-                    salt=""
-                algorithm_hash = f"hashlib.{algorithm}(salt.encode() + x.encode()).hexdigest()"
-                missing_value = nan
-            elif algorithm=="length":
-                algorithm_hash = f"len(x)"
-                missing_value = 0
-            elif algorithm=="index":
-                for el in fields_to_transform:
-                    distinct_value_col = self.content[el].dropna().unique()
-                    distinct_values = distinct_values + list(set(distinct_value_col).difference(distinct_values))
-                algorithm_hash = f"{distinct_values}.index(x)+1"
-                missing_value = 0
+            if algorithm in VALID_HASHING and display_salt:
+                print(f"Salt: {salt}")
+            try:
+                transformer = ColumnTransformer(algorithm, salt)
+            except ValueError as e:
+                self.logger.error(str(e))
             else:
-                self.logger.error(f"Unknown Algorithm specified: {algorithm}")
-            df_transformed = self.content[fields_to_transform].fillna("").applymap(
-                lambda x: 
-                    eval(algorithm_hash,{"hashlib":hashlib},{"salt":salt, "x":x}) if not x == "" else missing_value
-            )
+                df_transformed = transformer.transform(self.content[fields_to_transform])
         return df_transformed
 
+    def hash_file(self, csv_filename:Path, fields_to_transform:list, algorithm:str="blake2s", salt:str="", chunksize:int=None, workers:int=1) -> bool:
+        """[Stream the CSV file by chunks, pseudonymize some columns & append each chunk to a new CSV file]
+            workers > 1: chunks are transformed in a pool of processes (written in their original order)
+        Returns:
+            [Boolean]: True when successfully saved. False otherwise
+        """
+        try:
+            transformer = ColumnTransformer(algorithm, salt)
+        except ValueError as e:
+            self.logger.error(str(e))
+            return False
+        df_iterator = self.get_chunk_iterator(chunksize)
+        if df_iterator is None:
+            return False
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(algorithm, salt)) if workers > 1 else None
+        pending = deque()           # (chunk, partial transformation or its future), at most 2 chunks per worker in flight
+        first_chunk = True
+        try:
+            for chunk in df_iterator:
+                if executor:
+                    pending.append((chunk, executor.submit(_transform_partial, chunk[fields_to_transform])))
+                else:
+                    pending.append((chunk, transformer.transform_partial(chunk[fields_to_transform])))
+                while pending and (len(pending) > 2 * workers or not executor):
+                    if not self._save_chunk(csv_filename, transformer, *pending.popleft(), first_chunk):
+                        return False
+                    first_chunk = False
+            while pending:
+                if not self._save_chunk(csv_filename, transformer, *pending.popleft(), first_chunk):
+                    return False
+                first_chunk = False
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+        return True
+
+    def _save_chunk(self, csv_filename:Path, transformer:ColumnTransformer, chunk:pd.DataFrame, partial:Any, first_chunk:bool) -> bool:
+        if not isinstance(partial, dict):
+            partial = partial.result()
+        transformed = transformer.complete(partial, chunk.index)
+        chunk[transformed.columns] = transformed
+        self.content = chunk
+        return self.save_content(csv_filename, header=first_chunk, mode="w" if first_chunk else "a")
+
     def load(self) -> pd.DataFrame():
         """[Load and return a CSV file content as a pandas dataframe]
 
@@ -0,0 +1,165 @@
+### Import standard modules
+import contextlib
+import cProfile
+import gc
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+### Import external modules
+
+### Import personal modules
+
+### Record wall time, cpu time, memory & object counts per stage of a pipeline
+class StageStats():
+    def __init__(self, name:str, path:str, depth:int):
+        self.name:str = name
+        self.path:str = path            # full name including enclosing stages (i.e. 'analysis/ApiObject.params')
+        self.depth:int = depth
+        self.wall:float = 0.0           # seconds
+        self.cpu:float = 0.0            # seconds of process cpu time (overlaps when stages run concurrently)
+        self.mem_start:int = 0          # bytes traced by tracemalloc at start of the stage
+        self.mem_end:int = 0            # bytes traced by tracemalloc at end of the stage
+        self.peak:int = 0               # peak of bytes traced by tracemalloc during the stage
+        self.objects_start:int = 0      # number of objects tracked by the garbage collector at start of the stage
+        self.objects_end:int = 0
+        self.cprofile_file:str = ""
+
+    def to_dict(self):
+        to_return = {"name": self.name, "path": self.path, "depth": self.depth, "wall": self.wall, "cpu": self.cpu,
+                     "mem_start": self.mem_start, "mem_end": self.mem_end, "peak": self.peak,
+                     "objects_start": self.objects_start, "objects_end": self.objects_end, "cprofile_file": self.cprofile_file}
+        return to_return
+
+    def to_json(self, indent=None):
+        return json.dumps(self.to_dict(), indent=indent)
+
+class Profiler():
+    """ Instrumentation of a pipeline: each stage is recorded through the context manager 'stage'.
+
+    Stages can be nested (nesting is tracked per thread). A disabled profiler records nothing and adds no overhead,
+    so the same code can be instrumented permanently:
+
+        profiler = Profiler(enabled=True)
+        with profiler.stage("load"):
+            ...
+        profiler.print_report()
+
+    Memory peaks rely on tracemalloc, which is process wide: peaks of stages running concurrently in several threads
+    are not isolated from each other. Only one stage at a time can be profiled with cProfile (the outermost one).
+    """
+    def __init__(self, enabled:bool=True, trace_memory:bool=True, count_objects:bool=True, cprofile_dir:Path=None):
+        self.enabled:bool = enabled
+        self.trace_memory:bool = trace_memory
+        self.count_objects:bool = count_objects
+        self.cprofile_dir:Path = cprofile_dir
+        self.stages:list[StageStats] = []
+        self.peak:int = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cprofile_active:bool = False
+        self._started_tracing:bool = False
+        if self.enabled:
+            self.start()
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.cprofile_dir and not os.path.exists(self.cprofile_dir):
+            os.makedirs(self.cprofile_dir)
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _get_stack(self) -> list[StageStats]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def stage(self, name:str):
+        if not self.enabled:
+            yield None
+            return
+        stack = self._get_stack()
+        parent = stack[-1] if stack else None
+        stats = StageStats(name, parent.path + "/" + name if parent else name, len(stack))
+        with self._lock:
+            self.stages.append(stats)
+        if self.count_objects:
+            stats.objects_start = len(gc.get_objects())
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if parent:
+                parent.peak = max(parent.peak, peak)
+            tracemalloc.reset_peak()
+            stats.mem_start = stats.peak = current
+        profile = None
+        if self.cprofile_dir:
+            with self._lock:
+                if not self._cprofile_active:
+                    self._cprofile_active = True
+                    profile = cProfile.Profile()
+        stack.append(stats)
+        if profile:
+            profile.enable()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield stats
+        finally:
+            stats.wall = time.perf_counter() - wall_start
+            stats.cpu = time.process_time() - cpu_start
+            if profile:
+                profile.disable()
+                filename = f"{self.stages.index(stats):03d}_" + re.sub(r"[^\w.-]+", "_", stats.path) + ".prof"
+                stats.cprofile_file = os.path.join(self.cprofile_dir, filename)
+                profile.dump_stats(stats.cprofile_file)
+                with self._lock:
+                    self._cprofile_active = False
+            stack.pop()
+            if self.trace_memory and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                stats.mem_end = current
+                stats.peak = max(stats.peak, peak)
+                if parent:
+                    parent.peak = max(parent.peak, stats.peak)
+                self.peak = max(self.peak, stats.peak)
+            if self.count_objects:
+                stats.objects_end = len(gc.get_objects())
+
+    def get_report(self) -> list[dict]:
+        return [stats.to_dict() for stats in self.stages]
+
+    def print_report(self):
+        sep = '-'*15
+        mb = 1024*1024
+        print(f"{sep} Profiling Report {sep}")
+        print(f"{'Stage':<50} {'Wall (s)':>9} {'CPU (s)':>9} {'Peak (MB)':>10} {'Mem +/- (MB)':>13} {'Objects':>10} {'Obj +/-':>10}")
+        for stats in self.stages:
+            name = "  " * stats.depth + stats.name
+            print(f"{name[:50]:<50} {stats.wall:>9.3f} {stats.cpu:>9.3f} {stats.peak/mb:>10.1f} {(stats.mem_end-stats.mem_start)/mb:>13.1f} "
+                  f"{stats.objects_end:>10} {stats.objects_end-stats.objects_start:>10}")
+        if self.cprofile_dir:
+            print(f"cProfile files available in: '{self.cprofile_dir}'")
+        print (sep*4)
+        print()
+
+    def save_json(self, json_filename:Path, indent:int=4):
+        with open(json_filename, "w") as f:
+            json.dump({"stages": self.get_report(), "peak": self.peak}, f, indent=indent)
+
+if __name__ == "__main__":
+    profiler = Profiler(enabled=True)
+    with profiler.stage("build"):
+        with profiler.stage("list"):
+            data = [str(i) for i in range(200000)]
+        with profiler.stage("join"):
+            result = ",".join(data)
+    profiler.print_report()